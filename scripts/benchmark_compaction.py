@@ -0,0 +1,106 @@
+# scripts/benchmark_compaction.py
+
+import io
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pyarrow.dataset as ds
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.raw_data_processor import compact_dataset
+from b3_analyzer.storage import DATASET_NAME, open_dataset
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+QUERY_COLUMNS = ['DATA_PREGAO', 'CODNEG', 'CODISI', 'PREABE', 'PREMAX', 'PREMIN', 'PREULT', 'VOLTOT', 'QUATOT']
+
+
+def scan_cost(dataset_path: Path, ticker: str):
+    """
+    Estima o custo de I/O de uma consulta por ticker a partir dos metadados.
+
+    Conta os grupos de linhas que sobrevivem às estatísticas de CODNEG e soma
+    o tamanho comprimido das colunas lidas nesses grupos.
+
+    Returns:
+        tuple[int, int, int]: (grupos lidos, grupos totais, bytes lidos).
+    """
+    dataset = open_dataset(dataset_path)
+    expression = ds.field('CODNEG') == ticker
+    scanned = total = bytes_read = 0
+    for fragment in dataset.get_fragments():
+        total += fragment.metadata.num_row_groups
+    for fragment in dataset.get_fragments(filter=expression):
+        for row_group_fragment in fragment.split_by_row_group(filter=expression):
+            metadata = row_group_fragment.metadata
+            for row_group in row_group_fragment.row_groups:
+                rg_meta = metadata.row_group(row_group.id)
+                scanned += 1
+                for i in range(rg_meta.num_columns):
+                    column = rg_meta.column(i)
+                    if column.path_in_schema in QUERY_COLUMNS:
+                        bytes_read += column.total_compressed_size
+    return scanned, total, bytes_read
+
+
+def time_history_query(processed_path: Path, ticker: str, repeat: int) -> float:
+    """Mediana da latência (s) de `get_quotes(tickers=[ticker])` sem filtro de data."""
+    with redirect_stdout(io.StringIO()):
+        analyzer = B3Data(str(processed_path))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            analyzer.get_quotes(tickers=[ticker])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def report(label: str, processed_path: Path, tickers, repeat: int):
+    print(f"\n{label}")
+    for ticker in tickers:
+        scanned, total, bytes_read = scan_cost(processed_path / DATASET_NAME, ticker)
+        latency = time_history_query(processed_path, ticker, repeat)
+        print(f" -> {ticker:<8} grupos lidos {scanned:>6,}/{total:<6,} "
+              f"bytes lidos {bytes_read / 1e6:10.2f} MB  latência {latency * 1000:9.1f} ms")
+
+
+def run_benchmark(processed_path: Path, tickers, sort_by: str, repeat: int):
+    """Mede consultas de histórico de um ticker antes e depois da compactação."""
+    print("=" * 60)
+    print("--- BENCHMARK: COMPACTAÇÃO ORDENADA DO DATASET ---")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_root = Path(tmp)
+        work_processed = tmp_root / 'processed'
+        print(" -> Copiando o dataset para um diretório temporário...")
+        shutil.copytree(processed_path / DATASET_NAME, work_processed / DATASET_NAME)
+        shutil.copy2(processed_path / 'manifesto_ingestao.json', work_processed / 'manifesto_ingestao.json')
+        shutil.copytree(processed_path.parent / 'outputs', tmp_root / 'outputs')
+
+        report("Antes (ordem dos arquivos COTAHIST)", work_processed, tickers, repeat)
+        with redirect_stdout(io.StringIO()):
+            compact_dataset(work_processed, sort_by=sort_by)
+        report(f"Depois (compactado por {sort_by})", work_processed, tickers, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bytes lidos e latência de consultas por ticker, antes e depois da compactação.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--tickers', nargs='+', default=['PETR4', 'VALE3', 'ITUB4'], help="Tickers consultados.")
+    parser.add_argument('--sort-by', default='CODNEG', choices=['CODNEG', 'CODISI'], help="Chave de ordenação.")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por consulta (usa a mediana).")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.tickers, args.sort_by, args.repeat)
@@ -0,0 +1,136 @@
+# scripts/benchmark_compression.py
+
+import io
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.storage import DATASET_NAME, STORAGE_SCHEMA, open_dataset, writer_compression_options
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+# (rótulo, especificação de compressão, leitura via memory map)
+DEFAULT_SETTINGS = [
+    ('snappy', 'snappy', False),
+    ('lz4', 'lz4', False),
+    ('lz4+mmap', 'lz4', True),
+    ('none+mmap', 'none', True),
+    ('zstd:3', 'zstd:3', False),
+    ('zstd:9', 'zstd:9', False),
+    ('zstd:19', 'zstd:19', False),
+]
+
+
+def load_sample(dataset_path: Path, year: int = None) -> tuple:
+    """
+    Carrega uma partição anual do dataset (por padrão, a mais recente), no
+    schema de armazenamento.
+
+    Returns:
+        tuple[int, pa.Table]: O ano e as linhas da amostra.
+    """
+    dataset = open_dataset(dataset_path)
+    if year is None:
+        year = pc.max(dataset.to_table(columns=['DATA_PREGAO'])['DATA_PREGAO']).as_py().year
+    columns = [c for c in STORAGE_SCHEMA.names if c in dataset.schema.names]
+    return year, dataset.to_table(columns=columns, filter=pc.year(pc.field('DATA_PREGAO')) == year)
+
+
+def write_sample(table: pa.Table, target_root: Path, year: int, compression) -> tuple:
+    """
+    Grava a amostra em 'processed/dados_b3/ANO=<ano>/amostra.parquet' com a
+    compressão informada.
+
+    Returns:
+        tuple[Path, float, int]: O diretório 'processed', o tempo de escrita (s)
+                                 e o tamanho do arquivo (bytes).
+    """
+    processed = target_root / 'processed'
+    partition = processed / DATASET_NAME / f"ANO={year}"
+    partition.mkdir(parents=True)
+    output_file = partition / 'amostra.parquet'
+
+    start = time.perf_counter()
+    pq.write_table(table, output_file, **writer_compression_options(compression))
+    elapsed = time.perf_counter() - start
+    return processed, elapsed, output_file.stat().st_size
+
+
+def time_query(analyzer: B3Data, repeat: int, **kwargs) -> float:
+    """Mediana da latência (s) de `get_quotes(**kwargs)`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            analyzer.get_quotes(**kwargs)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_benchmark(processed_path: Path, year: int, ticker: str, settings, repeat: int):
+    """
+    Regrava uma amostra do dataset com cada configuração de compressão e mede
+    tamanho, vazão de escrita e latência de leitura via `B3Data.get_quotes`.
+    """
+    print("=" * 60)
+    print("--- BENCHMARK: CODECS E NÍVEIS DE COMPRESSÃO ---")
+    print("=" * 60)
+
+    year, sample = load_sample(processed_path / DATASET_NAME, year)
+    if sample.num_rows == 0:
+        print(f" -> Nenhum registro encontrado para o ano {year}.")
+        return
+    day = pc.max(sample['DATA_PREGAO']).as_py().isoformat()
+    print(f" -> Amostra: ano {year}, {sample.num_rows:,} linhas ({sample.nbytes / 1e6:,.1f} MB em memória).")
+    print(f" -> Varredura completa: get_quotes(codbdi=<todos>); consulta pontual: {ticker} em {day}.\n")
+
+    all_codbdi = [int(v) for v in pc.unique(sample['CODBDI']).drop_null().to_pylist()]
+    print(f" {'configuração':<14} {'tamanho':>10} {'escrita':>12} {'varredura':>11} {'pontual':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (label, compression, memory_map) in enumerate(settings):
+            target_root = Path(tmp) / f"cfg{i}"
+            processed, write_time, size = write_sample(sample, target_root, year, compression)
+            shutil.copytree(processed_path.parent / 'outputs', target_root / 'outputs')
+            with redirect_stdout(io.StringIO()):
+                analyzer = B3Data(str(processed), memory_map=memory_map)
+
+            scan = time_query(analyzer, repeat, codbdi=all_codbdi)
+            point = time_query(analyzer, repeat, tickers=[ticker], start_date=day, end_date=day)
+            print(f" {label:<14} {size / 1e6:8.2f} MB {sample.nbytes / 1e6 / write_time:8.1f} MB/s "
+                  f"{scan * 1000:8.1f} ms {point * 1000:7.1f} ms")
+            shutil.rmtree(target_root)
+
+
+def parse_setting(value: str):
+    """Converte 'codec[:nível][+mmap]' em (rótulo, especificação, memory map)."""
+    spec, _, mmap = value.partition('+')
+    return value, spec, mmap == 'mmap'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tamanho, escrita e leitura do dataset com diferentes codecs.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--year', type=int, default=None, help="Ano (partição) usado como amostra (padrão: o mais recente).")
+    parser.add_argument('--ticker', default='PETR4', help="Ticker da consulta pontual.")
+    parser.add_argument('--settings', nargs='+', type=parse_setting, default=DEFAULT_SETTINGS,
+                        metavar='CODEC[:NIVEL][+mmap]', help="Configurações testadas (ex: zstd:19 lz4+mmap).")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por consulta (usa a mediana).")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.year, args.ticker, args.settings, args.repeat)
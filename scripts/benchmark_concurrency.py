@@ -0,0 +1,160 @@
+# scripts/benchmark_concurrency.py
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.synthetic import SYNTHETIC_SCALES
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+
+def query_mix(analyzer: B3Data, count: int, seed: int) -> list:
+    """
+    Monta `count` consultas variadas (get_quotes e get_panel) sobre os ativos do dicionário.
+
+    Returns:
+        list[tuple[str, dict]]: (método, argumentos), em ordem embaralhada pela semente.
+    """
+    rng = random.Random(seed)
+    tickers = analyzer.df_dicionario['ULTIMO_TICKER'].dropna()
+    stocks = sorted(tickers[tickers.str.fullmatch(r'[A-Z]{4}(3|4|11)')])
+    calendar = analyzer.trading_calendar()
+    days = [str(day.date()) for day in calendar]
+
+    def period(length: int) -> dict:
+        start = rng.randrange(max(1, len(days) - length))
+        return {'start_date': days[start], 'end_date': days[min(start + length, len(days) - 1)]}
+
+    kinds = [
+        lambda: ('get_quotes', {'tickers': rng.choice(stocks)}),
+        lambda: ('get_quotes', {'tickers': rng.sample(stocks, 5), **period(60)}),
+        lambda: ('get_quotes', {'tickers': rng.choice(stocks), 'adjusted': True}),
+        lambda: ('get_quotes', {'asset_class': 'fii', **period(0)}),
+        lambda: ('get_quotes', {'asset_class': 'equity', **period(5)}),
+        lambda: ('get_quotes', {'ticker_root': rng.choice(stocks)[:4], 'asset_class': 'options', **period(20)}),
+        lambda: ('get_panel', {'tickers': rng.sample(stocks, 20), **period(250)}),
+    ]
+    queries = [kinds[i % len(kinds)]() for i in range(count)]
+    rng.shuffle(queries)
+    return queries
+
+
+def run_query(analyzer: B3Data, query: tuple) -> float:
+    """Executa uma consulta e retorna a sua latência (s)."""
+    method, kwargs = query
+    start = time.perf_counter()
+    getattr(analyzer, method)(**kwargs)
+    return time.perf_counter() - start
+
+
+def run_concurrent(analyzer: B3Data, queries: list, concurrency: int) -> dict:
+    """Executa todas as consultas com `concurrency` threads clientes; retorna vazão e latências."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = sorted(executor.map(lambda q: run_query(analyzer, q), queries))
+    elapsed = time.perf_counter() - start
+    return {
+        'elapsed': elapsed, 'throughput': len(queries) / elapsed,
+        'p50': statistics.median(latencies), 'p95': latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+async def run_async(analyzer: B3Data, queries: list) -> float:
+    """Dispara as consultas de `get_quotes` de uma vez com `aget_quotes` e retorna o tempo total (s)."""
+    start = time.perf_counter()
+    await asyncio.gather(*(analyzer.aget_quotes(**kwargs) for method, kwargs in queries if method == 'get_quotes'))
+    return time.perf_counter() - start
+
+
+def run_benchmark(processed_path: Path, queries_count: int, concurrency_levels: list, scan_workers: list,
+                  max_concurrent_bytes: int, seed: int):
+    """Mede vazão e latência de um conjunto fixo de consultas sob concorrência crescente."""
+    print("=" * 60)
+    print("--- BENCHMARK: CONSULTAS CONCORRENTES (B3Data compartilhado) ---")
+    print("=" * 60)
+    budget = f"{max_concurrent_bytes / 1e6:,.0f} MB" if max_concurrent_bytes else "sem limite"
+    print(f" -> {queries_count} consultas variadas | CPUs: {os.cpu_count()} | orçamento de memória: {budget}")
+
+    for workers in scan_workers:
+        analyzer = B3Data(str(processed_path), scan_workers=workers, max_concurrent_bytes=max_concurrent_bytes)
+        queries = query_mix(analyzer, queries_count, seed)
+        # Aquecimento: abre o dataset e carrega índices e fatores de ajuste.
+        for query in queries[:len(set(q[0] for q in queries)) * 2]:
+            run_query(analyzer, query)
+
+        label = f"{workers} threads de leitura" if workers > 1 else "leitura do Arrow (sem pool)"
+        print(f"\n{label}")
+        baseline = None
+        for concurrency in concurrency_levels:
+            result = run_concurrent(analyzer, queries, concurrency)
+            baseline = baseline or result['throughput']
+            print(f" -> {concurrency:>3} clientes: {result['throughput']:7.1f} consultas/s "
+                  f"(x{result['throughput'] / baseline:4.1f})  p50 {result['p50'] * 1000:8.1f} ms  "
+                  f"p95 {result['p95'] * 1000:8.1f} ms")
+        elapsed = asyncio.run(run_async(analyzer, queries))
+        async_count = sum(1 for method, _ in queries if method == 'get_quotes')
+        print(f" -> aget_quotes: {async_count} consultas com asyncio.gather em {elapsed:.2f} s "
+              f"({async_count / elapsed:.1f} consultas/s)")
+        stats = analyzer.admission_stats()
+        if stats:
+            print(f" -> Admissão: {stats['waited']:,} de {stats['admitted']:,} consultas esperaram "
+                  f"({stats['wait_seconds']:.2f} s no total); pico reservado {stats['peak_bytes'] / 1e6:,.1f} MB")
+        analyzer.close()
+
+
+def synthetic_dataset(work_path: Path, scale: str) -> Path:
+    """Gera e ingere dados sintéticos na escala pedida; retorna o diretório 'processed'."""
+    from b3_analyzer.synthetic import generate_scale
+    from b3_analyzer.raw_data_processor import process_text_to_parquet
+    from b3_analyzer.dictionary_builder import create_security_master
+    from b3_analyzer.aggregates import build_aggregates
+
+    processed_path = work_path / 'processed'
+    (work_path / 'outputs').mkdir(parents=True, exist_ok=True)
+    print(f" -> Gerando e ingerindo dados sintéticos (escala '{scale}')...")
+    generate_scale(work_path / 'texts', scale)
+    process_text_to_parquet(work_path / 'texts', processed_path, workers=os.cpu_count() or 1)
+    create_security_master(processed_path, work_path / 'outputs')
+    build_aggregates(processed_path)
+    return processed_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vazão e latência de consultas concorrentes em um B3Data compartilhado.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--synthetic', default=None, choices=list(SYNTHETIC_SCALES),
+                        help="Usa dados sintéticos desta escala, gerados em um diretório temporário.")
+    parser.add_argument('--queries', type=int, default=50, help="Consultas por rodada.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 50],
+                        help="Números de clientes simultâneos medidos.")
+    parser.add_argument('--scan-workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help="Tamanhos do pool de leitura comparados (0 = leitura do Arrow).")
+    parser.add_argument('--max-concurrent-bytes', type=int, default=0,
+                        help="Orçamento de memória das consultas em andamento (0 = sem limite).")
+    parser.add_argument('--seed', type=int, default=0, help="Semente da escolha das consultas.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stdout)
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp:
+            run_benchmark(synthetic_dataset(Path(tmp), args.synthetic), args.queries, args.concurrency,
+                          args.scan_workers, args.max_concurrent_bytes, args.seed)
+    else:
+        run_benchmark(args.data_path, args.queries, args.concurrency, args.scan_workers,
+                      args.max_concurrent_bytes, args.seed)
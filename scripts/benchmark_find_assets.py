@@ -0,0 +1,92 @@
+# scripts/benchmark_find_assets.py
+
+import io
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+
+def find_assets_scan(df_dicionario: pd.DataFrame, query: str) -> pd.DataFrame:
+    """Caminho antigo: máscaras com regex e substring sobre todo o dicionário."""
+    query_upper = query.upper()
+    mask_ticker = df_dicionario['TICKERS_HISTORICOS'].str.contains(f"\\b{query_upper}\\b", regex=True, na=False)
+    mask_name = df_dicionario['NOMES_HISTORICOS'].str.contains(query_upper, regex=False, na=False)
+    mask_isin = df_dicionario['CODISI'] == query_upper
+    return df_dicionario[mask_ticker | mask_name | mask_isin].copy()
+
+
+def sample_queries(df_dicionario: pd.DataFrame, n: int, seed: int = 0) -> list:
+    """Sorteia consultas realistas: tickers, ISINs, trechos de nomes e termos inexistentes."""
+    rng = random.Random(seed)
+    tickers = df_dicionario['TICKERS_HISTORICOS'].dropna().str.split(' | ', regex=False).explode().dropna().tolist()
+    isins = df_dicionario['CODISI'].dropna().tolist()
+    names = df_dicionario['NOMES_HISTORICOS'].dropna().str.split(' | ', regex=False).explode().dropna().tolist()
+
+    queries = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            queries.append(rng.choice(tickers))
+        elif kind == 1:
+            queries.append(rng.choice(isins))
+        elif kind == 2:
+            name = rng.choice(names)
+            start = rng.randrange(max(len(name) - 4, 1))
+            queries.append(name[start:start + rng.randint(3, 8)])
+        else:
+            queries.append(f"XYZ{rng.randint(0, 999)}")
+    return queries
+
+
+def run_benchmark(processed_path: Path, n_queries: int, scan_queries: int):
+    """Compara a busca indexada com a varredura antiga e confere se os resultados são iguais."""
+    print("=" * 60)
+    print("--- BENCHMARK: BUSCA NO DICIONÁRIO DE ATIVOS ---")
+    print("=" * 60)
+
+    with redirect_stdout(io.StringIO()):
+        analyzer = B3Data(str(processed_path))
+    df = analyzer.df_dicionario
+
+    start = time.perf_counter()
+    analyzer.asset_index
+    print(f" -> Construção do índice para {len(df):,} ativos: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = sample_queries(df, n_queries)
+    start = time.perf_counter()
+    results = [analyzer.find_assets(q) for q in queries]
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    scan_sample = queries[:scan_queries]
+    start = time.perf_counter()
+    expected = [find_assets_scan(df, q) for q in scan_sample]
+    scan = (time.perf_counter() - start) / len(scan_sample)
+
+    mismatches = sum(not r.equals(e) for r, e in zip(results, expected))
+    print(f" -> Varredura (regex): {scan * 1e6:10.1f} µs por busca ({len(scan_sample):,} buscas)")
+    print(f" -> Indexada:          {indexed * 1e6:10.1f} µs por busca ({len(queries):,} buscas)")
+    print(f" -> Resultados idênticos: {'SIM' if not mismatches else f'NÃO ({mismatches} divergências)'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Busca indexada x varredura com regex em find_assets.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--queries', type=int, default=5000, help="Número de buscas indexadas.")
+    parser.add_argument('--scan-queries', type=int, default=500, help="Número de buscas pela varredura antiga.")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.queries, args.scan_queries)
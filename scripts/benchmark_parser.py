@@ -0,0 +1,105 @@
+# scripts/benchmark_parser.py
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from io import BytesIO, StringIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.raw_data_processor import (
+    COLSPECS, NAMES, DATE_COLS, PRICE_COLS, INT_COLS, parse_cotahist_bytes,
+)
+from b3_analyzer.storage import decode_storage_table
+
+TEXTS_PATH = project_root / 'data' / 'texts'
+
+# Tipos que a antiga conversão via pandas produzia (e que as consultas entregam).
+LEGACY_SCHEMA = pa.schema(
+    [(c, pa.timestamp('ns')) if c in DATE_COLS
+     else (c, pa.float64()) if c in PRICE_COLS
+     else (c, pa.int64()) if c in INT_COLS
+     else (c, pa.string())
+     for c in NAMES]
+)
+
+
+def parse_with_read_fwf(file_path: Path) -> pa.Table:
+    """Caminho antigo: `readlines` + `pd.read_fwf` + conversões coluna a coluna."""
+    with open(file_path, 'r', encoding='latin-1') as f:
+        lines = f.readlines()
+
+    df = pd.read_fwf(StringIO("".join(lines[1:-1])), colspecs=COLSPECS, names=NAMES, header=None)
+    for col in df.select_dtypes(['object']).columns:
+        df[col] = df[col].str.strip()
+    for col in DATE_COLS:
+        df[col] = pd.to_datetime(df[col], format='%Y%m%d', errors='coerce')
+    for col in PRICE_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce') / 100
+    for col in INT_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    return pa.Table.from_pandas(df, preserve_index=False).cast(LEGACY_SCHEMA)
+
+
+def parse_with_bytes(file_path: Path) -> pa.Table:
+    """Caminho novo: leitura binária + parser vetorizado (schema de armazenamento)."""
+    return parse_cotahist_bytes(file_path.read_bytes())
+
+
+def parquet_size(table: pa.Table) -> int:
+    """Tamanho, em bytes, da tabela gravada em Parquet (snappy), como na ingestão."""
+    sink = BytesIO()
+    pq.write_table(table, sink, compression='snappy')
+    return sink.tell()
+
+
+def run_benchmark(files, repeat: int = 3):
+    """
+    Mede a vazão (linhas/s) dos dois parsers, confere se os dados são idênticos
+    e compara o tamanho em Parquet e na memória dos dois schemas.
+    """
+    print("=" * 60)
+    print("--- BENCHMARK DO PARSER COTAHIST ---")
+    print("=" * 60)
+
+    for file_path in files:
+        print(f"\nArquivo: {file_path.name} ({file_path.stat().st_size / 1e6:,.1f} MB)")
+        results = {}
+        for label, parser in [('read_fwf', parse_with_read_fwf), ('bytes', parse_with_bytes)]:
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                table = parser(file_path)
+                best = min(best, time.perf_counter() - start)
+            results[label] = table
+            print(f" -> {label:<9} {table.num_rows:>12,} linhas em {best:8.3f}s "
+                  f"({table.num_rows / best:>14,.0f} linhas/s)")
+
+        legacy, compact = results['read_fwf'], results['bytes']
+        identical = legacy.equals(decode_storage_table(compact).cast(LEGACY_SCHEMA))
+        print(f" -> Tabelas idênticas: {'SIM' if identical else 'NÃO'}")
+        for label, table in [('antigo', legacy), ('compacto', compact)]:
+            print(f" -> Schema {label:<9} Parquet {parquet_size(table) / 1e6:10.2f} MB  "
+                  f"memória {table.nbytes / 1e6:10.2f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara o parser vetorizado com o caminho via pd.read_fwf.")
+    parser.add_argument('files', nargs='*', type=Path, help="Arquivos COTAHIST .txt (padrão: data/texts/*.txt).")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições por parser (usa o melhor tempo).")
+    args = parser.parse_args()
+
+    files = args.files or sorted(p for p in TEXTS_PATH.iterdir() if p.suffix.lower() == '.txt')
+    if not files:
+        print(f" -> Nenhum arquivo .txt informado ou encontrado em {TEXTS_PATH}.")
+    else:
+        run_benchmark(files, repeat=args.repeat)
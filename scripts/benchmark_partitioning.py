@@ -0,0 +1,109 @@
+# scripts/benchmark_partitioning.py
+
+import io
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.storage import DATASET_NAME, open_dataset
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+
+def build_single_file_copy(dataset_path: Path, target_root: Path) -> Path:
+    """
+    Grava o conteúdo do dataset particionado em um único 'dados_b3.parquet'
+    (layout antigo), em lotes, para servir de linha de base.
+    """
+    processed = target_root / 'processed'
+    processed.mkdir(parents=True)
+    output_file = processed / 'dados_b3.parquet'
+
+    dataset = open_dataset(dataset_path)
+    columns = [c for c in dataset.schema.names if c != 'ANO']
+    writer = None
+    for batch in dataset.to_batches(columns=columns):
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, batch.schema, compression='snappy')
+        writer.write_batch(batch)
+    if writer:
+        writer.close()
+    return processed
+
+
+def time_query(analyzer: B3Data, repeat: int, **kwargs):
+    """Executa uma consulta `repeat` vezes e retorna (mediana em segundos, linhas)."""
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            df = analyzer.get_quotes(**kwargs)
+        timings.append(time.perf_counter() - start)
+        rows = len(df)
+    return statistics.median(timings), rows
+
+
+def run_benchmark(processed_path: Path, fii: str, root: str, repeat: int):
+    """
+    Compara a latência de consultas típicas no dataset particionado e no
+    arquivo único equivalente.
+    """
+    dataset_path = processed_path / DATASET_NAME
+    last_date = pd.Timestamp(pc.max(open_dataset(dataset_path).to_table(columns=['DATA_PREGAO'])['DATA_PREGAO']).as_py())
+    week_start = (last_date - pd.Timedelta(days=7)).strftime('%Y-%m-%d')
+    day = last_date.strftime('%Y-%m-%d')
+
+    queries = {
+        'Intervalo curto (ações, 1 semana)': dict(asset_class='equity', start_date=week_start, end_date=day),
+        f'FII único ({fii}, histórico)': dict(tickers=[fii], asset_class='fii'),
+        f'Cadeia de opções ({root}, 1 dia)': dict(ticker_root=root, asset_class='options', start_date=day, end_date=day),
+    }
+
+    print("=" * 60)
+    print("--- BENCHMARK: DATASET PARTICIONADO x ARQUIVO ÚNICO ---")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_root = Path(tmp)
+        print(" -> Gerando cópia em arquivo único para comparação...")
+        single_processed = build_single_file_copy(dataset_path, tmp_root)
+        shutil.copytree(processed_path.parent / 'outputs', tmp_root / 'outputs')
+
+        with redirect_stdout(io.StringIO()):
+            layouts = {
+                'particionado': B3Data(str(processed_path)),
+                'arquivo único': B3Data(str(single_processed)),
+            }
+
+        for label, kwargs in queries.items():
+            print(f"\n{label}")
+            for layout, analyzer in layouts.items():
+                latency, rows = time_query(analyzer, repeat, **kwargs)
+                print(f" -> {layout:<14} {latency * 1000:10.1f} ms  ({rows:,} linhas)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latência de consultas: dataset particionado x arquivo único.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--fii', default='HGLG11', help="Ticker de FII para a consulta de histórico.")
+    parser.add_argument('--root', default='PETR', help="Radical do ativo-objeto para a cadeia de opções.")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por consulta (usa a mediana).")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.fii, args.root, args.repeat)
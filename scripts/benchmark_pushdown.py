@@ -0,0 +1,109 @@
+# scripts/benchmark_pushdown.py
+
+import io
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import pyarrow.parquet as pq
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.storage import PANDAS_INT_TYPES, decode_storage_table
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+
+def read_post_filtered(analyzer: B3Data, **kwargs) -> tuple:
+    """
+    Caminho antigo: lê com os filtros de pré-leitura e aplica radical, BDR e
+    especificação em pandas, depois da leitura.
+
+    Returns:
+        tuple[pd.DataFrame, int, int]: O resultado, as linhas e os bytes (Arrow)
+                                       materializados antes dos filtros de texto.
+    """
+    plan = analyzer._plan_query(kwargs)
+    filters = plan['filters']
+    table = plan['dataset'].to_table(columns=plan['columns'],
+                                     filter=pq.filters_to_expression(filters) if filters else None)
+    rows, nbytes = table.num_rows, table.nbytes
+    table = table.sort_by([('CODNEG', 'ascending'), ('DATA_PREGAO', 'ascending')])
+    df = decode_storage_table(table).to_pandas(types_mapper=PANDAS_INT_TYPES.get)
+    if plan['ticker_root']:
+        df = df[df['CODNEG'].str.startswith(plan['ticker_root'].upper(), na=False)]
+    if plan['bdr']:
+        df = df[df['ESPECI'].str.contains('DR', na=False, case=False)]
+    espec_value = plan['especificacao']
+    if espec_value is not None:
+        if not isinstance(espec_value, list): espec_value = [espec_value]
+        df = df[df['ESPECI'].str.contains('|'.join(espec_value), na=False, case=False, regex=True)]
+    return df.reset_index(drop=True), rows, nbytes
+
+
+def read_pushed_down(analyzer: B3Data, **kwargs) -> tuple:
+    """
+    Caminho atual: todos os filtros avaliados pelo Arrow durante a leitura.
+
+    Returns:
+        tuple[pd.DataFrame, int, int]: O resultado, as linhas e os bytes (Arrow) lidos.
+    """
+    plan = analyzer._plan_query(kwargs)
+    table = plan['dataset'].to_table(columns=plan['columns'], filter=plan['expression'])
+    with redirect_stdout(io.StringIO()):
+        df = analyzer.get_quotes(**kwargs)
+    return df, table.num_rows, table.nbytes
+
+
+def time_call(fn, repeat: int) -> float:
+    """Mediana da latência (s) de `fn()`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_benchmark(processed_path: Path, roots, repeat: int):
+    """Compara consultas de opções por radical com filtros em pandas e no Arrow."""
+    print("=" * 60)
+    print("--- BENCHMARK: FILTROS DE TEXTO NA LEITURA (PUSHDOWN) ---")
+    print("=" * 60)
+
+    with redirect_stdout(io.StringIO()):
+        analyzer = B3Data(str(processed_path))
+
+    queries = [(f"opções {root}", dict(asset_class='options', ticker_root=root)) for root in roots]
+    queries.append(("BDRs", dict(asset_class='bdr', codbdi=[2, 96])))
+    queries.append(("ON/PN", dict(codbdi=2, especificacao=['ON', 'PN'])))
+
+    print(f" {'consulta':<16} {'caminho':<10} {'linhas lidas':>13} {'MB lidos':>10} {'latência':>11} {'resultado':>10}")
+    for label, kwargs in queries:
+        before, rows_before, bytes_before = read_post_filtered(analyzer, **kwargs)
+        after, rows_after, bytes_after = read_pushed_down(analyzer, **kwargs)
+        t_before = time_call(lambda: read_post_filtered(analyzer, **kwargs), repeat)
+        with redirect_stdout(io.StringIO()):
+            t_after = time_call(lambda: analyzer.get_quotes(**kwargs), repeat)
+        same = before.equals(after) or (before.empty and after.empty)
+        print(f" {label:<16} {'pandas':<10} {rows_before:>13,} {bytes_before / 1e6:>10.2f} "
+              f"{t_before * 1000:>8.1f} ms {len(before):>10,}")
+        print(f" {'':<16} {'arrow':<10} {rows_after:>13,} {bytes_after / 1e6:>10.2f} "
+              f"{t_after * 1000:>8.1f} ms {len(after):>10,}  {'(idêntico)' if same else '(DIVERGENTE)'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Filtros de radical/BDR/especificação: pandas x Arrow.")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--roots', nargs='+', default=['VALE', 'PETR'], help="Radicais das consultas de opções.")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por consulta (usa a mediana).")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.roots, args.repeat)
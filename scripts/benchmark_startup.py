@@ -0,0 +1,96 @@
+# scripts/benchmark_startup.py
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+PROCESSED_PATH = project_root / 'data' / 'processed'
+
+# Executado em um processo novo a cada repetição, para medir a partida "a frio"
+# do interpretador (imports incluídos), como em um worker ou chamada de CLI.
+STARTUP_CODE = """
+import io, sys, json, time
+from contextlib import redirect_stdout
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import b3_analyzer.analyzer
+t1 = time.perf_counter()
+with redirect_stdout(io.StringIO()):
+    analyzer = b3_analyzer.analyzer.B3Data({data_path!r})
+t2 = time.perf_counter()
+analyzer.find_assets('PETR4')
+t3 = time.perf_counter()
+print(json.dumps({{'import': t1 - t0, 'init': t2 - t1, 'first_search': t3 - t2}}))
+"""
+
+# O caminho antigo: planilhas de códigos via openpyxl e dicionário em Parquet.
+LEGACY_CODE = """
+import sys, json, time, tempfile
+from pathlib import Path
+sys.path.insert(0, {src!r})
+import pandas as pd
+from b3_analyzer.codes import CODBDI_DESCRIPTIONS, TPMERC_DESCRIPTIONS
+with tempfile.TemporaryDirectory() as tmp:
+    paths = []
+    for name, codes in [('CODBDI', CODBDI_DESCRIPTIONS), ('TPMERC', TPMERC_DESCRIPTIONS)]:
+        path = Path(tmp) / f'{{name}}.xlsx'
+        pd.DataFrame(list(codes.items()), columns=[name, f'DESCRICAO_{{name}}']).to_excel(path, index=False)
+        paths.append(path)
+    t0 = time.perf_counter()
+    for path in paths:
+        pd.read_excel(path)
+    t1 = time.perf_counter()
+    pd.read_parquet({parquet!r})
+    t2 = time.perf_counter()
+print(json.dumps({{'excel': t1 - t0, 'parquet': t2 - t1}}))
+"""
+
+
+def run_subprocess(code: str, repeat: int) -> dict:
+    """Executa `code` em `repeat` processos novos e retorna a mediana de cada medida (s)."""
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def run_benchmark(processed_path: Path, repeat: int):
+    """Mede o tempo de `import b3_analyzer.analyzer` + `B3Data()` em processos novos."""
+    print("=" * 60)
+    print("--- BENCHMARK: INICIALIZAÇÃO DO B3Data ---")
+    print("=" * 60)
+
+    outputs_path = processed_path.parent / 'outputs'
+    source = 'Arrow IPC' if (outputs_path / 'dicionario_ativos.arrow').exists() else 'Parquet'
+    print(f" -> Dicionário de ativos lido de: {source} ({repeat} repetições, mediana)\n")
+
+    timings = run_subprocess(STARTUP_CODE.format(src=str(src_path), data_path=str(processed_path)), repeat)
+    print(f" -> import b3_analyzer.analyzer: {timings['import'] * 1000:8.1f} ms")
+    print(f" -> B3Data():                    {timings['init'] * 1000:8.1f} ms")
+    print(f" -> Primeira busca (índices):    {timings['first_search'] * 1000:8.1f} ms")
+    print(f" -> Total até o analisador:      {(timings['import'] + timings['init']) * 1000:8.1f} ms")
+
+    parquet = outputs_path / 'dicionario_ativos.parquet'
+    if parquet.exists():
+        legacy = run_subprocess(LEGACY_CODE.format(src=str(src_path), parquet=str(parquet)), repeat)
+        print("\n -> Referência (caminho antigo, sem os imports):")
+        print(f"    -> Planilhas de CODBDI/TPMERC (openpyxl): {legacy['excel'] * 1000:8.1f} ms")
+        print(f"    -> dicionario_ativos.parquet:            {legacy['parquet'] * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tempo de inicialização de B3Data (import + construtor).")
+    parser.add_argument('--data-path', type=Path, default=PROCESSED_PATH, help="Diretório 'processed'.")
+    parser.add_argument('--repeat', type=int, default=5, help="Processos por medida (usa a mediana).")
+    args = parser.parse_args()
+    run_benchmark(args.data_path, args.repeat)
@@ -0,0 +1,247 @@
+# scripts/benchmark_suite.py
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import datetime
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.analyzer import B3Data
+from b3_analyzer.aggregates import build_aggregates
+from b3_analyzer.dictionary_builder import create_security_master
+from b3_analyzer.metrics import add_metrics_hook, remove_metrics_hook, reset_peak_rss
+from b3_analyzer.raw_data_processor import process_text_to_parquet
+from b3_analyzer.synthetic import SYNTHETIC_SCALES, generate_scale
+
+BENCHMARKS_PATH = project_root / 'data' / 'benchmarks'
+# Versão do formato do JSON de resultados (mudar se as medidas mudarem de significado).
+RESULTS_VERSION = 1
+
+# Executado em um processo novo a cada repetição (partida "a frio", imports incluídos).
+STARTUP_CODE = """
+import sys, json, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import b3_analyzer.analyzer
+t1 = time.perf_counter()
+analyzer = b3_analyzer.analyzer.B3Data({data_path!r})
+t2 = time.perf_counter()
+analyzer.find_assets({ticker!r})
+t3 = time.perf_counter()
+print(json.dumps({{'import': t1 - t0, 'init': t2 - t1, 'first_search': t3 - t2}}))
+"""
+
+
+def query_mix(sample: dict, first_day: str, last_day: str) -> list:
+    """
+    O conjunto fixo de consultas medido, montado sobre a amostra do gerador.
+
+    Returns:
+        list[tuple[str, Callable[[B3Data], object]]]: (nome, consulta).
+    """
+    top, mid = sample['acoes'][0], sample['acoes'][len(sample['acoes']) // 2]
+    root = sample['radicais_opcoes'][0]
+    company = sample['empresas'][0]
+    mid_day = str(pd.Timestamp(first_day) + (pd.Timestamp(last_day) - pd.Timestamp(first_day)) / 2)[:10]
+    return [
+        ('ticker_historico', lambda a: a.get_quotes(tickers=top)),
+        ('ticker_ajustado', lambda a: a.get_quotes(tickers=top, adjusted=True)),
+        ('tickers_periodo', lambda a: a.get_quotes(tickers=sample['acoes'][:10], start_date=first_day,
+                                                   end_date=mid_day)),
+        ('entidade', lambda a: a.get_quotes(entity=company)),
+        ('classe_fii_dia', lambda a: a.get_quotes(asset_class='fii', start_date=mid_day, end_date=mid_day)),
+        ('classe_bdr_periodo', lambda a: a.get_quotes(asset_class='bdr', start_date=first_day, end_date=mid_day)),
+        ('opcoes_radical', lambda a: a.get_quotes(ticker_root=root, asset_class='options')),
+        ('cadeia_opcoes', lambda a: a.get_options_chain(root, date=mid_day)),
+        ('painel_precos', lambda a: a.get_panel(tickers=sample['acoes'][:20], start_date=first_day, end_date=last_day)),
+        ('muitos_ativos', lambda a: a.get_quotes_many([top, mid] + sample['fiis'][:3] + sample['bdrs'][:3])),
+        ('busca_ticker', lambda a: a.find_assets(mid)),
+        ('busca_nome', lambda a: a.find_assets(company.split()[0][:4])),
+    ]
+
+
+def time_call(func, repeat: int) -> dict:
+    """Executa `func` uma vez (a frio) e mais `repeat` vezes; retorna os tempos (s) e o tamanho do resultado."""
+    start = time.perf_counter()
+    result = func()
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    rows = len(result) if hasattr(result, '__len__') else None
+    return {'primeira_s': first, 'mediana_s': statistics.median(timings), 'min_s': min(timings), 'linhas': rows}
+
+
+def run_startup(processed_path: Path, ticker: str, repeat: int) -> dict:
+    """Mediana (s) de import, `B3Data()` e primeira busca, cada repetição em um processo novo."""
+    code = STARTUP_CODE.format(src=str(src_path), data_path=str(processed_path), ticker=ticker)
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {f'{key}_s': statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def stage_result(event: dict) -> dict:
+    """(Helper Interno) As medidas de um evento 'etapa' que entram no JSON de resultados."""
+    result = {key: event.get(key) for key in ['duracao_s', 'linhas', 'linhas_por_s', 'bytes_entrada',
+                                              'bytes_saida', 'pico_rss_bytes']}
+    if event.get('bytes_entrada') and event.get('duracao_s'):
+        result['mb_por_s'] = round(event['bytes_entrada'] / 1e6 / event['duracao_s'], 2)
+    return result
+
+
+def environment() -> dict:
+    """Versões e máquina em que o benchmark rodou, para comparar execuções."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit, 'python': platform.python_version(), 'plataforma': platform.platform(),
+        'cpus': os.cpu_count(), 'pyarrow': pa.__version__, 'pandas': pd.__version__, 'numpy': np.__version__,
+    }
+
+
+def run_benchmark(work_path: Path, scale: str, seed: int, workers: int, repeat: int, startup_repeat: int) -> dict:
+    """Gera os dados sintéticos, executa o pipeline e as consultas e retorna os resultados."""
+    texts_path, processed_path = work_path / 'texts', work_path / 'processed'
+    for path in [texts_path, processed_path, work_path / 'outputs']:
+        shutil.rmtree(path, ignore_errors=True)
+    (work_path / 'outputs').mkdir(parents=True)
+    results = {}
+
+    start = time.perf_counter()
+    summary = generate_scale(texts_path, scale, seed=seed)
+    results['geracao'] = {'duracao_s': time.perf_counter() - start}
+    print(f" -> Dados: {summary['registros']:,} registros, {summary['pregoes']} pregões, "
+          f"{summary['bytes'] / 1e6:.1f} MB ({results['geracao']['duracao_s']:.1f} s)")
+
+    # As etapas do pipeline são medidas pelos próprios eventos de `b3_analyzer.metrics`.
+    stages = {}
+    hook = lambda event: stages.__setitem__(event['etapa'], event) if event['evento'] == 'etapa' else None
+    add_metrics_hook(hook)
+    try:
+        # O pico de memória de cada etapa é zerado antes dela (as etapas não o zeram).
+        reset_peak_rss()
+        process_text_to_parquet(texts_path, processed_path, workers=workers, full_rebuild=True)
+        reset_peak_rss()
+        create_security_master(processed_path, work_path / 'outputs')
+        reset_peak_rss()
+        build_aggregates(processed_path)
+    finally:
+        remove_metrics_hook(hook)
+    for name, key in [('ingestao', 'ingestao'), ('dicionario_ativos', 'dicionario'), ('agregados', 'agregados')]:
+        results[key] = stage_result(stages[name])
+        line = f" -> {key:<12} {results[key]['duracao_s']:8.2f} s"
+        if results[key].get('linhas_por_s'):
+            line += f"  {results[key]['linhas_por_s']:>12,.0f} linhas/s"
+        if results[key].get('mb_por_s'):
+            line += f"  {results[key]['mb_por_s']:8.1f} MB/s"
+        print(line)
+
+    sample = summary['amostra']
+    results['inicializacao'] = run_startup(processed_path, sample['acoes'][0], startup_repeat)
+    print(f" -> inicializacao {sum(results['inicializacao'].values()) * 1000:8.1f} ms "
+          f"(import + B3Data() + primeira busca)")
+
+    analyzer = B3Data(str(processed_path))
+    calendar = analyzer.trading_calendar()
+    first_day, last_day = str(calendar[0].date()), str(calendar[-1].date())
+    results['consultas'] = {}
+    for name, query in query_mix(sample, first_day, last_day):
+        timing = time_call(lambda: query(analyzer), repeat)
+        results['consultas'][name] = timing
+        print(f"    -> {name:<20} mediana {timing['mediana_s'] * 1000:9.1f} ms  "
+              f"a frio {timing['primeira_s'] * 1000:9.1f} ms  linhas {timing['linhas'] or 0:>9,}")
+
+    parameters = {'escala': scale, **SYNTHETIC_SCALES[scale], 'semente': seed, 'workers': workers,
+                  'repeticoes': repeat, 'repeticoes_inicializacao': startup_repeat}
+    data = {'registros': summary['registros'], 'pregoes': summary['pregoes'], 'bytes': summary['bytes']}
+    return {'versao': RESULTS_VERSION, 'gerado_em': datetime.datetime.now().isoformat(timespec='seconds'),
+            'ambiente': environment(), 'parametros': parameters, 'dados': data, 'resultados': results}
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """(Helper Interno) As medidas de tempo aninhadas como {'consultas.entidade.mediana_s': valor}."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif key.endswith('_s') and not key.endswith('_por_s') and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(base: dict, current: dict):
+    """Mostra a variação de cada tempo entre dois JSONs de resultados (negativo = mais rápido)."""
+    print("\n" + "=" * 60)
+    print(f"--- COMPARAÇÃO COM {base['ambiente'].get('commit')} ({base['gerado_em']}) ---")
+    print("=" * 60)
+    if base['parametros'] != current['parametros']:
+        print(" -> AVISO: parâmetros diferentes; as medidas não são diretamente comparáveis.")
+    before, after = flatten(base['resultados']), flatten(current['resultados'])
+    for name in sorted(before.keys() & after.keys()):
+        if name.endswith('primeira_s') or name.endswith('min_s') or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f" -> {name:<45} {before[name] * 1000:10.1f} -> {after[name] * 1000:10.1f} ms  {change:+7.1f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark reprodutível (ingestão, dicionário, inicialização e "
+                                                 "consultas) sobre dados COTAHIST sintéticos.")
+    parser.add_argument('--scale', default='media', choices=list(SYNTHETIC_SCALES), help="Escala dos dados gerados.")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do gerador.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos da ingestão.")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetições por consulta (usa a mediana).")
+    parser.add_argument('--startup-repeat', type=int, default=3, help="Processos na medida de inicialização.")
+    parser.add_argument('--work-dir', type=Path, default=None,
+                        help="Diretório dos dados gerados (padrão: temporário, apagado ao final).")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Arquivo JSON de resultados (padrão: data/benchmarks/<data>_<commit>_<escala>.json).")
+    parser.add_argument('--compare', type=Path, default=None, help="JSON de uma execução anterior para comparar.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stdout)
+
+    print("=" * 60)
+    print(f"--- BENCHMARK: SUÍTE SINTÉTICA (escala '{args.scale}', semente {args.seed}) ---")
+    print("=" * 60)
+    if args.work_dir:
+        results = run_benchmark(args.work_dir, args.scale, args.seed, args.workers, args.repeat, args.startup_repeat)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run_benchmark(Path(tmp), args.scale, args.seed, args.workers, args.repeat, args.startup_repeat)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = BENCHMARKS_PATH / f"{stamp}_{results['ambiente']['commit'] or 'local'}_{args.scale}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\n -> Resultados salvos em: {output}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding='utf-8')), results)
@@ -0,0 +1,177 @@
+# scripts/check_adjustments.py
+
+import sys
+import argparse
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.adjustments import (
+    ADJUSTMENT_SOURCE_COLUMNS, AdjustmentAccumulator, AdjustmentFactors, derive_adjustment_events,
+)
+
+# Um ativo (CODISI) por cenário.
+FATCOT_AND_SPLIT = 'BRFATCACNOR0'
+REVERSE_SPLIT = 'BRGRUPACNOR0'
+YEAR_BOUNDARY = 'BRANOVACNOR0'
+NOT_AN_EVENT = 'BRSALTACNOR0'
+
+
+def trading_days(start: str, end: str) -> list:
+    """Os dias úteis (segunda a sexta) entre `start` e `end`, inclusive."""
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    return [day.astype(datetime.date) for day in days[np.is_busday(days)]]
+
+
+def price_series(isin: str, days: list, price: float, changes: dict, fatcot_changes: dict = None) -> list:
+    """
+    Cotações de um ativo com preço por unidade constante, exceto nos saltos pedidos.
+
+    Args:
+        changes (dict): data -> razão aplicada ao preço por unidade a partir
+                        dessa data (ex: 0.5 em um desdobramento 2:1).
+        fatcot_changes (dict): data -> FATCOT a partir dessa data (preços por lote).
+
+    Returns:
+        list[dict]: Uma linha por pregão, nas colunas de `ADJUSTMENT_SOURCE_COLUMNS`
+                    (preços em centavos, por lote de FATCOT unidades).
+    """
+    rows, fatcot = [], 1
+    for day in days:
+        price *= changes.get(day, 1)
+        fatcot = (fatcot_changes or {}).get(day, fatcot)
+        cents = round(price * fatcot * 100)
+        rows.append({'CODISI': isin, 'DATA_PREGAO': day, 'TPMERC': 10, 'FATCOT': fatcot,
+                     'PREABE': cents, 'PREULT': cents, 'VOLTOT': 1_000_000})
+    return rows
+
+
+def build_scenarios() -> tuple:
+    """
+    Monta as cotações dos cenários e os eventos que devem sair delas.
+
+    Returns:
+        tuple: (pa.Table com as cotações, dict CODISI -> eventos esperados).
+    """
+    days_2020 = trading_days('2020-10-01', '2020-12-31')
+    days_2021 = trading_days('2021-01-04', '2021-02-26')
+    days = days_2020 + days_2021
+    d = {name: datetime.date.fromisoformat(name) for name in
+         ['2020-10-15', '2020-11-16', '2020-12-01', '2021-01-04', '2021-02-01', '2021-02-10']}
+
+    rows = []
+    # FATCOT 1000 -> 1 (preço por lote de mil vira por unidade) e, depois, desdobramento 2:1.
+    rows += price_series(FATCOT_AND_SPLIT, days, 12.0, {d['2020-11-16']: 0.5},
+                         {days[0]: 1000, d['2020-10-15']: 1})
+    # Grupamento 1:4 (o preço por unidade quadruplica).
+    rows += price_series(REVERSE_SPLIT, days, 0.8, {d['2020-12-01']: 4})
+    # Desdobramento 2:1 no primeiro pregão do ano: os anos chegam em segmentos diferentes.
+    rows += price_series(YEAR_BOUNDARY, days, 30.0, {d['2021-01-04']: 0.5})
+    # Saltos que não são eventos: 2,1x (longe de uma fração simples) e 1,5x (abaixo do limiar).
+    rows += price_series(NOT_AN_EVENT, days, 20.0, {d['2021-02-01']: 2.1, d['2021-02-10']: 1 / 1.5})
+    # Linhas que não entram na derivação: mercado fracionário e um registro de menor volume no mesmo dia.
+    rows.append({**rows[0], 'TPMERC': 20, 'PREABE': 1, 'PREULT': 1})
+    rows.append({**rows[len(days) + 5], 'PREABE': 999_999, 'PREULT': 999_999, 'VOLTOT': 1})
+
+    schema = pa.schema([
+        ('CODISI', pa.string()), ('DATA_PREGAO', pa.date32()), ('TPMERC', pa.int16()), ('FATCOT', pa.int32()),
+        ('PREABE', pa.int64()), ('PREULT', pa.int64()), ('VOLTOT', pa.int64()),
+    ])
+    table = pa.Table.from_pylist(rows, schema=schema).select(ADJUSTMENT_SOURCE_COLUMNS)
+    expected = {
+        FATCOT_AND_SPLIT: [(d['2020-10-15'], 1 / 1000, 'FATCOT'), (d['2020-11-16'], 0.5, 'PRECO')],
+        REVERSE_SPLIT: [(d['2020-12-01'], 4.0, 'PRECO')],
+        YEAR_BOUNDARY: [(d['2021-01-04'], 0.5, 'PRECO')],
+        NOT_AN_EVENT: [],
+    }
+    return table, expected
+
+
+def events_by_isin(events: pa.Table) -> dict:
+    """(Helper Interno) Os eventos de uma tabela como dict CODISI -> [(data, fator, origem)]."""
+    result = {}
+    for row in events.to_pylist():
+        result.setdefault(row['CODISI'], []).append((row['DATA_EVENTO'], row['FATOR'], row['ORIGEM']))
+    return result
+
+
+def same_events(found: list, expected: list) -> bool:
+    """(Helper Interno) Mesmas datas e origens, e fatores iguais a menos de arredondamento."""
+    return len(found) == len(expected) and all(
+        f[0] == e[0] and f[2] == e[2] and abs(f[1] / e[1] - 1) < 1e-9 for f, e in zip(found, expected))
+
+
+def run_checks(verbose: bool) -> int:
+    """Executa as verificações e retorna o número de falhas."""
+    print("=" * 60)
+    print("--- VERIFICAÇÃO DOS FATORES DE AJUSTE DE PREÇOS ---")
+    print("=" * 60)
+    table, expected = build_scenarios()
+    failures = 0
+
+    def check(label: str, ok: bool, detail=None):
+        nonlocal failures
+        failures += not ok
+        print(f" -> [{'OK' if ok else 'FALHA'}] {label}")
+        if detail is not None and (verbose or not ok):
+            print(f"    {detail}")
+
+    events = derive_adjustment_events(table)
+    found = events_by_isin(events)
+    for isin, wanted in expected.items():
+        check(f"eventos de {isin}", same_events(found.get(isin, []), wanted), found.get(isin, []))
+
+    # Em fluxo: um bloco por ano (dois segmentos) e blocos de poucas linhas em ordem de data.
+    years = pc.year(table['DATA_PREGAO'])
+    by_year = AdjustmentAccumulator()
+    for year in (2020, 2021):
+        by_year.update(table.filter(pc.equal(years, year)))
+    check("AdjustmentAccumulator (um bloco por ano) = derive_adjustment_events", by_year.result().equals(events))
+    by_day = AdjustmentAccumulator()
+    ordered = table.sort_by('DATA_PREGAO')
+    for batch in ordered.to_batches(max_chunksize=4):
+        by_day.update(pa.Table.from_batches([batch]))
+    check("AdjustmentAccumulator (blocos pequenos) = derive_adjustment_events", by_day.result().equals(events))
+
+    # Fatores por linha: o evento vale para os pregões anteriores à sua data, não para o próprio dia.
+    factors = AdjustmentFactors(events)
+    probes = [
+        (FATCOT_AND_SPLIT, '2020-10-14', 0.001 * 0.5), (FATCOT_AND_SPLIT, '2020-10-15', 0.5),
+        (FATCOT_AND_SPLIT, '2020-11-13', 0.5), (FATCOT_AND_SPLIT, '2020-11-16', 1.0),
+        (REVERSE_SPLIT, '2020-11-30', 4.0), (REVERSE_SPLIT, '2020-12-01', 1.0),
+        (YEAR_BOUNDARY, '2020-12-31', 0.5), (YEAR_BOUNDARY, '2021-01-04', 1.0),
+        (NOT_AN_EVENT, '2021-01-29', 1.0), ('BRDESCONHEC0', '2020-10-01', 1.0),
+    ]
+    values = factors.factors(pa.array([p[0] for p in probes]),
+                             pa.array([datetime.date.fromisoformat(p[1]) for p in probes], pa.date32()))
+    for (isin, day, wanted), value in zip(probes, values):
+        check(f"fator de {isin} em {day} = {wanted:g}", abs(value / wanted - 1) < 1e-9, value)
+
+    # Preços ajustados contínuos: o fechamento ajustado não salta nos eventos.
+    for isin in (FATCOT_AND_SPLIT, REVERSE_SPLIT, YEAR_BOUNDARY):
+        rows = table.filter(pc.and_(pc.equal(table['CODISI'], isin), pc.equal(table['VOLTOT'], 1_000_000)))
+        rows = rows.filter(pc.equal(rows['TPMERC'], 10)).sort_by('DATA_PREGAO')
+        adjusted = rows['PREULT'].to_numpy() * factors.factors(rows['CODISI'], rows['DATA_PREGAO'])
+        check(f"série ajustada de {isin} sem saltos", np.allclose(adjusted, adjusted[-1], rtol=0.01),
+              f"de {adjusted.min():.1f} a {adjusted.max():.1f} centavos")
+
+    print("=" * 60)
+    print(f"--- {failures} FALHA(S) ---" if failures else "--- TODAS AS VERIFICAÇÕES PASSARAM ---")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Verifica a derivação e a aplicação dos fatores de ajuste em cenários sintéticos conhecidos.")
+    parser.add_argument('--verbose', action='store_true', help="Mostra os valores de todas as verificações.")
+    args = parser.parse_args()
+    sys.exit(1 if run_checks(args.verbose) else 0)
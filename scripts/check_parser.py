@@ -0,0 +1,122 @@
+# scripts/check_parser.py
+
+import io
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.raw_data_processor import COTAHIST_LAYOUT, iter_record_chunks, parse_cotahist_bytes
+from b3_analyzer.storage import decode_storage_table
+from b3_analyzer.synthetic import generate_cotahist
+
+from benchmark_parser import LEGACY_SCHEMA, parse_with_read_fwf
+
+# Nomes com acentos (latin-1, como nos arquivos da B3), gravados em NOMRES (12 posições).
+ACCENTED_NAMES = ['CONSTRUÇÃO', 'AÇÚCAR ÉLIS', 'PETROLÍFERA', 'SÃO JOSÉ']
+
+
+def build_sample(directory: Path) -> bytes:
+    """
+    Gera um COTAHIST pequeno e troca o NOMRES de alguns registros por nomes acentuados.
+
+    Returns:
+        bytes: O conteúdo do arquivo (CRLF, com header e trailer).
+    """
+    info = generate_cotahist(directory, days=3, equities=10, fiis=3, bdrs=3, option_underlyings=2, strikes=2)
+    lines = (directory / info['arquivos'][0]).read_bytes().split(b'\r\n')
+    start, end = COTAHIST_LAYOUT['NOMRES']
+    for i, name in enumerate(ACCENTED_NAMES, start=1):
+        field = name.encode('latin-1').ljust(end - start + 1)
+        lines[i * 7] = lines[i * 7][:start - 1] + field + lines[i * 7][end:]
+    return b'\r\n'.join(lines)
+
+
+def parse_legacy(data: bytes, directory: Path) -> pa.Table:
+    """(Helper Interno) Converte `data` pelo caminho antigo (`pd.read_fwf`), via arquivo temporário."""
+    path = directory / 'legado.txt'
+    path.write_bytes(data)
+    return parse_with_read_fwf(path)
+
+
+def parse_new(data: bytes) -> pa.Table:
+    """(Helper Interno) Converte `data` pelo parser de bytes, nos tipos do caminho antigo."""
+    return decode_storage_table(parse_cotahist_bytes(data)).cast(LEGACY_SCHEMA)
+
+
+def run_checks(chunk_bytes: int, verbose: bool) -> int:
+    """Executa as verificações e retorna o número de falhas."""
+    print("=" * 60)
+    print("--- VERIFICAÇÃO DO PARSER COTAHIST (BYTES x READ_FWF) ---")
+    print("=" * 60)
+    failures = 0
+
+    def check(label: str, ok: bool, detail=None):
+        nonlocal failures
+        failures += not ok
+        print(f" -> [{'OK' if ok else 'FALHA'}] {label}")
+        if detail is not None and (verbose or not ok):
+            print(f"    {detail}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        data = build_sample(directory / 'sintetico')
+        legacy = parse_legacy(data, directory)
+        new = parse_new(data)
+        check("arquivo CRLF = read_fwf", new.equals(legacy), f"{new.num_rows} x {legacy.num_rows} linhas")
+        names = set(new['NOMRES'].to_pylist())
+        check("NOMRES com acentos (latin-1) preservados", all(name in names for name in ACCENTED_NAMES),
+              sorted(n for n in names if not n.isascii()))
+
+        # Sem CRLF final e só com LF: mesmo resultado do arquivo original.
+        check("sem quebra de linha final", parse_new(data.rstrip(b'\r\n')).equals(legacy))
+        check("terminadores LF", parse_new(data.replace(b'\r\n', b'\n')).equals(legacy))
+
+        # Linhas em branco no meio do arquivo: read_fwf as ignora, e o parser também.
+        lines = data.split(b'\r\n')
+        blank = b'\r\n'.join(lines[:5] + [b''] + lines[5:9] + [b' ' * 20] + lines[9:])
+        check("linhas em branco no meio = read_fwf", parse_new(blank).equals(parse_legacy(blank, directory)))
+        # Linhas em branco no fim: o caminho antigo (lines[1:-1]) tomaria a última
+        # linha em branco pelo trailer; o parser descarta o trailer pelo TIPREG.
+        check("linhas em branco no fim", parse_new(data + b'\r\n\r\n').equals(legacy))
+
+        # Leitura em fluxo com blocos que cortam registros no meio.
+        stream = io.BytesIO(data)
+        chunks = list(iter_record_chunks(stream, chunk_bytes))
+        chunked = pa.concat_tables(parse_new(chunk) for chunk in chunks)
+        check(f"blocos de {chunk_bytes} bytes ({len(chunks)} blocos) = arquivo inteiro",
+              chunked.equals(legacy))
+        unterminated = list(iter_record_chunks(io.BytesIO(data.rstrip(b'\r\n')), chunk_bytes))
+        check("blocos sem quebra de linha final",
+              pa.concat_tables(parse_new(chunk) for chunk in unterminated).equals(legacy))
+
+        # Registros malformados (truncado ou com bytes a mais) são rejeitados.
+        for label, record in [("registro truncado", lines[3][:-10]), ("registro longo", lines[3] + b'0000')]:
+            malformed = b'\r\n'.join(lines[:3] + [record] + lines[4:])
+            try:
+                parse_cotahist_bytes(malformed)
+                check(f"{label} rejeitado", False, "nenhum erro levantado")
+            except ValueError as e:
+                check(f"{label} rejeitado", True, e)
+
+    print("=" * 60)
+    print(f"--- {failures} FALHA(S) ---" if failures else "--- TODAS AS VERIFICAÇÕES PASSARAM ---")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Verifica se o parser de bytes equivale ao antigo read_fwf em um COTAHIST sintético pequeno.")
+    parser.add_argument('--chunk-bytes', type=int, default=1000,
+                        help="Tamanho dos blocos da leitura em fluxo (não múltiplo do registro).")
+    parser.add_argument('--verbose', action='store_true', help="Mostra os detalhes de todas as verificações.")
+    args = parser.parse_args()
+    sys.exit(1 if run_checks(args.chunk_bytes, args.verbose) else 0)
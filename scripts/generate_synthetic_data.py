@@ -0,0 +1,57 @@
+# scripts/generate_synthetic_data.py
+
+import sys
+import argparse
+from pathlib import Path
+
+# --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
+project_root = Path(__file__).resolve().parents[1]
+src_path = project_root / 'src'
+if str(src_path) not in sys.path:
+    sys.path.append(str(src_path))
+
+from b3_analyzer.synthetic import SYNTHETIC_SCALES, generate_scale
+
+DATA_PATH = project_root / 'data'
+
+
+def main(args):
+    """Gera os arquivos COTAHIST sintéticos e mostra um resumo do que foi gravado."""
+    output_path = args.output or (DATA_PATH / ('raw' if args.zip else 'texts'))
+    overrides = {key: value for key, value in [
+        ('days', args.days), ('equities', args.equities), ('fiis', args.fiis), ('bdrs', args.bdrs),
+        ('option_underlyings', args.option_underlyings), ('strikes', args.strikes),
+    ] if value is not None}
+
+    print("=" * 60)
+    print("--- GERADOR DE ARQUIVOS COTAHIST SINTÉTICOS ---")
+    print("=" * 60)
+    print(f" -> Escala: {args.scale} {overrides or ''} | semente {args.seed}")
+    summary = generate_scale(output_path, args.scale, seed=args.seed, compress=args.zip,
+                             start_date=args.start_date, **overrides)
+    print(f" -> {len(summary['arquivos'])} arquivo(s) em '{output_path}': {', '.join(summary['arquivos'])}")
+    print(f" -> {summary['registros']:,} registros, {summary['pregoes']} pregões, "
+          f"{summary['bytes'] / 1e6:.1f} MB em disco")
+    sample = summary['amostra']
+    print(f" -> Mais líquidos: {', '.join(sample['acoes'][:5])} | FIIs: {', '.join(sample['fiis'][:3])} "
+          f"| BDRs: {', '.join(sample['bdrs'][:3])} | opções: {', '.join(sample['radicais_opcoes'][:3])}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera arquivos COTAHIST sintéticos (layout de largura fixa da B3).")
+    parser.add_argument('--scale', default='pequena', choices=list(SYNTHETIC_SCALES),
+                        help="Escala pronta (pregões x instrumentos).")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Diretório de saída (padrão: data/texts, ou data/raw com --zip).")
+    parser.add_argument('--zip', action='store_true', help="Grava cada ano em um .ZIP, como os downloads da B3.")
+    parser.add_argument('--seed', type=int, default=0, help="Semente (mesma semente, mesmos arquivos).")
+    parser.add_argument('--start-date', default='2019-01-02', help="Primeiro pregão (YYYY-MM-DD).")
+    parser.add_argument('--days', type=int, default=None, help="Número de pregões (sobrepõe a escala).")
+    parser.add_argument('--equities', type=int, default=None, help="Empresas com ações (sobrepõe a escala).")
+    parser.add_argument('--fiis', type=int, default=None, help="Fundos imobiliários (sobrepõe a escala).")
+    parser.add_argument('--bdrs', type=int, default=None, help="BDRs (sobrepõe a escala).")
+    parser.add_argument('--option-underlyings', type=int, default=None,
+                        help="Ativos-objeto com opções (sobrepõe a escala).")
+    parser.add_argument('--strikes', type=int, default=None,
+                        help="Preços de exercício por vencimento e lado (sobrepõe a escala).")
+    main(parser.parse_args())
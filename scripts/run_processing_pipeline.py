@@ -3,6 +3,8 @@
 import sys
 from pathlib import Path
 import os
+import logging
+import argparse
 
 # --- AJUSTE DE PATH PARA IMPORTAÇÃO ---
 # Adiciona o diretório 'src' ao path do sistema para encontrar nosso pacote
@@ -13,8 +15,12 @@ if str(src_path) not in sys.path:
 
 # --- IMPORTAÇÕES DOS NOSSOS MÓDULOS ---
 # Importa as funções de cada etapa do pipeline
-from b3_analyzer.raw_data_processor import extract_zip_files, process_text_to_parquet
-from b3_analyzer.dictionary_builder import create_code_dictionaries, create_security_master
+from b3_analyzer.raw_data_processor import (
+    extract_zip_files, process_text_to_parquet, process_zip_to_parquet, compact_dataset,
+)
+from b3_analyzer.dictionary_builder import create_code_dictionaries, create_security_master, update_security_master
+from b3_analyzer.aggregates import build_aggregates
+from b3_analyzer.metrics import JsonLinesSink, add_metrics_hook, reset_peak_rss
 
 # --- CONFIGURAÇÃO DOS CAMINHOS DO PROJETO ---
 DATA_PATH = project_root / 'data'
@@ -23,40 +29,154 @@ TEXTS_PATH = DATA_PATH / 'texts'
 PROCESSED_PATH = DATA_PATH / 'processed'
 OUTPUTS_PATH = DATA_PATH / 'outputs'
 
-def run_full_pipeline():
+
+class SectionFormatter(logging.Formatter):
+    """Formata as mensagens do pacote como os prints do script, com uma linha em branco antes de cada título '--- ... ---'."""
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        return f"\n{message}" if record.getMessage().startswith('---') else message
+
+
+def run_full_pipeline(workers: int = 1, full_rebuild: bool = False, streaming: bool = False,
+                      partition_by: list = None, compact_sort_by: str = None, compression='snappy',
+                      excel: bool = False, rebuild_dictionary: bool = False, aggregates: bool = False):
     """
     Orquestra o pipeline completo de processamento de dados da B3.
 
+    Args:
+        workers (int): Número de processos usados na conversão dos arquivos
+                       .txt para Parquet (etapa 2).
+        full_rebuild (bool): Se True, reconstrói o dataset do zero em vez de
+                             processar apenas os arquivos novos ou modificados.
+        streaming (bool): Se True, lê os membros dos ZIPs de 'raw' diretamente,
+                          em fluxo, sem extraí-los para a pasta 'texts'.
+        partition_by (list, optional): Colunas de partição do dataset além do
+                                       ano ('CODBDI' e/ou 'TPMERC').
+        compact_sort_by (str, optional): Se informado ('CODNEG' ou 'CODISI'),
+            reescreve cada partição ordenada por essa chave após a ingestão.
+        compression (str | dict): Codec e nível dos arquivos Parquet gravados,
+            para todas as colunas ('zstd:19', 'lz4', presets 'quente'/'frio')
+            ou por coluna ({'*': 'frio', 'CODNEG': 'lz4'}).
+        excel (bool): Se True, também exporta os dicionários em .xlsx (apenas
+                      para consulta; o analisador não os lê).
+        rebuild_dictionary (bool): Se True, regera o dicionário de ativos a
+            partir de todo o histórico, mesmo quando a atualização
+            incremental seria possível (útil para verificação).
+        aggregates (bool): Se True, (re)gera as tabelas agregadas em
+            'processed/agregados' (barras, volume diário, índice de tickers
+            fatores de ajuste de preços e repositório de opções).
+
     Fluxo de Execução:
-    1. Extrai os arquivos .zip da pasta 'raw' para a pasta 'texts'.
-    2. Converte e consolida os arquivos .txt em um único arquivo Parquet otimizado
-       na pasta 'processed'.
+    1. Extrai os arquivos .zip da pasta 'raw' para a pasta 'texts' (etapa
+       pulada no modo `streaming`).
+    2. Converte os arquivos .txt (ou os membros dos .zip, no modo `streaming`)
+       novos ou modificados em fragmentos do dataset Parquet 'dados_b3', na
+       pasta 'processed'. Opcionalmente, compacta e ordena cada partição.
     3. Gera os dicionários de códigos (CODBDI, TPMERC) na pasta 'outputs'.
     4. Gera o dicionário master de ativos (security master) na pasta 'outputs'.
+       Quando a ingestão só acrescentou ou modificou arquivos, o dicionário é
+       atualizado apenas com os fragmentos gravados nesta execução.
+    5. Opcionalmente, gera as tabelas agregadas usadas por `B3Data.get_bars`,
+       `get_market_volume` e `get_ticker_index`. Sem esta etapa, tabelas de
+       execuções anteriores ficam desatualizadas e deixam de ser usadas.
     """
     print("="*60)
     print("--- INICIANDO PIPELINE COMPLETO DE PROCESSAMENTO DE DADOS B3 ---")
     print("="*60)
     
     # Garante que os diretórios de saída existam
-    os.makedirs(TEXTS_PATH, exist_ok=True)
     os.makedirs(PROCESSED_PATH, exist_ok=True)
     os.makedirs(OUTPUTS_PATH, exist_ok=True)
 
-    # --- ETAPA 1: Extração ---
-    extract_zip_files(RAW_PATH, TEXTS_PATH)
-    
-    # --- ETAPA 2: Processamento para Parquet ---
-    process_text_to_parquet(TEXTS_PATH, PROCESSED_PATH)
+    # O pico de memória de cada etapa (ver `b3_analyzer.metrics`) é zerado aqui, antes dela.
+    if streaming:
+        # --- ETAPAS 1+2: Leitura em fluxo dos ZIPs direto para Parquet ---
+        reset_peak_rss()
+        ingestion = process_zip_to_parquet(RAW_PATH, PROCESSED_PATH, workers=workers, full_rebuild=full_rebuild,
+                                           partition_by=partition_by, compression=compression)
+    else:
+        # --- ETAPA 1: Extração ---
+        os.makedirs(TEXTS_PATH, exist_ok=True)
+        reset_peak_rss()
+        extract_zip_files(RAW_PATH, TEXTS_PATH)
+
+        # --- ETAPA 2: Processamento para Parquet ---
+        reset_peak_rss()
+        ingestion = process_text_to_parquet(TEXTS_PATH, PROCESSED_PATH, workers=workers, full_rebuild=full_rebuild,
+                                            partition_by=partition_by, compression=compression)
+
+    new_data = ingestion['fragments'] if ingestion else []
+    if compact_sort_by:
+        reset_peak_rss()
+        compact_dataset(PROCESSED_PATH, sort_by=compact_sort_by, compression=compression)
+        # A compactação junta os fragmentos de cada partição em um único arquivo.
+        new_data = sorted({str(Path(fragment).parent) for fragment in new_data})
     
     # --- ETAPA 3: Geração dos Dicionários ---
     # As funções de dicionário usam o Parquet gerado na etapa anterior
-    create_code_dictionaries(OUTPUTS_PATH)
-    create_security_master(PROCESSED_PATH, OUTPUTS_PATH)
+    create_code_dictionaries(OUTPUTS_PATH, excel=excel)
+    reset_peak_rss()
+    if rebuild_dictionary or not ingestion or ingestion['rebuilt'] or ingestion['removed']:
+        create_security_master(PROCESSED_PATH, OUTPUTS_PATH, excel=excel)
+    else:
+        update_security_master(PROCESSED_PATH, OUTPUTS_PATH, new_data, excel=excel)
+
+    # --- ETAPA 5: Tabelas Agregadas ---
+    if aggregates:
+        default_compression = compression.get('*', 'snappy') if isinstance(compression, dict) else compression
+        reset_peak_rss()
+        build_aggregates(PROCESSED_PATH, compression=default_compression)
     
     print("\n--- PIPELINE COMPLETO CONCLUÍDO COM SUCESSO ---")
     print("Os dados estão prontos para serem consultados com o módulo `b3_analyzer.analyzer`.")
 
 if __name__ == '__main__':
     # Permite que o script seja executado diretamente do terminal
-    run_full_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline de processamento dos dados históricos da B3.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processos usados na conversão TXT -> Parquet (padrão: número de CPUs).")
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help="Ignora o manifesto de ingestão e reconstrói o dataset inteiro.")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lê os ZIPs de data/raw em fluxo, sem extraí-los para data/texts.")
+    parser.add_argument('--partition-by', nargs='*', default=[], choices=['CODBDI', 'TPMERC'],
+                        help="Colunas de partição do dataset além do ano.")
+    parser.add_argument('--compact', nargs='?', const='CODNEG', default=None, choices=['CODNEG', 'CODISI'],
+                        help="Compacta cada partição ordenando por CODNEG (padrão) ou CODISI.")
+    parser.add_argument('--compression', default='snappy',
+                        help="Codec padrão, opcionalmente com nível: 'snappy', 'lz4', 'zstd:19', 'none' ou os "
+                             "presets 'quente' (lz4) e 'frio' (zstd:19).")
+    parser.add_argument('--column-compression', nargs='*', default=[], metavar='COLUNA=CODEC[:NIVEL]',
+                        help="Codec por coluna, sobrepondo o padrão (ex: CODNEG=lz4 NOMRES=zstd:19).")
+    parser.add_argument('--excel', action='store_true',
+                        help="Também exporta os dicionários em planilhas .xlsx.")
+    parser.add_argument('--rebuild-dictionary', action='store_true',
+                        help="Regera o dicionário de ativos a partir de todo o histórico (sem atualização incremental).")
+    parser.add_argument('--aggregates', action='store_true',
+                        help="Gera as tabelas agregadas (barras mensais/semanais, volume diário, índice de tickers, "
+                             "fatores de ajuste, cadeias de opções).")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Grava as métricas de cada etapa e de cada arquivo convertido (tempo, linhas/s, "
+                             "bytes, pico de memória) neste arquivo, uma linha JSON por evento.")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Nível das mensagens de log (padrão: INFO).")
+    args = parser.parse_args()
+
+    # As mensagens do pacote saem pelo logging, no mesmo formato dos prints do script.
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(SectionFormatter('%(message)s'))
+    logging.basicConfig(level=args.log_level, handlers=[handler])
+    if args.metrics_file:
+        add_metrics_hook(JsonLinesSink(args.metrics_file))
+
+    compression = {'*': args.compression}
+    for item in args.column_compression:
+        column, sep, spec = item.partition('=')
+        if not sep:
+            parser.error(f"Formato inválido em --column-compression: '{item}' (use COLUNA=CODEC[:NIVEL]).")
+        compression[column] = spec
+
+    run_full_pipeline(workers=args.workers, full_rebuild=args.full_rebuild, streaming=args.streaming,
+                      partition_by=args.partition_by, compact_sort_by=args.compact, compression=compression,
+                      excel=args.excel, rebuild_dictionary=args.rebuild_dictionary,
+                      aggregates=args.aggregates)
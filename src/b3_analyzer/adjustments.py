@@ -0,0 +1,279 @@
+# src/b3_analyzer/adjustments.py
+#
+# Fatores de ajuste de preços por eventos corporativos, derivados do próprio
+# COTAHIST: mudanças do fator de cotação (FATCOT) e descontinuidades de preço
+# típicas de desdobramentos e grupamentos. Os fatores ficam em uma tabela
+# compacta de eventos e são aplicados de forma vetorizada na leitura.
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from fractions import Fraction
+from typing import List, Optional
+
+ADJUSTMENT_TABLE = 'fatores_ajuste'
+# Colunas lidas do dataset para derivar os eventos (apenas o mercado à vista).
+ADJUSTMENT_SOURCE_COLUMNS = ['CODISI', 'DATA_PREGAO', 'TPMERC', 'FATCOT', 'PREABE', 'PREULT', 'VOLTOT']
+ADJUSTED_PRICE_COLUMNS = ['PREABE', 'PREMAX', 'PREMIN', 'PREMED', 'PREULT', 'PREOFC', 'PREOFV']
+_VISTA = 10
+# Um salto entre o fechamento anterior e a abertura (por unidade) de pelo menos
+# esta razão, próximo de uma fração simples (ex: 2, 3, 5/2, 1/10), é tratado
+# como desdobramento ou grupamento.
+_SPLIT_THRESHOLD = 1.9
+_SPLIT_MAX_DENOMINATOR = 4
+_SPLIT_TOLERANCE = 0.03
+_EVENT_SCHEMA = pa.schema([
+    ('CODISI', pa.string()), ('DATA_EVENTO', pa.date32()), ('FATOR', pa.float64()), ('ORIGEM', pa.string()),
+])
+# Separa os códigos de ISIN nas chaves (código, dia) usadas na busca dos fatores.
+_DAY_SPAN = 1 << 20
+
+
+def _split_ratio(gap: float) -> Optional[float]:
+    """(Helper Interno) O fator de um salto de preço, se ele corresponder a um desdobramento/grupamento."""
+    ratio = gap if gap >= 1 else 1 / gap
+    fraction = Fraction(ratio).limit_denominator(_SPLIT_MAX_DENOMINATOR)
+    if abs(ratio / float(fraction) - 1) > _SPLIT_TOLERANCE:
+        return None
+    return 1 / float(fraction) if gap >= 1 else float(fraction)
+
+
+def _daily_records(table: pa.Table) -> dict:
+    """
+    (Helper Interno) Um registro por (CODISI, pregão) do mercado à vista, ordenados por CODISI e data.
+
+    Mantém o registro de maior volume de cada dia, com abertura e fechamento
+    por unidade (preço / FATCOT).
+
+    Returns:
+        dict: Arrays NumPy 'isins', 'days', 'fatcot', 'unit_open' e 'unit_close'.
+    """
+    valid = pc.and_(pc.and_(pc.is_valid(table['CODISI']), pc.equal(table['TPMERC'], _VISTA)),
+                    pc.and_(pc.greater(table['FATCOT'], 0),
+                            pc.and_(pc.greater(table['PREABE'], 0), pc.greater(table['PREULT'], 0))))
+    table = table.filter(pc.fill_null(valid, False))
+    table = table.sort_by([('CODISI', 'ascending'), ('DATA_PREGAO', 'ascending'), ('VOLTOT', 'descending')])
+
+    isins = table['CODISI'].cast(pa.string()).to_numpy(zero_copy_only=False)
+    days = table['DATA_PREGAO'].cast(pa.date32()).cast(pa.int32()).to_numpy(zero_copy_only=False)
+    # Um registro por (CODISI, dia): o primeiro, de maior volume.
+    first = np.ones(len(days), dtype=bool)
+    first[1:] = (isins[1:] != isins[:-1]) | (days[1:] != days[:-1])
+    fatcot = table['FATCOT'].to_numpy(zero_copy_only=False)[first].astype(np.float64)
+    return {
+        'isins': isins[first], 'days': days[first], 'fatcot': fatcot,
+        'unit_open': table['PREABE'].to_numpy(zero_copy_only=False)[first] / fatcot,
+        'unit_close': table['PREULT'].to_numpy(zero_copy_only=False)[first] / fatcot,
+    }
+
+
+def _events_between(records: dict, pairs: np.ndarray) -> List[tuple]:
+    """
+    (Helper Interno) Os eventos entre registros consecutivos de um mesmo CODISI.
+
+    Args:
+        records (dict): Registros diários ordenados (ver `_daily_records`).
+        pairs (np.ndarray): Máscara booleana (tamanho n - 1) dos pares
+                            (i, i + 1) a examinar.
+
+    Returns:
+        List[tuple]: (CODISI, dia, fator, origem) de cada evento.
+    """
+    isins, days, fatcot = records['isins'], records['days'], records['fatcot']
+    pairs = pairs & (isins[1:] == isins[:-1])
+    fatcot_ratio = fatcot[1:] / fatcot[:-1]
+    gap = records['unit_close'][:-1] / records['unit_open'][1:]
+
+    rows = []
+    for i in np.flatnonzero(pairs & (fatcot_ratio != 1)):
+        rows.append((isins[i + 1], days[i + 1], fatcot_ratio[i], 'FATCOT'))
+    for i in np.flatnonzero(pairs & ((gap >= _SPLIT_THRESHOLD) | (gap <= 1 / _SPLIT_THRESHOLD))):
+        factor = _split_ratio(gap[i])
+        if factor is not None:
+            rows.append((isins[i + 1], days[i + 1], factor, 'PRECO'))
+    return rows
+
+
+def _events_table(rows: List[tuple]) -> pa.Table:
+    """(Helper Interno) A tabela de eventos, ordenada por CODISI e data."""
+    if not rows:
+        return _EVENT_SCHEMA.empty_table()
+    isin_col, day_col, factor_col, origin_col = zip(*rows)
+    events = pa.table({
+        'CODISI': pa.array(isin_col, pa.string()),
+        'DATA_EVENTO': pa.array(np.array(day_col, dtype=np.int32)).cast(pa.date32()),
+        'FATOR': pa.array(factor_col, pa.float64()),
+        'ORIGEM': pa.array(origin_col, pa.string()),
+    })
+    return events.sort_by([('CODISI', 'ascending'), ('DATA_EVENTO', 'ascending'), ('ORIGEM', 'ascending')])
+
+
+def derive_adjustment_events(table: pa.Table) -> pa.Table:
+    """
+    Deriva os eventos de ajuste a partir das cotações do mercado à vista.
+
+    Para cada CODISI, os pregões são percorridos em ordem (com um registro
+    por dia, o de maior volume). Um evento é registrado quando:
+    - FATCOT muda: os preços anteriores passam para o novo fator de cotação
+      (ex: de lotes de mil para unidade, fator 1/1000);
+    - o preço por unidade salta da razão de uma fração simples entre o
+      fechamento anterior e a abertura (ex: desdobramento 2:1, fator 1/2).
+
+    Proventos em dinheiro não constam do COTAHIST e não são ajustados.
+
+    Args:
+        table (pa.Table): Linhas com as colunas de `ADJUSTMENT_SOURCE_COLUMNS`.
+
+    Returns:
+        pa.Table: Um evento por linha (CODISI, DATA_EVENTO, FATOR, ORIGEM),
+                  ordenado por CODISI e data. FATOR multiplica os preços dos
+                  pregões anteriores a DATA_EVENTO.
+    """
+    records = _daily_records(table)
+    if len(records['days']) < 2:
+        return _EVENT_SCHEMA.empty_table()
+    return _events_table(_events_between(records, np.ones(len(records['days']) - 1, dtype=bool)))
+
+
+class AdjustmentAccumulator:
+    """
+    Deriva os eventos de ajuste bloco a bloco, na mesma leitura que gera as tabelas agregadas.
+
+    Tem a mesma interface de `AggregateAccumulator`. As linhas do mercado à
+    vista são juntadas em segmentos de anos consecutivos: um segmento é
+    fechado quando chega um bloco só de anos posteriores aos dele (com a
+    partição por ANO, a leitura percorre um ano de cada vez). Os eventos de
+    cada segmento são derivados ao fechá-lo, e dele só ficam o primeiro e o
+    último registro diário de cada CODISI, usados ao final para os eventos
+    entre segmentos. A memória é a de um segmento mais dois registros por
+    CODISI e segmento, e não a do histórico inteiro.
+
+    O resultado é o mesmo de `derive_adjustment_events` sobre todas as
+    linhas desde que os anos não se intercalem na leitura (as linhas de um
+    mesmo ano chegam juntas, em qualquer ordem entre os anos).
+    """
+    source_columns = ADJUSTMENT_SOURCE_COLUMNS
+
+    def __init__(self):
+        self._pending: List[pa.Table] = []
+        self._pending_year = None
+        self._rows: List[tuple] = []
+        self._boundaries: List[dict] = []
+
+    def update(self, table: pa.Table):
+        """Incorpora um bloco de linhas do dataset (com as colunas de `ADJUSTMENT_SOURCE_COLUMNS`)."""
+        table = table.select(ADJUSTMENT_SOURCE_COLUMNS)
+        table = table.filter(pc.fill_null(pc.equal(table['TPMERC'], _VISTA), False))
+        if table.num_rows == 0:
+            return
+        years = pc.min_max(pc.year(table['DATA_PREGAO']))
+        first_year, last_year = years['min'].as_py(), years['max'].as_py()
+        if first_year is None:
+            return
+        if self._pending and first_year > self._pending_year:
+            self._flush()
+        self._pending.append(table)
+        self._pending_year = max(self._pending_year or last_year, last_year)
+
+    def _flush(self):
+        """(Helper Interno) Deriva os eventos do segmento pendente e guarda os seus registros de fronteira."""
+        records = _daily_records(pa.concat_tables(self._pending))
+        self._pending, self._pending_year = [], None
+        n = len(records['days'])
+        if n == 0:
+            return
+        if n > 1:
+            self._rows.extend(_events_between(records, np.ones(n - 1, dtype=bool)))
+        # Primeiro e último registro de cada CODISI no segmento.
+        isins = records['isins']
+        edges = np.zeros(n, dtype=bool)
+        edges[0] = edges[-1] = True
+        changes = np.flatnonzero(isins[1:] != isins[:-1])
+        edges[changes] = edges[changes + 1] = True
+        boundary = {key: values[edges] for key, values in records.items()}
+        boundary['segment'] = np.full(int(edges.sum()), len(self._boundaries))
+        self._boundaries.append(boundary)
+
+    def result(self) -> pa.Table:
+        """A tabela de eventos (ver `derive_adjustment_events`)."""
+        if self._pending:
+            self._flush()
+        rows = list(self._rows)
+        if len(self._boundaries) > 1:
+            # Eventos entre o último registro de um segmento e o primeiro do seguinte.
+            merged = {key: np.concatenate([b[key] for b in self._boundaries]) for key in self._boundaries[0]}
+            order = np.lexsort((merged['days'], merged['isins'].astype(str)))
+            merged = {key: values[order] for key, values in merged.items()}
+            segments = merged.pop('segment')
+            rows.extend(_events_between(merged, segments[1:] != segments[:-1]))
+        return _events_table(rows)
+
+
+class AdjustmentFactors:
+    """
+    Tabela de eventos pronta para ajustar muitos ativos de uma vez.
+
+    Cada evento vira uma chave (código do ISIN, dia) em um array ordenado,
+    com o produto dos fatores daquele evento em diante no mesmo ISIN. O
+    fator de uma linha é o do primeiro evento posterior ao seu pregão, obtido
+    para todas as linhas com um único `np.searchsorted`.
+    """
+    def __init__(self, events: pa.Table):
+        events = events.sort_by([('CODISI', 'ascending'), ('DATA_EVENTO', 'ascending')])
+        self.events = events
+        self._isins = pc.unique(events['CODISI'])
+        self._codes = pc.index_in(events['CODISI'], value_set=self._isins).to_numpy(zero_copy_only=False).astype(np.int64)
+        days = events['DATA_EVENTO'].cast(pa.int32()).to_numpy(zero_copy_only=False).astype(np.int64)
+        self._keys = self._codes * _DAY_SPAN + days
+
+        # Produto acumulado, do último evento de cada ISIN para trás.
+        factors = events['FATOR'].to_numpy(zero_copy_only=False)
+        self._cumulative = np.ones(len(factors))
+        bounds = np.flatnonzero(np.diff(self._codes)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(factors)]):
+            self._cumulative[start:end] = np.cumprod(factors[start:end][::-1])[::-1]
+
+    def factors(self, codisi, dates) -> np.ndarray:
+        """
+        Os fatores acumulados de cada linha.
+
+        Args:
+            codisi: A coluna CODISI (string ou dicionário).
+            dates: A coluna DATA_PREGAO (date32 ou timestamp).
+
+        Returns:
+            np.ndarray: Um fator (float64) por linha; 1.0 sem eventos posteriores.
+        """
+        result = np.ones(len(codisi))
+        if not len(self._keys) or not len(codisi):
+            return result
+        codes = pc.index_in(codisi.cast(pa.string()), value_set=self._isins)
+        codes = codes.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+        # Só as linhas de ISINs com eventos passam pela busca.
+        rows = np.flatnonzero(codes >= 0)
+        if not len(rows):
+            return result
+        days = dates.cast(pa.date32()).cast(pa.int32()).fill_null(0).to_numpy(zero_copy_only=False)
+        codes, days = codes[rows], days[rows]
+        positions = np.searchsorted(self._keys, codes * _DAY_SPAN + days, side='right')
+        found = positions < len(self._keys)
+        found[found] = self._codes[positions[found]] == codes[found]
+        result[rows[found]] = self._cumulative[positions[found]]
+        return result
+
+
+def apply_adjustment(table: pa.Table, factors: np.ndarray) -> pa.Table:
+    """
+    Multiplica as colunas de preço (já em float64, ver `decode_storage_table`) pelos fatores.
+
+    Volume financeiro e quantidade são mantidos como negociados.
+    """
+    if not len(factors) or (factors == 1).all():
+        return table
+    factors = pa.array(factors, pa.float64())
+    for name in ADJUSTED_PRICE_COLUMNS:
+        if name in table.column_names and pa.types.is_floating(table.schema.field(name).type):
+            index = table.schema.get_field_index(name)
+            adjusted = pc.multiply(table[name].combine_chunks(), factors)
+            table = table.set_column(index, table.schema.field(index), adjusted)
+    return table
@@ -0,0 +1,308 @@
+# src/b3_analyzer/aggregates.py
+#
+# Tabelas agregadas (visões materializadas) sobre o dataset 'dados_b3':
+# barras OHLCV mensais e semanais por ticker, volume diário do mercado por
+# CODBDI/TPMERC e o índice de tickers (primeiro/último pregão e registros).
+# As mesmas agregações servem para gerar as tabelas e para calculá-las sob
+# demanda quando elas não existem ou estão desatualizadas.
+
+import os
+import json
+import time
+import logging
+import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics
+from .adjustments import ADJUSTMENT_TABLE, AdjustmentAccumulator
+from .options import OPTIONS_INDEX_TABLE, OPTIONS_STORE_FILE, OptionsStoreWriter
+from .storage import DATASET_NAME, DEFAULT_COMPRESSION, STORAGE_SCHEMA, dataset_signature, open_dataset, parse_compression_spec
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_DIR = 'agregados'
+MANIFEST_FILE = 'manifesto_agregados.json'
+# Linhas acumuladas (parciais) antes de cada redução intermediária. Com um
+# parcial reduzido maior que isso, espera-se acumular o tamanho dele, para que
+# o custo total das reduções fique linear no número de linhas lidas.
+_MAX_PENDING_ROWS = 2_000_000
+# Frequência das barras -> (tabela, unidade do `floor_temporal`, frequência do pandas).
+BAR_FREQUENCIES = {
+    'monthly': ('barras_mensais', 'month', 'M'),
+    'weekly': ('barras_semanais', 'week', 'W-SUN'),
+}
+
+
+class AggregateView:
+    """
+    Definição de uma tabela agregada.
+
+    Cada agregação é (coluna, função, saída, ordem). Um bloco do dataset vira
+    um parcial com `partial`, e parciais se combinam com `merge`; o resultado
+    não depende de como as linhas foram divididas em blocos. 'first' e 'last'
+    seguem a coluna de ordem (empates na ordem do dataset).
+
+    Args:
+        keys (List[str]): As chaves de agrupamento.
+        partial (List[tuple]): Agregações sobre as linhas do dataset.
+        merge (List[tuple]): Agregações que combinam parciais.
+        period (str, optional): Unidade ('month', 'week') da chave 'PERIODO',
+                                derivada de DATA_PREGAO.
+    """
+    def __init__(self, keys: List[str], partial: List[tuple], merge: List[tuple], period: Optional[str] = None):
+        self.keys = keys
+        self.partial_aggregations = partial
+        self.merge_aggregations = merge
+        self.period = period
+        columns = [k for k in keys if k != 'PERIODO'] + [col for col, _, _, order in partial] + [
+            order for _, _, _, order in partial if order]
+        if period:
+            columns.append('DATA_PREGAO')
+        self.source_columns = list(dict.fromkeys(columns))
+
+    def partial(self, table: pa.Table) -> pa.Table:
+        """Agrega um bloco de linhas do dataset (colunas de `source_columns`)."""
+        if self.period:
+            period = pc.floor_temporal(table['DATA_PREGAO'], unit=self.period, week_starts_monday=True)
+            table = table.append_column('PERIODO', period)
+        return _aggregate(table, self.keys, self.partial_aggregations)
+
+    def merge(self, partials: List[pa.Table]) -> pa.Table:
+        """Combina parciais (na ordem em que foram gerados) em um único parcial."""
+        return _aggregate(pa.concat_tables(partials), self.keys, self.merge_aggregations)
+
+
+def _aggregate(table: pa.Table, keys: List[str], aggregations: List[tuple]) -> pa.Table:
+    """
+    (Helper Interno) Agrupa `table` por `keys`, com as colunas de saída nomeadas e ordenadas pelas chaves.
+
+    Agregações com ordem ('first'/'last') rodam sobre a tabela ordenada de
+    forma estável por essa coluna e sem threads, para que a ordem seja
+    respeitada; há um agrupamento por coluna de ordem.
+    """
+    by_order: Dict[Optional[str], List[tuple]] = {}
+    for aggregation in aggregations:
+        by_order.setdefault(aggregation[3], []).append(aggregation)
+
+    columns = {}
+    for order, group in by_order.items():
+        source = table.sort_by(order) if order else table
+        grouped = source.group_by(keys, use_threads=order is None).aggregate(
+            [(col, func) for col, func, _, _ in group])
+        # O group_by entrega os grupos em ordem arbitrária: todos são alinhados pelas chaves.
+        grouped = grouped.sort_by([(k, 'ascending') for k in keys])
+        for k in keys:
+            columns.setdefault(k, grouped[k])
+        for col, func, output, _ in group:
+            columns[output] = grouped[f'{col}_{func}']
+    names = keys + [output for _, _, output, _ in aggregations]
+    return pa.table({name: columns[name] for name in names})
+
+
+def _with_storage_metadata(table: pa.Table) -> pa.Table:
+    """(Helper Interno) Recoloca os metadados do schema de armazenamento (ex: 'escala' dos preços)."""
+    fields = []
+    for field in table.schema:
+        if field.name in STORAGE_SCHEMA.names:
+            storage_field = STORAGE_SCHEMA.field(field.name)
+            if storage_field.metadata and storage_field.type == field.type:
+                field = field.with_metadata(storage_field.metadata)
+        fields.append(field)
+    return table.cast(pa.schema(fields))
+
+
+_BAR_PARTIAL = [
+    ('DATA_PREGAO', 'min', 'DATA_INICIO', None), ('DATA_PREGAO', 'max', 'DATA_FIM', None),
+    ('PREABE', 'first', 'PREABE', 'DATA_PREGAO'), ('PREMAX', 'max', 'PREMAX', None),
+    ('PREMIN', 'min', 'PREMIN', None), ('PREULT', 'last', 'PREULT', 'DATA_PREGAO'),
+    ('VOLTOT', 'sum', 'VOLTOT', None), ('QUATOT', 'sum', 'QUATOT', None),
+    ('TOTNEG', 'sum', 'TOTNEG', None), ('DATA_PREGAO', 'count', 'PREGOES', None),
+]
+_BAR_MERGE = [
+    ('DATA_INICIO', 'min', 'DATA_INICIO', None), ('DATA_FIM', 'max', 'DATA_FIM', None),
+    ('PREABE', 'first', 'PREABE', 'DATA_INICIO'), ('PREMAX', 'max', 'PREMAX', None),
+    ('PREMIN', 'min', 'PREMIN', None), ('PREULT', 'last', 'PREULT', 'DATA_FIM'),
+    ('VOLTOT', 'sum', 'VOLTOT', None), ('QUATOT', 'sum', 'QUATOT', None),
+    ('TOTNEG', 'sum', 'TOTNEG', None), ('PREGOES', 'sum', 'PREGOES', None),
+]
+
+VIEWS = {
+    name: AggregateView(['CODNEG', 'CODISI', 'PERIODO'], _BAR_PARTIAL, _BAR_MERGE, period=unit)
+    for name, unit, _ in BAR_FREQUENCIES.values()
+}
+VIEWS['volume_diario'] = AggregateView(
+    ['DATA_PREGAO', 'CODBDI', 'TPMERC'],
+    [('VOLTOT', 'sum', 'VOLTOT', None), ('QUATOT', 'sum', 'QUATOT', None),
+     ('TOTNEG', 'sum', 'TOTNEG', None), ('CODNEG', 'count', 'REGISTROS', None)],
+    [('VOLTOT', 'sum', 'VOLTOT', None), ('QUATOT', 'sum', 'QUATOT', None),
+     ('TOTNEG', 'sum', 'TOTNEG', None), ('REGISTROS', 'sum', 'REGISTROS', None)],
+)
+VIEWS['indice_tickers'] = AggregateView(
+    ['CODNEG', 'CODISI'],
+    [('DATA_PREGAO', 'min', 'PRIMEIRO_PREGAO', None), ('DATA_PREGAO', 'max', 'ULTIMO_PREGAO', None),
+     ('DATA_PREGAO', 'count', 'REGISTROS', None)],
+    [('PRIMEIRO_PREGAO', 'min', 'PRIMEIRO_PREGAO', None), ('ULTIMO_PREGAO', 'max', 'ULTIMO_PREGAO', None),
+     ('REGISTROS', 'sum', 'REGISTROS', None)],
+)
+
+
+class AggregateAccumulator:
+    """
+    Parciais de uma tabela agregada, atualizados bloco a bloco.
+
+    Os parciais são reduzidos periodicamente, então a memória depende do
+    tamanho da tabela agregada, e não do número de linhas lidas.
+    """
+    def __init__(self, view: AggregateView):
+        self.view = view
+        self.source_columns = view.source_columns
+        self._partials: List[pa.Table] = []
+        self._pending_rows = 0  # linhas incorporadas desde a última redução
+        self._reduced_rows = 0
+
+    def update(self, table: pa.Table):
+        """Incorpora um bloco de linhas do dataset (com as colunas de `view.source_columns`)."""
+        partial = self.view.partial(table.select(self.view.source_columns))
+        self._partials.append(partial)
+        self._pending_rows += partial.num_rows
+        if self._pending_rows > max(_MAX_PENDING_ROWS, self._reduced_rows):
+            self._reduce()
+
+    def _reduce(self):
+        """(Helper Interno) Combina os parciais acumulados em um único parcial."""
+        if len(self._partials) > 1:
+            self._partials = [self.view.merge(self._partials)]
+        self._pending_rows = 0
+        self._reduced_rows = sum(t.num_rows for t in self._partials)
+
+    def result(self) -> Optional[pa.Table]:
+        """
+        A tabela agregada final, ordenada pelas chaves.
+
+        Returns:
+            Optional[pa.Table]: A tabela, com os metadados do schema de
+                                armazenamento (preços em centavos), ou None
+                                se nenhum bloco foi incorporado.
+        """
+        if not self._partials:
+            return None
+        return _with_storage_metadata(self.view.merge(self._partials))
+
+
+def period_bounds(date, frequency: str) -> Tuple[datetime.date, datetime.date]:
+    """
+    O primeiro e o último dia do período (mês ou semana de segunda a domingo) que contém `date`.
+
+    Args:
+        date: Uma data ('YYYY-MM-DD', `date` ou Timestamp).
+        frequency (str): 'monthly' ou 'weekly'.
+    """
+    period = pd.Timestamp(date).to_period(BAR_FREQUENCIES[frequency][2])
+    return period.start_time.date(), period.end_time.date()
+
+
+def load_aggregate(processed_path: Path, name: str, signature: tuple) -> Optional[ds.Dataset]:
+    """
+    Abre uma tabela agregada, se ela existir e estiver em dia com o dataset.
+
+    Args:
+        processed_path (Path): O diretório 'processed'.
+        name (str): O nome da tabela (uma chave de `VIEWS`, `ADJUSTMENT_TABLE`
+                    ou `OPTIONS_INDEX_TABLE`).
+        signature (tuple): A assinatura atual do dataset (ver `dataset_signature`).
+
+    Returns:
+        Optional[ds.Dataset]: A tabela, ou None se ela não existir ou se o
+                              dataset mudou desde a sua geração.
+    """
+    aggregates_path = Path(processed_path) / AGGREGATES_DIR
+    manifest_path = aggregates_path / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if name not in manifest['tabelas'] or tuple(tuple(item) for item in manifest['assinatura']) != signature:
+        return None
+    return ds.dataset(str(aggregates_path / f'{name}.parquet'), format='parquet')
+
+
+def build_aggregates(processed_path: Path, compression: str = DEFAULT_COMPRESSION):
+    """
+    Gera as tabelas agregadas a partir do dataset 'dados_b3'.
+
+    O dataset é lido uma única vez, em fluxo, alimentando os acumuladores de
+    todas as tabelas de `VIEWS`. Cada tabela é gravada em
+    'processed/agregados/<nome>.parquet', com preços em centavos como no
+    dataset, e o manifesto registra a assinatura do dataset lido: quando uma
+    nova ingestão ou compactação muda os arquivos, `B3Data` deixa de usar as
+    tabelas e volta a agregar o dataset até que elas sejam regeradas.
+
+    Tabelas:
+    - barras_mensais / barras_semanais: OHLCV por (CODNEG, CODISI, PERIODO).
+    - volume_diario: volume, quantidade, negócios e registros por
+      (DATA_PREGAO, CODBDI, TPMERC).
+    - indice_tickers: primeiro e último pregão e registros por (CODNEG, CODISI).
+    - fatores_ajuste: eventos de ajuste de preços por CODISI (ver
+      `b3_analyzer.adjustments`), usados por `get_quotes(adjusted=True)`.
+    - indice_opcoes: o índice de lotes do repositório de opções
+      'agregados/opcoes.arrow' (ver `b3_analyzer.options`), usado por
+      `get_options_chain`.
+
+    Args:
+        processed_path (Path): O diretório 'processed', com o dataset 'dados_b3'.
+        compression (str): Codec (e nível) dos arquivos gravados ('zstd:19', 'lz4'...).
+    """
+    logger.info("--- Gerando Tabelas Agregadas (barras, volume, índice de tickers, fatores de ajuste e opções) ---")
+    dataset_path = Path(processed_path) / DATASET_NAME
+    if not dataset_path.exists():
+        logger.error(f" -> [ERRO FATAL] O dataset principal '{dataset_path}' não foi encontrado.")
+        return
+
+    with metrics.stage('agregados', linhas=0, bytes_entrada=0) as stage_metrics:
+        try:
+            start_time = time.time()
+            codec, level = parse_compression_spec(compression)
+            signature = dataset_signature(dataset_path)
+            accumulators = {name: AggregateAccumulator(view) for name, view in VIEWS.items()}
+            accumulators[ADJUSTMENT_TABLE] = AdjustmentAccumulator()
+            aggregates_path = Path(processed_path) / AGGREGATES_DIR
+            aggregates_path.mkdir(parents=True, exist_ok=True)
+            accumulators[OPTIONS_INDEX_TABLE] = OptionsStoreWriter(aggregates_path / OPTIONS_STORE_FILE)
+            columns = list(dict.fromkeys(col for acc in accumulators.values() for col in acc.source_columns))
+            scanner = open_dataset(dataset_path).scanner(columns=columns, batch_size=1 << 20)
+            for batch in scanner.to_batches():
+                stage_metrics['linhas'] += batch.num_rows
+                stage_metrics['bytes_entrada'] += batch.nbytes
+                table = pa.Table.from_batches([batch])
+                for accumulator in accumulators.values():
+                    accumulator.update(table)
+            logger.info(f" -> Agregação concluída em {time.time() - start_time:.2f} segundos.")
+
+            rows = {}
+            for name, accumulator in accumulators.items():
+                table = accumulator.result()
+                if table is None:
+                    continue
+                temp_path = aggregates_path / f'_{name}.parquet'
+                pq.write_table(table, temp_path, compression=codec, compression_level=level)
+                os.replace(temp_path, aggregates_path / f'{name}.parquet')
+                rows[name] = table.num_rows
+                logger.info(f"    -> {name}: {table.num_rows:,} linhas")
+
+            manifest = {'assinatura': [list(item) for item in signature], 'tabelas': rows,
+                        'gerado_em': datetime.datetime.now().isoformat(timespec='seconds')}
+            with open(aggregates_path / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            stage_metrics['tabelas'] = rows
+            stage_metrics['bytes_saida'] = metrics.path_bytes(aggregates_path)
+            logger.info(f" -> [SUCESSO] Tabelas agregadas salvas em: {aggregates_path}")
+
+        except Exception as e:
+            logger.exception(f" -> [ERRO] Falha ao gerar as tabelas agregadas: {e}")
+            stage_metrics.update(status='erro', erro=f'{type(e).__name__}: {e}')
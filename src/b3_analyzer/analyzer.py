@@ -3,74 +3,180 @@
 # Um módulo Python para consulta e análise eficiente de dados históricos de
 # cotações da B3, armazenados em formato Parquet.
 
+import os
+import time
+import asyncio
+import logging
+import threading
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 import re
 
+from . import metrics
+from .adjustments import ADJUSTED_PRICE_COLUMNS, ADJUSTMENT_SOURCE_COLUMNS, ADJUSTMENT_TABLE, AdjustmentAccumulator, AdjustmentFactors, apply_adjustment
+from .aggregates import AGGREGATES_DIR, BAR_FREQUENCIES, VIEWS, AggregateAccumulator, load_aggregate, period_bounds
+from .asset_index import AssetIndex
+from .options import CHAIN_SOURCE_COLUMNS, OPTIONS_INDEX_TABLE, OptionsStore, build_chain, open_options_store
+from .cache import QueryCache, normalize_filters
+from .codes import CODBDI_DESCRIPTIONS, TPMERC_DESCRIPTIONS, description_to_code
+from .scan import MemoryBudget, plan_scan, read_tasks
+from .storage import PANDAS_INT_TYPES, STORAGE_SCHEMA, DatasetHandle, decode_storage_table
+
+logger = logging.getLogger(__name__)
+
+# Memória de uma consulta por byte descomprimido lido: a tabela Arrow e o DataFrame convertido.
+_MEMORY_PER_BYTE_READ = 2
+
 class B3Data:
     """
     Uma classe para carregar e analisar dados históricos de cotações da B3
-    de forma eficiente a partir de um arquivo Parquet.
+    de forma eficiente a partir de um dataset Parquet.
 
     Esta classe é projetada para lidar com datasets de grande volume (multi-GB)
     sem a necessidade de carregar todo o arquivo na memória para cada consulta.
     Ela utiliza a técnica de "predicate pushdown" do PyArrow para ler do disco
-    apenas os dados que correspondem aos filtros solicitados.
+    apenas os dados que correspondem aos filtros solicitados. Como o dataset é
+    particionado por ano (e opcionalmente por CODBDI/TPMERC), filtros de data e
+    de classe de ativo descartam diretórios inteiros antes de abrir arquivos.
 
     A API foi desenhada com duas camadas de uso:
     1. Acesso Direto: Para usuários que sabem exatamente quais tickers e
        dados desejam, oferecendo a máxima velocidade.
     2. Acesso Exploratório: Para usuários que desejam descobrir ativos por nome
        de empresa ou classe de ativo, oferecendo uma interface mais intuitiva.
+
+    Uma instância pode ser compartilhada entre threads (ex: por um serviço
+    que atende vários usuários): o estado carregado sob demanda (dataset,
+    índices de busca, fatores de ajuste, repositório de opções, cache) é
+    protegido por travas, e cada consulta trabalha com os seus próprios
+    objetos. `aget_quotes` é a versão para `asyncio` de `get_quotes`.
     """
-    def __init__(self, data_path: str = 'data/processed'):
+    def __init__(self, data_path: str = 'data/processed', memory_map: bool = True, cache_max_bytes: int = 0,
+                 scan_workers: Optional[int] = None, max_concurrent_bytes: int = 0):
         """
         Inicializa o analisador B3Data.
 
         Este método configura os caminhos para os arquivos de dados e pré-carrega
         dicionários de mapeamento essenciais que são pequenos e usados com frequência.
         A carga do dataset principal (Parquet) NÃO ocorre aqui, garantindo uma
-        inicialização rápida.
+        inicialização rápida: ele é aberto na primeira consulta e mantido aberto
+        (com os metadados dos arquivos em cache) nas seguintes, sendo reaberto
+        apenas quando algum arquivo muda de tamanho ou mtime (verificado no
+        máximo uma vez por segundo, ver `DatasetHandle`).
 
         Args:
             data_path (str): O caminho para o diretório 'processed', que deve
-                             conter o arquivo 'dados_b3.parquet'. Espera-se que
-                             um diretório irmão chamado 'outputs' contenha os
-                             arquivos de dicionário em formato .xlsx e .parquet.
+                             conter o dataset particionado 'dados_b3'. Espera-se
+                             que um diretório irmão chamado 'outputs' contenha os
+                             dicionário de ativos ('dicionario_ativos.arrow'
+                             ou '.parquet'). Os mapas de CODBDI e TPMERC vêm
+                             de `b3_analyzer.codes`.
+            memory_map (bool): Se True (padrão), os arquivos do dataset são
+                               lidos via memory map, sem cópias para buffers
+                               intermediários.
+            cache_max_bytes (int): Orçamento de memória, em bytes, do cache de
+                                   resultados de `get_quotes` (LRU). Com 0
+                                   (padrão), o cache fica desativado.
+            scan_workers (int, optional): Threads do pool de leitura, que lê
+                em paralelo os grupos de linhas de uma consulta (ver
+                `b3_analyzer.scan`). O pool é compartilhado por todas as
+                consultas da instância, o que limita as threads de leitura
+                mesmo com muitas consultas simultâneas. Padrão: número de
+                CPUs; com 0 ou 1, cada leitura usa o paralelismo interno do Arrow.
+            max_concurrent_bytes (int): Orçamento de memória, em bytes, das
+                consultas em andamento (controle de admissão): uma consulta
+                cuja estimativa não cabe no que resta espera as outras
+                terminarem. Com 0 (padrão), não há limite.
         
         Estrutura de diretórios esperada:
         - .../
           - data/
             - processed/
-              - dados_b3.parquet
+              - dados_b3/
+                - ANO=2023/
+                  - COTAHIST_A2023.parquet
+                - ...
             - outputs/
+              - dicionario_ativos.arrow
               - dicionario_ativos.parquet
-              - dicionario_codbdi.xlsx
-              - dicionario_tpmerc.xlsx
         """
-        print("Iniciando o Analisador B3Data...")
+        logger.info("Iniciando o Analisador B3Data...")
         self.base_path = Path(data_path)
         self.outputs_path = self.base_path.parent / 'outputs'
-        self.full_data_path = self.base_path / 'dados_b3.parquet'
+        self.full_data_path = self.base_path / 'dados_b3'
+        if not self.full_data_path.exists() and (self.base_path / 'dados_b3.parquet').exists():
+            # Compatibilidade com o layout antigo (um único arquivo consolidado).
+            self.full_data_path = self.base_path / 'dados_b3.parquet'
         
         if not self.full_data_path.exists():
             raise FileNotFoundError(f"Arquivo de dados principal não encontrado: {self.full_data_path}")
+        self._dataset_handle = DatasetHandle(self.full_data_path, memory_map=memory_map)
+        self._cache = QueryCache(cache_max_bytes) if cache_max_bytes > 0 else None
+        # Trava do estado carregado sob demanda (índices, fatores de ajuste, repositório de opções).
+        self._lock = threading.RLock()
+        self.scan_workers = (os.cpu_count() or 1) if scan_workers is None else scan_workers
+        self._scan_pool = ThreadPoolExecutor(self.scan_workers, thread_name_prefix='b3-leitura') \
+            if self.scan_workers > 1 else None
+        self._budget = MemoryBudget(max_concurrent_bytes) if max_concurrent_bytes > 0 else None
 
         try:
             # O dicionário de ativos é o "security master" do nosso sistema.
             # É pequeno o suficiente para ser carregado na memória.
-            self.df_dicionario = pd.read_parquet(self.outputs_path / 'dicionario_ativos.parquet')
-            print(f" -> Dicionário de {len(self.df_dicionario):,} ativos carregado.")
-            
-            # Mapeamentos para traduzir descrições amigáveis (ex: 'VISTA') para códigos numéricos.
-            self.codbdi_map = pd.read_excel(self.outputs_path / 'dicionario_codbdi.xlsx').set_index('DESCRICAO_CODBDI')['CODBDI'].to_dict()
-            self.tpmerc_map = pd.read_excel(self.outputs_path / 'dicionario_tpmerc.xlsx').set_index('DESCRICAO_TPMERC')['TPMERC'].to_dict()
-            print(" -> Mapeamentos de CODBDI e TPMERC carregados.")
+            self.df_dicionario = self._load_security_master()
+            logger.info(f" -> Dicionário de {len(self.df_dicionario):,} ativos carregado.")
         except FileNotFoundError as e:
             raise FileNotFoundError(f"Erro ao carregar dicionário essencial: {e}. Execute o script de geração de dicionários.")
+        # Índices de busca (tickers, ISIN e trigramas de nomes), construídos na primeira busca.
+        self._asset_index = None
+        # Fatores de ajuste de preços e a assinatura e versão do dataset de que vieram (ver `adjustment_factors`).
+        self._adjustments = None
+        self._adjustments_signature = None
+        self._adjustments_version = None
+        # Repositório de opções (ver `get_options_chain`) e a assinatura do dataset de que veio.
+        self._options_store = None
+        self._options_store_signature = None
+        # Tabela 'indice_tickers' em memória (ver `_route_by_ticker_index`) e a assinatura do dataset de que veio.
+        self._ticker_index = None
+        self._ticker_index_signature = None
+
+        # Mapeamentos para traduzir descrições amigáveis (ex: 'VISTA') para códigos numéricos.
+        self.codbdi_map = description_to_code(CODBDI_DESCRIPTIONS)
+        self.tpmerc_map = description_to_code(TPMERC_DESCRIPTIONS)
             
-        print("Analisador B3Data pronto para uso.")
+        logger.info("Analisador B3Data pronto para uso.")
+
+    def _load_security_master(self) -> pd.DataFrame:
+        """
+        (Helper Interno) Carrega o dicionário de ativos.
+
+        Usa a versão Arrow IPC ('dicionario_ativos.arrow'), lida via memory map
+        sem decodificação, e recorre ao Parquet em diretórios gerados antes dela.
+        """
+        ipc_path = self.outputs_path / 'dicionario_ativos.arrow'
+        if ipc_path.exists():
+            return pa.ipc.open_file(pa.memory_map(str(ipc_path))).read_all().to_pandas()
+        return pd.read_parquet(self.outputs_path / 'dicionario_ativos.parquet')
+
+    @property
+    def asset_index(self) -> AssetIndex:
+        """Índices de busca do dicionário de ativos (ver `AssetIndex`), construídos no primeiro uso."""
+        with self._lock:
+            if self._asset_index is None:
+                self._asset_index = AssetIndex(self.df_dicionario)
+            return self._asset_index
+
+    @property
+    def partition_fields(self) -> List[str]:
+        """Colunas de partição do dataset (ex: ['ANO', 'CODBDI'])."""
+        return self._dataset_handle.partition_fields
 
     def find_assets(self, query: str) -> pd.DataFrame:
         """
@@ -78,7 +184,9 @@ class B3Data:
 
         Este método é o principal ponto de entrada para a exploração de ativos.
         Ele procura por correspondências parciais no nome da empresa, em todos
-        os tickers históricos e por correspondência exata no código ISIN.
+        os tickers históricos e por correspondência exata no código ISIN. A
+        busca usa os índices construídos na primeira chamada (ver `AssetIndex`),
+        sem varrer o dicionário.
 
         Args:
             query (str): O termo de busca. Pode ser um nome de empresa
@@ -90,16 +198,45 @@ class B3Data:
                           ativos que correspondem à busca.
         """
         query_upper = query.upper()
-        
-        # Constrói máscaras booleanas para cada tipo de busca
-        mask_ticker = self.df_dicionario['TICKERS_HISTORICOS'].str.contains(f"\\b{query_upper}\\b", regex=True, na=False)
-        mask_name = self.df_dicionario['NOMES_HISTORICOS'].str.contains(query_upper, regex=False, na=False)
-        mask_isin = self.df_dicionario['CODISI'] == query_upper
-        
-        # Combina as máscaras para encontrar qualquer correspondência
-        combined_mask = mask_ticker | mask_name | mask_isin
-        
-        return self.df_dicionario[combined_mask].copy()
+
+        # Une as correspondências por ticker, nome e ISIN, na ordem do dicionário
+        positions = self.asset_index.search(query_upper)
+        return self.df_dicionario.iloc[positions].copy()
+
+    def resolve_assets(self, queries: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Resolve várias buscas de uma vez contra o dicionário de ativos.
+
+        Equivale a chamar `find_assets` para cada termo, mas consultas repetidas
+        são resolvidas uma única vez.
+
+        Args:
+            queries (List[str]): Os termos de busca (nomes, tickers ou ISINs).
+
+        Returns:
+            Dict[str, pd.DataFrame]: Os ativos encontrados, indexados pelo termo
+                                     original de cada busca.
+        """
+        positions = self.asset_index.search_many([q.upper() for q in queries])
+        return {q: self.df_dicionario.iloc[positions[q.upper()]].copy() for q in queries}
+
+    def _entity_tickers(self, asset_info: pd.DataFrame, asset_class: Optional[str]) -> List[str]:
+        """
+        (Helper Interno) Extrai os tickers a consultar para os ativos de uma entidade.
+
+        Mantém apenas tickers com formato válido (ex: AAAA11) e, para a classe
+        'equity', apenas os que são tipicamente ações/units.
+        """
+        all_tickers_raw = asset_info['TICKERS_HISTORICOS'].str.split(' | ').explode().unique()
+        valid_tickers = [t for t in all_tickers_raw if t and re.match("^[A-Z]{4}[0-9]{1,2}$", t)]
+        if asset_class == 'equity':
+            return [t for t in valid_tickers if t.endswith(('3', '4', '5', '6', '11'))]
+        return valid_tickers
+
+    def _options_root(self, asset_info: pd.DataFrame) -> Optional[str]:
+        """(Helper Interno) O radical de 4 letras do ativo-objeto (ex: 'VALE'), ou None se o ticker não tiver um."""
+        match = re.match("^[A-Z]{4}", str(asset_info.iloc[0]['ULTIMO_TICKER']))
+        return match.group(0) if match else None
 
     def _build_parquet_filters(self, **kwargs) -> List[tuple]:
         """
@@ -123,7 +260,7 @@ class B3Data:
             if ac_lower == 'equity': filters.extend([('CODBDI', 'in', [2, 96]), ('TPMERC', 'in', [10, 20])])
             elif ac_lower == 'fii': filters.append(('CODBDI', '==', 12))
             elif ac_lower == 'options': filters.extend([('TPMERC', 'in', [70, 80, 12, 13])])
-            # BDR e 'especificacao' são tratados na pós-filtragem para máxima robustez.
+            # BDR e 'especificacao' viram filtros de texto (ver `_build_scan_expression`).
 
         # Mapeia argumentos diretos para colunas e operadores
         filter_map = {
@@ -136,8 +273,17 @@ class B3Data:
             if value is not None:
                 if op == 'in' and not isinstance(value, list): value = [value]
                 if arg == 'tickers': value = [str(v).upper() for v in value]
-                if 'date' in arg or 'vencimento' in arg: value = pd.to_datetime(value)
+                # Datas vão como `date`, o tipo das colunas no dataset; com um Timestamp o
+                # Arrow converteria a coluna e deixaria de usar as estatísticas do Parquet.
+                if 'date' in arg or 'vencimento' in arg: value = pd.to_datetime(value).date()
                 filters.append((col, op, value))
+
+        # Filtros redundantes sobre a partição 'ANO', que podam diretórios inteiros
+        if 'ANO' in self.partition_fields:
+            if kwargs.get('start_date') is not None:
+                filters.append(('ANO', '>=', pd.to_datetime(kwargs['start_date']).year))
+            if kwargs.get('end_date') is not None:
+                filters.append(('ANO', '<=', pd.to_datetime(kwargs['end_date']).year))
         
         # Traduz descrições de CODBDI e TPMERC para seus códigos numéricos
         for code_arg, code_map in [('codbdi', self.codbdi_map), ('tpmerc', self.tpmerc_map)]:
@@ -162,8 +308,9 @@ class B3Data:
             entity (str, optional): Nome de uma empresa para buscar todos os seus ativos.
             asset_class (str, optional): Uma classe de ativo de alto nível.
                 Opções: 'equity', 'fii', 'bdr', 'options'.
-            ticker_root (str, optional): O radical de 4 letras de um ticker, usado
-                principalmente para encontrar todas as opções de um ativo-objeto (ex: 'VALE').
+            ticker_root (Union[str, List[str]], optional): O radical de 4 letras de
+                um ticker (ou uma lista deles), usado principalmente para encontrar
+                todas as opções de um ativo-objeto (ex: 'VALE').
             start_date (str, optional): Data de início no formato 'YYYY-MM-DD'.
             end_date (str, optional): Data de fim no formato 'YYYY-MM-DD'.
             columns (List[str], optional): Lista de colunas a serem retornadas.
@@ -177,10 +324,212 @@ class B3Data:
             codisi (Union[str, List[str]], optional): Filtra pelo código ISIN.
             vencimento_min (str, optional): Data de vencimento mínima para derivativos.
             vencimento_max (str, optional): Data de vencimento máxima para derivativos.
+            categorical (bool, optional): Se True, as colunas de texto (CODNEG,
+                NOMRES, ESPECI, MODREF, CODISI) são entregues como
+                `pd.Categorical` (codificação em dicionário), o que reduz
+                bastante a memória do resultado. Padrão: False (strings).
+            adjusted (bool, optional): Se True, os preços (PREABE, PREMAX,
+                PREMIN, PREMED, PREULT, PREOFC, PREOFV) são ajustados por
+                mudanças de FATCOT, desdobramentos e grupamentos, na escala
+                do pregão mais recente (ver `adjustment_factors`). Volume e
+                quantidade ficam como negociados. Padrão: False.
 
         Returns:
             pd.DataFrame: Um DataFrame com os dados solicitados, ordenado por
-                          ticker e data.
+                          ticker e data. Preços são float64 (reais), datas
+                          datetime64 e códigos inteiros anuláveis (Int8...Int64).
+                          Se a leitura falhar, o erro é registrado no log
+                          (com o traceback) e em um evento de métrica com
+                          status 'erro', e o DataFrame retornado é vazio.
+
+        Cada chamada emite um evento de métrica 'consulta' (ver
+        `b3_analyzer.metrics`) com os filtros, o uso do cache, os tempos de
+        leitura, ordenação e decodificação, os grupos de linhas lidos e
+        descartados, os bytes lidos e a seletividade.
+
+        Consultas por tickers usam a tabela agregada 'indice_tickers' (se em
+        dia, ver `build_aggregates`) para ler só os anos entre o primeiro e o
+        último pregão dos tickers; tickers que nunca negociaram não leem nada.
+        """
+        started = time.perf_counter()
+        plan = self._plan_query(kwargs)
+        if plan is None:
+            return pd.DataFrame()
+        filters, columns_to_load = plan['filters'], plan['columns']
+        query = self._query_fields('get_quotes', plan)
+
+        # --- Cache de Resultados ---
+        if self._cache is not None:
+            self._cache.sync_version(plan['version'])
+            base_filters, date_range = normalize_filters(filters)
+            post_filters = (
+                tuple(plan['ticker_root']) if isinstance(plan['ticker_root'], list) else plan['ticker_root'],
+                plan['bdr'],
+                tuple(plan['especificacao']) if isinstance(plan['especificacao'], list) else plan['especificacao'],
+                plan['categorical'],
+                plan['adjusted'],
+            )
+            cache_key = (base_filters, post_filters)
+            cached = self._cache.get(cache_key, date_range, columns_to_load)
+            if cached is not None:
+                logger.info(f" -> {len(cached):,} registros servidos do cache.")
+                self._emit_query(query, started, cache='acerto', linhas=len(cached))
+                return cached
+        
+        try:
+            # --- Leitura Otimizada do Parquet ---
+            # Filtros de pré-leitura e de texto (radical, BDR, especificação)
+            # são avaliados pelo Arrow durante a leitura.
+            with self._scan(plan, columns_to_load, query) as table:
+                # Ordena ainda no Arrow e só então converte preços em centavos,
+                # datas e textos para os tipos de consulta.
+                sort_start = time.perf_counter()
+                table = table.sort_by([('CODNEG', 'ascending'), ('DATA_PREGAO', 'ascending')])
+                decode_start = time.perf_counter()
+                df = self._decode_chunk(table, plan)
+                query.update(ordenacao_s=round(decode_start - sort_start, 6),
+                             decodificacao_s=round(time.perf_counter() - decode_start, 6), bytes_memoria=table.nbytes)
+
+            logger.info(f" -> {len(df):,} registros carregados e filtrados.")
+            if not df.empty: df = df.reset_index(drop=True)
+            if self._cache is not None:
+                # O cache guarda o próprio DataFrame; o chamador recebe uma cópia.
+                self._cache.put(cache_key, date_range, columns_to_load, df, version=plan['version'])
+                self._emit_query(query, started, plan, cache='falta', linhas=len(df))
+                return df.copy()
+            self._emit_query(query, started, plan, linhas=len(df))
+            return df
+            
+        except Exception as e:
+            logger.exception(f"ERRO ao ler o arquivo Parquet ou ao filtrar: {e}")
+            self._emit_query(query, started, status='erro', erro=f'{type(e).__name__}: {e}')
+            return pd.DataFrame()
+
+    async def aget_quotes(self, **kwargs) -> pd.DataFrame:
+        """
+        Versão para `asyncio` de `get_quotes`, com os mesmos argumentos e resultado.
+
+        A consulta roda em uma thread do executor padrão do loop, sem
+        bloqueá-lo; várias chamadas simultâneas (ex: `asyncio.gather`) dividem
+        o pool de leitura e o orçamento de memória da instância.
+
+        Exemplo:
+            petr, vale = await asyncio.gather(analyzer.aget_quotes(tickers='PETR4'),
+                                              analyzer.aget_quotes(tickers='VALE3'))
+        """
+        return await asyncio.to_thread(self.get_quotes, **kwargs)
+
+    @contextmanager
+    def _scan(self, plan: dict, columns: List[str], query: dict) -> Iterator[pa.Table]:
+        """
+        (Helper Interno) Lê as linhas de um plano, com controle de admissão e leitura paralela.
+
+        Com o orçamento de memória ativo, a consulta reserva, antes de ler, a
+        sua estimativa (`_MEMORY_PER_BYTE_READ` x o tamanho descomprimido das
+        colunas lidas nos grupos de linhas que sobrevivem às estatísticas),
+        mantida até o fim do bloco, onde a tabela é convertida. Com o pool de
+        leitura e mais de uma tarefa, os grupos de linhas são lidos em
+        paralelo (ver `b3_analyzer.scan`); senão, pelo próprio Arrow. Os
+        tempos de espera e de leitura vão para `query`.
+
+        Yields:
+            pa.Table: As linhas lidas, na ordem do dataset.
+        """
+        dataset, expression, pool = plan['dataset'], plan['expression'], self._scan_pool
+        tasks = None
+        if pool is not None or self._budget is not None:
+            tasks = plan_scan(dataset, expression, columns, self.scan_workers)
+        if self._budget is not None:
+            estimate = _MEMORY_PER_BYTE_READ * sum(task.nbytes for task in tasks)
+            reservation = self._budget.reserve(estimate)
+            query['bytes_reservados'] = min(estimate, self._budget.max_bytes)
+        else:
+            reservation = nullcontext(0.0)
+        with reservation as waited:
+            read_start = time.perf_counter()
+            if pool is not None and len(tasks) > 1:
+                table = read_tasks(pool, tasks, dataset.schema, columns, expression)
+                query['tarefas_leitura'] = len(tasks)
+            else:
+                table = dataset.to_table(columns=columns, filter=expression)
+            query.update(espera_admissao_s=round(waited, 6), leitura_s=round(time.perf_counter() - read_start, 6))
+            yield table
+
+    def _query_fields(self, method: str, plan: dict) -> dict:
+        """(Helper Interno) Os campos de um plano de leitura que identificam a consulta no evento de métrica."""
+        return {
+            'metodo': method, 'filtros': plan['filters'], 'colunas': sorted(plan['columns']),
+            'radical': plan['ticker_root'], 'bdr': plan['bdr'], 'especificacao': plan['especificacao'],
+            'ajustado': plan['adjusted'], 'indice_tickers': plan['indice_tickers'],
+        }
+
+    def _emit_query(self, query: dict, started: float, plan: Optional[dict] = None, **fields):
+        """
+        (Helper Interno) Emite o evento de métrica 'consulta', com a duração desde `started`.
+
+        Com um plano (leitura do dataset principal), inclui as estatísticas
+        de `_scan_stats` e a seletividade: linhas retornadas sobre as linhas
+        dos grupos de linhas lidos. Nada é calculado sem ganchos de métrica.
+        """
+        if not metrics.enabled():
+            return
+        event = {**query, 'status': 'ok', **fields}
+        event['duracao_s'] = round(time.perf_counter() - started, 6)
+        if plan is not None:
+            try:
+                event.update(self._scan_stats(plan['dataset'], plan['expression'], event['colunas']))
+            except Exception:
+                logger.warning("Falha ao calcular as estatísticas de leitura da consulta.", exc_info=True)
+            if event.get('linhas_candidatas'):
+                event['seletividade'] = round(event['linhas'] / event['linhas_candidatas'], 6)
+        metrics.emit('consulta', **event)
+
+    def _scan_stats(self, dataset: ds.Dataset, expression: Optional[ds.Expression], columns: List[str]) -> dict:
+        """
+        (Helper Interno) Grupos de linhas lidos e descartados por uma leitura do dataset.
+
+        Refaz, sobre os metadados já carregados, a poda do Arrow: partições
+        descartadas pela expressão e grupos de linhas descartados pelas
+        estatísticas (mín./máx.). 'bytes_lidos' é o tamanho comprimido, em
+        disco, das colunas lidas nos grupos que sobraram.
+
+        Returns:
+            dict: 'grupos_total', 'grupos_lidos', 'grupos_descartados',
+                  'linhas_candidatas' (linhas dos grupos lidos) e 'bytes_lidos'.
+        """
+        total = scanned = rows = bytes_read = 0
+        for fragment in dataset.get_fragments():
+            total += fragment.num_row_groups
+        for fragment in dataset.get_fragments(filter=expression):
+            metadata = fragment.metadata
+            names = metadata.schema.names
+            positions = [names.index(col) for col in columns if col in names]
+            # A expressão usa as colunas de partição, que só existem no schema do dataset.
+            pieces = fragment.split_by_row_group(expression, schema=dataset.schema)
+            for piece in pieces:
+                for row_group in piece.row_groups:
+                    scanned += 1
+                    rows += row_group.num_rows
+                    group = metadata.row_group(row_group.id)
+                    bytes_read += sum(group.column(i).total_compressed_size for i in positions)
+        return {'grupos_total': total, 'grupos_lidos': scanned, 'grupos_descartados': total - scanned,
+                'linhas_candidatas': rows, 'bytes_lidos': bytes_read}
+
+    def _plan_query(self, kwargs: dict) -> Optional[dict]:
+        """
+        (Helper Interno) Traduz os argumentos de `get_quotes` em um plano de leitura.
+
+        Resolve a camada exploratória (entidade -> tickers ou radical de opções),
+        monta os filtros de pré-leitura e a lista de colunas e combina tudo,
+        com os filtros de texto, na expressão avaliada durante a leitura.
+
+        Returns:
+            Optional[dict]: O plano ('dataset', 'filters', 'columns',
+                            'ticker_root', 'bdr', 'especificacao',
+                            'categorical', 'adjusted', 'indice_tickers',
+                            'version' (a versão do dataset lido, ver
+                            `DatasetHandle.snapshot`), 'expression'), ou None
+                            se a entidade buscada não existir no dicionário.
         """
         params = kwargs.copy()
         ticker_root_for_options = None
@@ -189,37 +538,33 @@ class B3Data:
         entity_query = params.get('entity')
         if entity_query and params.get('asset_class') == 'options':
             # Caso especial: busca de opções por entidade. Requer lógica de radical.
-            print(f"Modo de busca de opções para a entidade: '{entity_query}'...")
+            logger.info(f"Modo de busca de opções para a entidade: '{entity_query}'...")
             asset_info = self.find_assets(entity_query)
-            if not asset_info.empty:
-                main_ticker = asset_info.iloc[0]['ULTIMO_TICKER']
-                ticker_root_for_options = re.match("^[A-Z]{4}", main_ticker).group(0)
-                print(f" -> Radical do ativo-objeto identificado: '{ticker_root_for_options}'")
+            ticker_root_for_options = self._options_root(asset_info) if not asset_info.empty else None
+            if ticker_root_for_options:
+                logger.info(f" -> Radical do ativo-objeto identificado: '{ticker_root_for_options}'")
                 del params['entity'] # Evita que a busca por entidade gere um filtro de tickers
             else:
-                return pd.DataFrame()
+                return None
         elif entity_query and 'tickers' not in params:
             # Caso geral: busca por entidade para outras classes de ativos.
             asset_info = self.find_assets(entity_query)
             if not asset_info.empty:
-                all_tickers_raw = asset_info['TICKERS_HISTORICOS'].str.split(' | ').explode().unique()
-                # Filtra para manter apenas tickers com formato válido (ex: AAAA11)
-                valid_tickers = [t for t in all_tickers_raw if t and re.match("^[A-Z]{4}[0-9]{1,2}$", t)]
-                if params.get('asset_class') == 'equity':
-                    # Refina a busca para tickers que são tipicamente ações/units.
-                    params['tickers'] = [t for t in valid_tickers if t.endswith(('3', '4', '5', '6', '11'))]
-                else:
-                    params['tickers'] = valid_tickers
+                params['tickers'] = self._entity_tickers(asset_info, params.get('asset_class'))
             else:
-                return pd.DataFrame()
+                return None
         
         # Validação para garantir que pelo menos um filtro principal foi fornecido
         valid_starters = ['tickers', 'entity', 'codisi', 'codbdi', 'tpmerc', 'asset_class', 'ticker_root']
         if not any(k in params for k in valid_starters):
              raise ValueError(f"Você deve fornecer um dos seguintes argumentos: {valid_starters}")
         
+        # Obtém o dataset (reaberto se mudou) antes dos filtros, que dependem das partições
+        dataset, signature, version = self._dataset_handle.snapshot()
+
         # Constrói os filtros de pré-leitura
         filters = self._build_parquet_filters(**params)
+        routed = self._route_by_ticker_index(params.get('tickers'), filters, signature)
         
         # Define quais colunas carregar
         user_columns = params.get('columns')
@@ -230,46 +575,669 @@ class B3Data:
         else:
             columns_to_load = list(key_columns | set(user_columns))
         
-        # Garante que a coluna 'ESPECI' seja carregada se for necessária para a pós-filtragem
+        # A coluna 'ESPECI' acompanha o resultado quando há filtros de texto sobre ela ou o radical
         if params.get('especificacao') or params.get('asset_class') == 'bdr' or params.get('ticker_root'):
             if 'ESPECI' not in columns_to_load:
                 columns_to_load.append('ESPECI')
-        
-        try:
-            # --- Leitura Otimizada do Parquet ---
-            df = pd.read_parquet(self.full_data_path, columns=columns_to_load, filters=filters if filters else None)
-            
-            # --- Camada de Pós-Filtragem (para filtros complexos) ---
+
+        asset_class_param = params.get('asset_class')
+        ticker_root = params.get('ticker_root') or ticker_root_for_options
+        if isinstance(ticker_root, list):
+            ticker_root = sorted({str(root).upper() for root in ticker_root})
+        elif ticker_root:
+            ticker_root = ticker_root.upper()
+        plan = {
+            'dataset': dataset,
+            'filters': filters,
+            'columns': columns_to_load,
+            'ticker_root': ticker_root,
+            'bdr': bool(asset_class_param and asset_class_param.lower() == 'bdr'),
+            'especificacao': params.get('especificacao'),
+            'categorical': bool(params.get('categorical', False)),
+            'adjusted': bool(params.get('adjusted', False)),
+            'indice_tickers': routed,
+            'version': version,
+        }
+        plan['expression'] = self._build_scan_expression(plan)
+        return plan
+
+    def _load_ticker_index(self, signature: tuple) -> Optional[pa.Table]:
+        """(Helper Interno) A tabela 'indice_tickers' (CODNEG, PRIMEIRO_PREGAO, ULTIMO_PREGAO), se ela estiver em dia com o dataset."""
+        with self._lock:
+            if self._ticker_index_signature != signature:
+                aggregate = load_aggregate(self.base_path, 'indice_tickers', signature)
+                columns = ['CODNEG', 'PRIMEIRO_PREGAO', 'ULTIMO_PREGAO']
+                self._ticker_index = aggregate.to_table(columns=columns) if aggregate is not None else None
+                self._ticker_index_signature = signature
+            return self._ticker_index
+
+    def _route_by_ticker_index(self, tickers: Optional[List[str]], filters: List[tuple], signature: tuple) -> bool:
+        """
+        (Helper Interno) Restringe os anos lidos por uma consulta de tickers com a tabela 'indice_tickers'.
+
+        Com a tabela em dia com o dataset (ver `build_aggregates`) e o dataset
+        particionado por ano, acrescenta a `filters` o intervalo de anos entre
+        o primeiro e o último pregão dos tickers pedidos: partições fora dele
+        não são abertas, e tickers inexistentes não leem arquivo algum. O
+        resultado da consulta não muda.
+
+        Returns:
+            bool: True se a consulta foi restringida pelo índice.
+        """
+        if not tickers or 'ANO' not in self.partition_fields:
+            return False
+        index = self._load_ticker_index(signature)
+        if index is None:
+            return False
+        tickers = tickers if isinstance(tickers, list) else [tickers]
+        wanted = pa.array([str(t).upper() for t in tickers], pa.string())
+        rows = index.filter(pc.is_in(index['CODNEG'], value_set=wanted))
+        first, last = pc.min(rows['PRIMEIRO_PREGAO']).as_py(), pc.max(rows['ULTIMO_PREGAO']).as_py()
+        if first is None or last is None:
+            # Nenhum dos tickers existe no dataset: um intervalo vazio poda todas as partições.
+            filters.extend([('ANO', '>=', 1), ('ANO', '<=', 0)])
+        else:
+            filters.extend([('ANO', '>=', first.year), ('ANO', '<=', last.year)])
+        return True
+
+    def _build_scan_expression(self, plan: dict) -> Optional[ds.Expression]:
+        """
+        (Helper Interno) Combina os filtros de pré-leitura e os filtros de texto em uma expressão do Arrow.
+
+        Radical do ticker, BDR e especificação são avaliados durante a leitura
+        (com `starts_with` e `match_substring[_regex]`), e não em pandas depois
+        dela. O radical também vira um intervalo [radical, radical seguinte) em
+        CODNEG, que o Arrow compara com o mín./máx. de cada row group para
+        descartá-los sem leitura; vários radicais viram a união dos intervalos.
+
+        Returns:
+            Optional[ds.Expression]: A expressão, ou None se não houver filtros.
+        """
+        expressions = [pq.filters_to_expression(plan['filters'])] if plan['filters'] else []
+
+        # Filtro por radical do ticker (usado para opções)
+        if plan['ticker_root']:
+            roots = plan['ticker_root'] if isinstance(plan['ticker_root'], list) else [plan['ticker_root']]
+            codneg = pc.field('CODNEG')
+            root_expressions = []
+            for root in roots:
+                upper_bound = root[:-1] + chr(ord(root[-1]) + 1)
+                root_expressions.append((codneg >= root) & (codneg < upper_bound) & pc.starts_with(codneg, root))
+            root_expression = root_expressions[0]
+            for other in root_expressions[1:]:
+                root_expression = root_expression | other
+            expressions.append(root_expression)
+
+        # ESPECI é um campo em dicionário, e as funções de texto exigem strings
+        especi = pc.field('ESPECI').cast(pa.string())
+        # Filtro por classe de ativo 'bdr'
+        if plan['bdr']:
+            expressions.append(pc.match_substring(especi, 'DR', ignore_case=True))
+
+        # Filtro por 'especificacao'
+        espec_value = plan['especificacao']
+        if espec_value is not None:
+            if not isinstance(espec_value, list): espec_value = [espec_value]
+            pattern = '|'.join(espec_value)
+            expressions.append(pc.match_substring_regex(especi, pattern, ignore_case=True))
+
+        if not expressions:
+            return None
+        expression = expressions[0]
+        for other in expressions[1:]:
+            expression = expression & other
+        return expression
+
+    def iter_quotes(self, batch_size: int = 500_000, ordered: bool = False, **kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Versão em fluxo de `get_quotes`, para consultas maiores que a memória.
+
+        Aceita os mesmos filtros de `get_quotes`, mas lê o dataset com um
+        scanner do PyArrow e entrega o resultado em blocos, com os filtros de
+        texto (radical, BDR, especificação) avaliados durante a leitura. O
+        resultado nunca é materializado por inteiro, nem ordenado globalmente,
+        e o cache de resultados não é usado.
+
+        Args:
+            batch_size (int): Número máximo de linhas lidas por bloco. A memória
+                              usada é proporcional a esse valor (mais os blocos
+                              que o scanner lê antecipadamente).
+            ordered (bool): Se False (padrão), os blocos saem na ordem dos
+                arquivos, sem ordenação. Se True, as linhas saem ordenadas por
+                ticker e data, como em `get_quotes`: uma primeira passada conta
+                as linhas de cada ticker (lendo só CODNEG) e os tickers são
+                agrupados em lotes de até `batch_size` linhas, cada um lido e
+                ordenado separadamente. Um ticker com mais linhas que
+                `batch_size` forma um lote sozinho.
+            **kwargs: Os filtros de `get_quotes` (tickers, entity, asset_class,
+                      datas, columns, categorical, etc.).
+
+        Yields:
+            pd.DataFrame: Blocos não vazios do resultado, com os mesmos tipos de
+                          `get_quotes` (com `categorical=True`, as categorias
+                          são as de cada bloco).
+        """
+        started = time.perf_counter()
+        plan = self._plan_query(kwargs)
+        if plan is None:
+            return
+        dataset, expression = plan['dataset'], plan['expression']
+        query = {**self._query_fields('iter_quotes', plan), 'ordenado': ordered}
+
+        if not ordered:
+            rows = 0
+            scanner = dataset.scanner(columns=plan['columns'], filter=expression, batch_size=batch_size)
+            for batch in scanner.to_batches():
+                df = self._decode_chunk(pa.Table.from_batches([batch]), plan)
+                if not df.empty:
+                    rows += len(df)
+                    yield df
+            self._emit_query(query, started, plan, linhas=rows)
+            return
+
+        # Primeira passada: linhas por ticker, lendo apenas CODNEG.
+        counts = {}
+        scanner = dataset.scanner(columns=['CODNEG'], filter=expression, batch_size=batch_size)
+        for batch in scanner.to_batches():
+            for item in pc.value_counts(batch.column(0)).to_pylist():
+                if item['values'] is not None:
+                    counts[item['values']] = counts.get(item['values'], 0) + item['counts']
+
+        # Agrupa os tickers (em ordem) em lotes de até `batch_size` linhas.
+        groups, current, current_rows = [], [], 0
+        for ticker in sorted(counts):
+            if current and current_rows + counts[ticker] > batch_size:
+                groups.append(current)
+                current, current_rows = [], 0
+            current.append(ticker)
+            current_rows += counts[ticker]
+        if current:
+            groups.append(current)
+
+        rows = 0
+        for group in groups:
+            group_filter = pc.field('CODNEG').isin(group)
+            if expression is not None:
+                group_filter = expression & group_filter
+            table = dataset.to_table(columns=plan['columns'], filter=group_filter)
+            table = table.sort_by([('CODNEG', 'ascending'), ('DATA_PREGAO', 'ascending')])
+            df = self._decode_chunk(table, plan)
             if not df.empty:
-                # Filtro por radical do ticker (usado para opções)
-                ticker_root = params.get('ticker_root') or ticker_root_for_options
-                if ticker_root:
-                    df = df[df['CODNEG'].str.startswith(ticker_root.upper(), na=False)]
-                
-                # Filtro por classe de ativo 'bdr'
-                asset_class_param = params.get('asset_class')
-                if asset_class_param and asset_class_param.lower() == 'bdr':
-                    df = df[df['ESPECI'].str.contains('DR', na=False, case=False)]
-                
-                # Filtro por 'especificacao'
-                espec_value = params.get('especificacao')
-                if espec_value is not None:
-                    if not isinstance(espec_value, list): espec_value = [espec_value]
-                    pattern = '|'.join(espec_value)
-                    df = df[df['ESPECI'].str.contains(pattern, na=False, case=False, regex=True)]
-
-            print(f" -> {len(df):,} registros carregados e filtrados.")
-            if df.empty: return df
-            return df.sort_values(by=['CODNEG', 'DATA_PREGAO']).reset_index(drop=True)
-            
-        except Exception as e:
-            print(f"ERRO ao ler o arquivo Parquet ou ao filtrar: {e}")
+                rows += len(df)
+                yield df.reset_index(drop=True)
+        self._emit_query(query, started, plan, linhas=rows, lotes=len(groups))
+
+    def _decode_chunk(self, table: pa.Table, plan: dict) -> pd.DataFrame:
+        """(Helper Interno) Converte um bloco lido do dataset para os tipos de consulta (e ajusta os preços, se pedido)."""
+        factors = self.adjustment_factors.factors(table['CODISI'], table['DATA_PREGAO']) if plan['adjusted'] else None
+        table = decode_storage_table(table, dictionary=plan['categorical'])
+        if factors is not None:
+            table = apply_adjustment(table, factors)
+        return table.to_pandas(types_mapper=PANDAS_INT_TYPES.get)
+
+    @property
+    def adjustment_factors(self) -> AdjustmentFactors:
+        """
+        Fatores de ajuste de preços por CODISI (ver `b3_analyzer.adjustments`).
+
+        Vêm da tabela 'fatores_ajuste' gerada por `build_aggregates`, quando
+        ela está em dia com o dataset; senão, são derivados das cotações do
+        mercado à vista. Em ambos os casos ficam em memória até que o dataset mude.
+        """
+        dataset, signature, version = self._dataset_handle.snapshot()
+        with self._lock:
+            if self._adjustments is not None and self._adjustments_signature == signature:
+                return self._adjustments
+
+        # A derivação (uma leitura do mercado à vista) roda fora da trava, sem
+        # bloquear as outras consultas; threads que chegarem juntas podem
+        # derivar em paralelo, e vale a primeira publicada.
+        aggregate = load_aggregate(self.base_path, ADJUSTMENT_TABLE, signature)
+        if aggregate is not None:
+            events = aggregate.to_table()
+        else:
+            logger.info(" -> Derivando os fatores de ajuste a partir do mercado à vista...")
+            accumulator = AdjustmentAccumulator()
+            scanner = dataset.scanner(columns=ADJUSTMENT_SOURCE_COLUMNS, filter=pc.field('TPMERC') == 10,
+                                      batch_size=1 << 20)
+            for batch in scanner.to_batches():
+                accumulator.update(pa.Table.from_batches([batch]))
+            events = accumulator.result()
+        factors = AdjustmentFactors(events)
+
+        with self._lock:
+            # Publica só sobre fatores de uma versão mais antiga do dataset.
+            if self._adjustments is None or self._adjustments_version < version:
+                self._adjustments, self._adjustments_signature, self._adjustments_version = factors, signature, version
+            return self._adjustments if self._adjustments_signature == signature else factors
+
+    def get_adjustment_factors(self, codisi: Union[str, List[str], None] = None) -> pd.DataFrame:
+        """
+        Lista os eventos de ajuste de preços usados por `get_quotes(adjusted=True)`.
+
+        Args:
+            codisi (Union[str, List[str]], optional): Filtra pelo código ISIN.
+
+        Returns:
+            pd.DataFrame: Um evento por linha (CODISI, DATA_EVENTO, FATOR,
+                          ORIGEM 'FATCOT' ou 'PRECO'). FATOR multiplica os
+                          preços dos pregões anteriores a DATA_EVENTO.
+        """
+        events = self.adjustment_factors.events
+        if codisi is not None:
+            if not isinstance(codisi, list): codisi = [codisi]
+            events = events.filter(pc.is_in(events['CODISI'], value_set=pa.array(codisi, pa.string())))
+        return decode_storage_table(events).to_pandas()
+
+    def get_quotes_many(self, entities: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        Busca cotações de várias entidades com uma única leitura do dataset.
+
+        Cada entidade é resolvida no dicionário de ativos como em
+        `get_quotes(entity=...)`; os tickers de todas elas são unidos em um só
+        filtro de pré-leitura e o resultado é então repartido por entidade.
+        Para `asset_class='options'`, a leitura traz as opções dos radicais
+        das entidades (filtrados durante a leitura, como em `get_quotes`) e
+        cada entidade recebe as do seu radical.
+
+        Args:
+            entities (List[str]): Nomes de empresas, tickers ou ISINs.
+            **kwargs: Os demais filtros de `get_quotes` (datas, colunas,
+                      asset_class, especificacao, etc.), aplicados a todas as
+                      entidades. 'entity', 'tickers' e 'ticker_root' não são aceitos.
+
+        Returns:
+            Dict[str, pd.DataFrame]: Para cada entidade, o mesmo DataFrame que
+                                     `get_quotes(entity=<entidade>, **kwargs)`
+                                     retornaria (com `categorical=True`, as
+                                     categorias são as da leitura conjunta).
+        """
+        conflicting = [k for k in ('entity', 'tickers', 'ticker_root') if k in kwargs]
+        if conflicting:
+            raise ValueError(f"Argumentos não suportados em get_quotes_many: {conflicting}")
+
+        options = kwargs.get('asset_class') == 'options'
+        resolved = self.resolve_assets(entities)
+        selections = {}
+        for entity, asset_info in resolved.items():
+            if asset_info.empty:
+                continue
+            selection = self._options_root(asset_info) if options else self._entity_tickers(asset_info, kwargs.get('asset_class'))
+            if selection is not None:
+                selections[entity] = selection
+        logger.info(f"Busca em lote: {len(selections)} de {len(resolved)} entidades encontradas no dicionário.")
+
+        results = {entity: pd.DataFrame() for entity in resolved}
+        if not selections:
+            return results
+        if options:
+            df = self.get_quotes(ticker_root=sorted(set(selections.values())), **kwargs)
+            # Um radical explícito traz ESPECI; a busca por entidade, que este resultado reproduz, não.
+            if 'ESPECI' not in (kwargs.get('columns') or []) and 'ESPECI' in df.columns:
+                df = df.drop(columns='ESPECI')
+        else:
+            all_tickers = sorted({t for tickers in selections.values() for t in tickers})
+            df = self.get_quotes(tickers=all_tickers, **kwargs)
+        if df.empty:
+            return results
+
+        # Posições de cada ticker no resultado (ordenado por ticker e data)
+        groups = df.groupby('CODNEG', sort=True, observed=True).indices
+        for entity, selection in selections.items():
+            if options:
+                keys = [t for t in groups if t.startswith(selection)]
+            else:
+                keys = sorted(t for t in set(selection) if t in groups)
+            if keys:
+                positions = np.concatenate([groups[t] for t in keys])
+                results[entity] = df.iloc[positions].reset_index(drop=True)
+            else:
+                results[entity] = df.iloc[0:0].copy()
+        return results
+
+    def trading_calendar(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DatetimeIndex:
+        """
+        Retorna os pregões do mercado (datas com ao menos uma cotação) no intervalo.
+
+        Usa a tabela agregada 'volume_diario' quando ela está em dia com o
+        dataset; senão, lê apenas a coluna DATA_PREGAO do dataset principal.
+
+        Args:
+            start_date (str, optional): Data de início no formato 'YYYY-MM-DD'.
+            end_date (str, optional): Data de fim no formato 'YYYY-MM-DD'.
+
+        Returns:
+            pd.DatetimeIndex: Os pregões, em ordem, com o nome 'DATA_PREGAO'.
+        """
+        filters = self._build_parquet_filters(start_date=start_date, end_date=end_date)
+        dataset, signature, _ = self._dataset_handle.snapshot()
+        aggregate = load_aggregate(self.base_path, 'volume_diario', signature)
+        if aggregate is not None:
+            filters = [f for f in filters if f[0] != 'ANO']
+            dataset = aggregate
+        days = set()
+        scanner = dataset.scanner(columns=['DATA_PREGAO'], batch_size=1 << 20,
+                                  filter=pq.filters_to_expression(filters) if filters else None)
+        for batch in scanner.to_batches():
+            days.update(pc.unique(batch.column(0).cast(pa.date32()).cast(pa.int32())).to_numpy(zero_copy_only=False))
+        calendar = np.sort(np.fromiter(days, dtype=np.int64, count=len(days)))
+        return pd.DatetimeIndex(calendar.astype('datetime64[D]').astype('datetime64[ns]'), name='DATA_PREGAO')
+
+    def get_panel(self, field: str = 'PREULT', dtype: str = 'float64', calendar: str = 'market',
+                  **kwargs) -> pd.DataFrame:
+        """
+        Retorna uma matriz pregões x tickers de um campo (ex: PREULT, VOLTOT).
+
+        A matriz é montada direto das colunas Arrow lidas (DATA_PREGAO, CODNEG
+        e o campo), em um único array NumPy pré-alocado: não há DataFrame
+        longo intermediário, ordenação nem pivot.
+
+        Args:
+            field (str): A coluna numérica do dataset (preços em reais,
+                         quantidades e contagens como números).
+            dtype (str): 'float64' (padrão) ou 'float32', que usa metade da memória.
+            calendar (str): 'market' (padrão) usa todos os pregões do mercado
+                no período (ver `trading_calendar`), com NaN nos dias sem
+                negociação do ticker; 'traded' usa apenas os pregões em que
+                algum dos tickers selecionados negociou.
+            **kwargs: Os filtros de `get_quotes` (tickers, entity, asset_class,
+                      datas, adjusted, etc.).
+
+        Returns:
+            pd.DataFrame: Índice DATA_PREGAO, uma coluna por CODNEG (em ordem
+                          alfabética), respaldado por um único bloco NumPy
+                          contíguo. Se um ticker tiver mais de uma linha no
+                          mesmo pregão, vale a última lida.
+        """
+        field = field.upper()
+        if field not in STORAGE_SCHEMA.names or not pa.types.is_integer(STORAGE_SCHEMA.field(field).type):
+            raise ValueError(f"Campo inválido para o painel: '{field}'. Use uma coluna numérica do dataset.")
+        if dtype not in ('float64', 'float32'):
+            raise ValueError(f"dtype inválido: '{dtype}'. Opções: ['float64', 'float32']")
+        if calendar not in ('market', 'traded'):
+            raise ValueError(f"Calendário inválido: '{calendar}'. Opções: ['market', 'traded']")
+        started = time.perf_counter()
+        plan = self._plan_query(kwargs)
+        if plan is None:
             return pd.DataFrame()
 
+        adjusted = plan['adjusted'] and field in ADJUSTED_PRICE_COLUMNS
+        columns = ['DATA_PREGAO', 'CODNEG', field] + (['CODISI'] if adjusted else [])
+        query = {**self._query_fields('get_panel', plan), 'colunas': columns}
+        with self._scan(plan, columns, query) as table:
+            panel, dates, tickers = self._build_panel(table, field, dtype, calendar, adjusted, kwargs)
+        logger.info(f" -> Painel de {field}: {panel.shape[0]:,} pregões x {panel.shape[1]:,} tickers.")
+        self._emit_query(query, started, plan, linhas=table.num_rows, formato=list(panel.shape))
+        return pd.DataFrame(panel, index=dates, columns=pd.Index(tickers, name='CODNEG'), copy=False)
+
+    def _build_panel(self, table: pa.Table, field: str, dtype: str, calendar: str, adjusted: bool,
+                     kwargs: dict) -> tuple:
+        """
+        (Helper Interno) Monta a matriz de `get_panel` a partir das colunas lidas.
+
+        Returns:
+            tuple: (matriz NumPy, índice de pregões, tickers em ordem alfabética).
+        """
+        table = table.filter(pc.and_(pc.is_valid(table['DATA_PREGAO']), pc.is_valid(table['CODNEG'])))
+
+        # Valores em float, já na escala de consulta (preços em reais) e ajustados, se pedido.
+        values = table[field].to_numpy(zero_copy_only=False).astype(dtype)
+        scale = (STORAGE_SCHEMA.field(field).metadata or {}).get(b'escala')
+        if scale is not None and pa.types.is_integer(table.schema.field(field).type):
+            values /= np.array(float(scale), dtype=dtype)
+        if adjusted:
+            values *= self.adjustment_factors.factors(table['CODISI'], table['DATA_PREGAO']).astype(dtype)
+
+        # Posições de linha (pregão) e coluna (ticker) de cada valor.
+        days = table['DATA_PREGAO'].cast(pa.date32()).cast(pa.int32()).to_numpy(zero_copy_only=False)
+        if calendar == 'market':
+            start, end = kwargs.get('start_date'), kwargs.get('end_date')
+            dates = self.trading_calendar(start, end)
+            calendar_days = dates.values.astype('datetime64[D]').astype(np.int64)
+        else:
+            calendar_days = np.unique(days)
+            dates = pd.DatetimeIndex(calendar_days.astype('datetime64[D]').astype('datetime64[ns]'), name='DATA_PREGAO')
+        rows = np.searchsorted(calendar_days, days)
+        encoded = pc.dictionary_encode(table['CODNEG']).combine_chunks()
+        tickers = encoded.dictionary.to_numpy(zero_copy_only=False).astype(str)
+        order = np.argsort(tickers, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        cols = rank[encoded.indices.to_numpy(zero_copy_only=False)]
+
+        panel = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+        panel[rows, cols] = values
+        return panel, dates, tickers[order]
+
+    def _query_aggregate(self, name: str, aggregate_filters: List[tuple], raw_filters: List[tuple]) -> pd.DataFrame:
+        """
+        (Helper Interno) Consulta uma tabela agregada, materializada ou calculada na hora.
+
+        Usa 'processed/agregados/<name>.parquet' quando a tabela foi gerada a
+        partir dos arquivos atuais do dataset (ver `build_aggregates`); senão,
+        agrega em fluxo as linhas do dataset selecionadas por `raw_filters`,
+        com as mesmas funções. Os dois caminhos dão o mesmo resultado.
+        """
+        started = time.perf_counter()
+        view = VIEWS[name]
+        query = {'metodo': name, 'filtros': aggregate_filters}
+        dataset, signature, _ = self._dataset_handle.snapshot()
+        aggregate = load_aggregate(self.base_path, name, signature)
+        if aggregate is not None:
+            table = aggregate.to_table(filter=pq.filters_to_expression(aggregate_filters) if aggregate_filters else None)
+            logger.info(f" -> Consulta atendida pela tabela agregada '{name}'.")
+            query['fonte'] = 'agregado'
+        else:
+            logger.info(f" -> Tabela agregada '{name}' ausente ou desatualizada; agregando o dataset principal...")
+            accumulator = AggregateAccumulator(view)
+            scanner = dataset.scanner(
+                columns=view.source_columns, batch_size=1 << 20,
+                filter=pq.filters_to_expression(raw_filters) if raw_filters else None,
+            )
+            rows_read = 0
+            for batch in scanner.to_batches():
+                rows_read += batch.num_rows
+                accumulator.update(pa.Table.from_batches([batch]))
+            query.update(fonte='dataset', filtros=raw_filters, linhas_lidas=rows_read)
+            table = accumulator.result()
+            if table is None:
+                self._emit_query(query, started, linhas=0)
+                return pd.DataFrame()
+        table = table.sort_by([(k, 'ascending') for k in view.keys])
+        df = decode_storage_table(table).to_pandas(types_mapper=PANDAS_INT_TYPES.get)
+        logger.info(f" -> {len(df):,} linhas agregadas.")
+        self._emit_query(query, started, linhas=len(df))
+        return df
+
+    def get_bars(self, tickers: Union[str, List[str], None] = None, frequency: str = 'monthly',
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 codisi: Union[str, List[str], None] = None) -> pd.DataFrame:
+        """
+        Retorna barras OHLCV mensais ou semanais por ticker.
+
+        Períodos são sempre completos: as datas são estendidas ao início do
+        período de `start_date` e ao fim do período de `end_date`.
+
+        Args:
+            tickers (Union[str, List[str]], optional): Um ticker ou lista de tickers.
+            frequency (str): 'monthly' (padrão) ou 'weekly' (semanas de segunda a domingo).
+            start_date (str, optional): Data de início no formato 'YYYY-MM-DD'.
+            end_date (str, optional): Data de fim no formato 'YYYY-MM-DD'.
+            codisi (Union[str, List[str]], optional): Filtra pelo código ISIN.
+
+        Returns:
+            pd.DataFrame: Uma linha por (CODNEG, CODISI, PERIODO), com o
+                          primeiro e o último pregão do período (DATA_INICIO,
+                          DATA_FIM), PREABE, PREMAX, PREMIN, PREULT, as somas
+                          de VOLTOT, QUATOT e TOTNEG e o número de pregões
+                          (PREGOES), ordenada por ticker e período.
+        """
+        if frequency not in BAR_FREQUENCIES:
+            raise ValueError(f"Frequência inválida: '{frequency}'. Opções: {list(BAR_FREQUENCIES)}")
+        name = BAR_FREQUENCIES[frequency][0]
+        start = period_bounds(start_date, frequency)[0] if start_date is not None else None
+        end = period_bounds(end_date, frequency) if end_date is not None else None
+
+        raw_filters = self._build_parquet_filters(tickers=tickers, codisi=codisi, start_date=start,
+                                                  end_date=end[1] if end else None)
+        aggregate_filters = [f for f in raw_filters if f[0] in ('CODNEG', 'CODISI')]
+        if start is not None:
+            aggregate_filters.append(('PERIODO', '>=', start))
+        if end is not None:
+            aggregate_filters.append(('PERIODO', '<=', end[0]))
+        return self._query_aggregate(name, aggregate_filters, raw_filters)
+
+    def get_market_volume(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          codbdi: Union[int, str, List, None] = None,
+                          tpmerc: Union[int, str, List, None] = None) -> pd.DataFrame:
+        """
+        Retorna o volume diário do mercado por CODBDI e TPMERC.
+
+        Args:
+            start_date (str, optional): Data de início no formato 'YYYY-MM-DD'.
+            end_date (str, optional): Data de fim no formato 'YYYY-MM-DD'.
+            codbdi (Union[int, str, List], optional): Código(s) ou descrição(ões) BDI.
+            tpmerc (Union[int, str, List], optional): Código(s) ou descrição(ões) do tipo de mercado.
+
+        Returns:
+            pd.DataFrame: Uma linha por (DATA_PREGAO, CODBDI, TPMERC), com as
+                          somas de VOLTOT, QUATOT e TOTNEG e o número de
+                          registros (tickers negociados), ordenada por data.
+        """
+        raw_filters = self._build_parquet_filters(start_date=start_date, end_date=end_date, codbdi=codbdi, tpmerc=tpmerc)
+        aggregate_filters = [f for f in raw_filters if f[0] != 'ANO']
+        return self._query_aggregate('volume_diario', aggregate_filters, raw_filters)
+
+    def get_ticker_index(self, tickers: Union[str, List[str], None] = None,
+                         codisi: Union[str, List[str], None] = None) -> pd.DataFrame:
+        """
+        Retorna o primeiro e o último pregão e o número de registros de cada ticker.
+
+        Args:
+            tickers (Union[str, List[str]], optional): Um ticker ou lista de
+                tickers. Se None, retorna todos.
+            codisi (Union[str, List[str]], optional): Filtra pelo código ISIN.
+
+        Returns:
+            pd.DataFrame: Uma linha por (CODNEG, CODISI), com PRIMEIRO_PREGAO,
+                          ULTIMO_PREGAO e REGISTROS, ordenada por ticker.
+        """
+        filters = self._build_parquet_filters(tickers=tickers, codisi=codisi)
+        return self._query_aggregate('indice_tickers', filters, filters)
+
+    def _load_options_store(self) -> Optional[OptionsStore]:
+        """(Helper Interno) O repositório de opções, se ele estiver em dia com o dataset."""
+        signature = self._dataset_handle.snapshot()[1]
+        with self._lock:
+            # Sem repositório, a busca se repete a cada consulta (ele pode ser gerado depois).
+            if self._options_store is None or self._options_store_signature != signature:
+                index = load_aggregate(self.base_path, OPTIONS_INDEX_TABLE, signature)
+                self._options_store = open_options_store(self.base_path / AGGREGATES_DIR,
+                                                         index.to_table() if index is not None else None)
+                self._options_store_signature = signature
+            return self._options_store
+
+    def get_options_chain(self, underlying: str, date: Optional[str] = None, start_date: Optional[str] = None,
+                          end_date: Optional[str] = None, vencimento_min: Optional[str] = None,
+                          vencimento_max: Optional[str] = None) -> pd.DataFrame:
+        """
+        Retorna a cadeia de opções de um ativo-objeto, com calls e puts lado a lado.
+
+        Usa o repositório de opções gerado por `build_aggregates`, quando ele
+        está em dia com o dataset: o índice de (radical, vencimento) aponta os
+        lotes a ler, e uma consulta de um único pregão não varre o histórico.
+        Sem ele, as opções do radical são lidas do dataset principal.
+
+        Args:
+            underlying (str): O radical de 4 letras (ex: 'PETR') ou um termo
+                de busca (empresa, ticker ou ISIN) resolvido como em
+                `get_quotes(entity=..., asset_class='options')`.
+            date (str, optional): Um pregão ('YYYY-MM-DD'); equivale a
+                `start_date` = `end_date` = `date`.
+            start_date (str, optional): Data de início no formato 'YYYY-MM-DD'.
+            end_date (str, optional): Data de fim no formato 'YYYY-MM-DD'.
+            vencimento_min (str, optional): Data de vencimento mínima.
+            vencimento_max (str, optional): Data de vencimento máxima.
+
+        Returns:
+            pd.DataFrame: Uma linha por (RAIZ, DATA_PREGAO, DATVEN, PREEXE)
+                          (e por par call/put, se houver mais de uma série no
+                          mesmo preço de exercício), com os campos de cada
+                          lado em '<campo>_CALL' e '<campo>_PUT' (ver
+                          `b3_analyzer.options.build_chain`).
+        """
+        root = underlying.upper()
+        if not re.fullmatch("[A-Z]{4}", root):
+            asset_info = self.find_assets(underlying)
+            root = self._options_root(asset_info) if not asset_info.empty else None
+            if root is None:
+                logger.warning(f"Ativo-objeto '{underlying}' não encontrado no dicionário.")
+                return pd.DataFrame()
+        if date is not None:
+            start_date = end_date = date
+        started = time.perf_counter()
+        query = {'metodo': 'get_options_chain', 'radical': root,
+                 'filtros': [start_date, end_date, vencimento_min, vencimento_max]}
+        bounds = [pd.to_datetime(d).date() if d is not None else None
+                  for d in (start_date, end_date, vencimento_min, vencimento_max)]
+
+        store = self._load_options_store()
+        if store is not None:
+            source = nullcontext(store.read(root, *bounds))
+            logger.info(f" -> Cadeia de '{root}' lida do repositório de opções.")
+            query['fonte'] = 'repositorio'
+        else:
+            logger.info(f" -> Repositório de opções ausente ou desatualizado; lendo as opções de '{root}' do dataset principal...")
+            plan = self._plan_query(dict(ticker_root=root, tpmerc=[70, 80], start_date=start_date, end_date=end_date,
+                                         vencimento_min=vencimento_min, vencimento_max=vencimento_max))
+            source = self._scan(plan, CHAIN_SOURCE_COLUMNS, query)
+            query['fonte'] = 'dataset'
+        # A montagem da cadeia fica dentro do bloco: a reserva de memória da leitura cobre também as cópias.
+        with source as table:
+            query['linhas_lidas'] = table.num_rows
+            chain = build_chain(table).to_pandas(types_mapper=PANDAS_INT_TYPES.get)
+        logger.info(f" -> {len(chain):,} linhas na cadeia.")
+        self._emit_query(query, started, linhas=len(chain))
+        return chain
+
+    def cache_stats(self) -> Optional[dict]:
+        """
+        Retorna as estatísticas do cache de resultados de `get_quotes`.
+
+        Returns:
+            Optional[dict]: Acertos exatos ('hits'), acertos atendidos por um
+                            resultado mais amplo ('subset_hits'), faltas,
+                            remoções, entradas e bytes em cache e servidos,
+                            ou None se o cache estiver desativado.
+        """
+        return self._cache.stats() if self._cache is not None else None
+
+    def clear_cache(self):
+        """Esvazia o cache de resultados de `get_quotes`, se ativo."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def admission_stats(self) -> Optional[dict]:
+        """
+        Retorna as estatísticas do controle de admissão (ver `max_concurrent_bytes`).
+
+        Returns:
+            Optional[dict]: Consultas admitidas e que esperaram, segundos de
+                            espera, bytes reservados agora e no pico e
+                            consultas na fila, ou None se não houver orçamento.
+        """
+        return self._budget.stats() if self._budget is not None else None
+
+    def close(self):
+        """Encerra o pool de leitura (as consultas seguintes usam a leitura do próprio Arrow)."""
+        if self._scan_pool is not None:
+            pool, self._scan_pool = self._scan_pool, None
+            pool.shutdown(wait=True)
+
     def list_tickers(self, asset_type: str = 'acoes') -> Optional[List[str]]:
         """Lista tickers únicos, baseado no dicionário de ativos."""
         if self.df_dicionario is None: return None
-        print(f"Listando tickers para o tipo '{asset_type}' (baseado no dicionário)...")
+        logger.info(f"Listando tickers para o tipo '{asset_type}' (baseado no dicionário)...")
         if asset_type == 'acoes':
             tickers = self.df_dicionario[
                 self.df_dicionario['ULTIMA_ESPECIFICACAO'].str.contains('ACÕES', na=False)
@@ -283,8 +1251,8 @@ class B3Data:
         results = self.find_assets(ticker)
         if not results.empty:
             if len(results) > 1:
-                print(f"AVISO: Múltiplas correspondências para '{ticker}'. Retornando a primeira.")
+                logger.warning(f"AVISO: Múltiplas correspondências para '{ticker}'. Retornando a primeira.")
             return results.iloc[0]
         else:
-            print(f"Ticker '{ticker}' não encontrado no dicionário.")
+            logger.warning(f"Ticker '{ticker}' não encontrado no dicionário.")
             return None
\ No newline at end of file
@@ -0,0 +1,162 @@
+# src/b3_analyzer/asset_index.py
+#
+# Índices em memória sobre o dicionário de ativos (security master), usados
+# por `B3Data.find_assets` no lugar de varreduras com expressões regulares.
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+NGRAM_SIZE = 3
+TICKER_SEPARATOR = ' | '
+_WORD = re.compile(r'\w+')
+# Caracteres com significado especial em uma regex (espaços e '-' são literais).
+_REGEX_META = re.compile(r'[.^$*+?{}\[\]\\|()]')
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class _GroupedPositions:
+    """
+    (Helper Interno) Mapeia chaves para as posições das linhas em que aparecem.
+
+    As posições ficam em um único array, agrupadas por chave; cada chave
+    guarda só o seu intervalo nesse array.
+    """
+    def __init__(self, keys: np.ndarray, positions: np.ndarray):
+        codes, uniques = pd.factorize(keys)
+        order = np.argsort(codes, kind='stable')
+        self.codes = codes
+        self.keys = list(uniques)
+        self._positions = positions[order]
+        self._bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self._codes: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+
+    def code(self, key: str) -> int:
+        """O código interno da chave, ou -1 se ela não existir."""
+        return self._codes.get(key, -1)
+
+    def positions_of_code(self, code: int) -> np.ndarray:
+        return self._positions[self._bounds[code]:self._bounds[code + 1]]
+
+    def positions(self, key: str) -> np.ndarray:
+        code = self.code(key)
+        return self.positions_of_code(code) if code >= 0 else _EMPTY
+
+
+class AssetIndex:
+    """
+    Índices de busca sobre o dicionário de ativos, construídos uma única vez.
+
+    - Tickers históricos: mapa exato ticker -> linhas, obtido separando a
+      coluna 'TICKERS_HISTORICOS' (equivale à busca por palavra inteira).
+    - ISIN: mapa exato CODISI -> linhas.
+    - Nomes históricos: índice de trigramas sobre os valores distintos de
+      'NOMES_HISTORICOS'. Os trigramas da consulta selecionam candidatos, e
+      cada candidato é confirmado com a busca de substring original.
+
+    Os resultados são os mesmos da busca por varredura em
+    `B3Data.find_assets`: linhas na ordem original do dicionário.
+    """
+    def __init__(self, df_dicionario: pd.DataFrame):
+        self.n_rows = len(df_dicionario)
+        row_positions = np.arange(self.n_rows, dtype=np.int64)
+
+        # Tickers: uma entrada por (ticker, linha).
+        tickers = pd.Series(df_dicionario['TICKERS_HISTORICOS'].to_numpy(), index=row_positions)
+        exploded = tickers.dropna().astype(str).str.split(TICKER_SEPARATOR, regex=False).explode().dropna()
+        self._tickers = _GroupedPositions(exploded.to_numpy(), exploded.index.to_numpy(dtype=np.int64))
+        # Linhas com tickers fora do padrão alfanumérico são sempre verificadas pela regex.
+        irregular = ~exploded.str.fullmatch(r'\w+')
+        self._irregular_ticker_rows = np.unique(exploded.index.to_numpy(dtype=np.int64)[irregular.to_numpy()])
+        self._ticker_texts = tickers.to_numpy()
+
+        # ISIN: mapa exato.
+        isins = df_dicionario['CODISI']
+        valid = isins.notna().to_numpy()
+        self._isins = _GroupedPositions(isins.to_numpy()[valid], row_positions[valid])
+
+        # Nomes: trigramas sobre os textos distintos.
+        names = df_dicionario['NOMES_HISTORICOS']
+        valid = names.notna().to_numpy()
+        self._names = _GroupedPositions(names.to_numpy()[valid].astype(str), row_positions[valid])
+        self._name_codes = np.full(self.n_rows, -1, dtype=np.int64)
+        self._name_codes[valid] = self._names.codes
+        postings = {}
+        for text_id, text in enumerate(self._names.keys):
+            for gram in {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}:
+                postings.setdefault(gram, []).append(text_id)
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    def _verify_tickers(self, pattern: re.Pattern, rows) -> np.ndarray:
+        """(Helper Interno) Mantém as linhas cujo texto de tickers casa com a regex original."""
+        texts = self._ticker_texts
+        return np.array([r for r in rows if isinstance(texts[r], str) and pattern.search(texts[r])], dtype=np.int64)
+
+    def _match_tickers(self, query: str) -> np.ndarray:
+        """(Helper Interno) Linhas cujos tickers históricos casam com `\\b<query>\\b`."""
+        pattern = re.compile(f"\\b{query}\\b")
+        if _WORD.fullmatch(query):
+            # Palavra inteira: basta o mapa exato de tickers.
+            rows = self._tickers.positions(query)
+            if len(self._irregular_ticker_rows):
+                rows = np.concatenate([rows, self._verify_tickers(pattern, self._irregular_ticker_rows)])
+            return rows
+
+        # Consulta literal com separadores (ex: 'VALE3 | VALE5'): cada trecho
+        # alfanumérico precisa ser um ticker completo da mesma linha.
+        pieces = _WORD.findall(query)
+        if _REGEX_META.search(query) or not pieces:
+            # Consultas com metacaracteres seguem a regex original sobre todas as linhas.
+            return self._verify_tickers(pattern, range(self.n_rows))
+        candidates = sorted((self._tickers.positions(piece) for piece in set(pieces)), key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            rows = np.intersect1d(rows, other)
+        rows = np.union1d(rows, self._irregular_ticker_rows)
+        return self._verify_tickers(pattern, rows)
+
+    def _match_names(self, query: str) -> np.ndarray:
+        """(Helper Interno) Linhas cujos nomes históricos contêm `query` como substring."""
+        if len(query) < NGRAM_SIZE:
+            text_ids = [i for i, text in enumerate(self._names.keys) if query in text]
+        else:
+            grams = {query[i:i + NGRAM_SIZE] for i in range(len(query) - NGRAM_SIZE + 1)}
+            lists = sorted((self._postings.get(gram, _EMPTY) for gram in grams), key=len)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            text_ids = [i for i in candidates if query in self._names.keys[i]]
+        if not text_ids:
+            return _EMPTY
+        if len(text_ids) > 64:
+            # Muitos nomes distintos: uma passada pelos códigos sai mais barata.
+            return np.flatnonzero(np.isin(self._name_codes, text_ids))
+        return np.concatenate([self._names.positions_of_code(i) for i in text_ids])
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Busca ativos por ticker histórico, nome histórico ou ISIN.
+
+        Args:
+            query (str): O termo de busca, já em maiúsculas.
+
+        Returns:
+            np.ndarray: As posições (ordenadas) das linhas correspondentes.
+        """
+        matches = [self._match_tickers(query), self._match_names(query), self._isins.positions(query)]
+        return np.unique(np.concatenate(matches))
+
+    def search_many(self, queries: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Executa `search` para várias consultas, resolvendo cada termo distinto uma vez.
+
+        Args:
+            queries (List[str]): Os termos de busca, já em maiúsculas.
+
+        Returns:
+            Dict[str, np.ndarray]: As posições das linhas de cada termo.
+        """
+        return {query: self.search(query) for query in dict.fromkeys(queries)}
@@ -0,0 +1,173 @@
+# src/b3_analyzer/cache.py
+#
+# Cache em memória (LRU, limitado por bytes) dos resultados de
+# `B3Data.get_quotes`, com reaproveitamento de resultados mais amplos.
+
+import datetime
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+# Filtros que definem o intervalo de datas de uma consulta. Eles ficam fora da
+# chave base, para que um resultado com intervalo maior atenda a um menor.
+DATE_RANGE_COLUMNS = ('DATA_PREGAO', 'ANO')
+
+DateRange = Tuple[Optional[datetime.date], Optional[datetime.date]]
+
+
+def _freeze(value) -> Hashable:
+    """(Helper Interno) Converte o valor de um filtro em uma forma hashable e canônica."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted({_freeze(v) for v in value}, key=repr))
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    return value
+
+
+def normalize_filters(filters: Iterable[tuple]) -> Tuple[Hashable, DateRange]:
+    """
+    Separa os filtros de `_build_parquet_filters` em chave base e intervalo de datas.
+
+    Returns:
+        Tuple[Hashable, DateRange]: Os filtros que não tratam de datas de pregão,
+            em forma canônica (ordem e duplicatas não importam), e o intervalo
+            (início, fim) de DATA_PREGAO, com None para lados em aberto.
+    """
+    base, start, end = set(), None, None
+    for column, op, value in filters:
+        if column not in DATE_RANGE_COLUMNS:
+            base.add((column, op, _freeze(value)))
+        elif column == 'DATA_PREGAO' and op == '>=':
+            start = value
+        elif column == 'DATA_PREGAO' and op == '<=':
+            end = value
+    return tuple(sorted(base, key=repr)), (start, end)
+
+
+def _covers(outer: DateRange, inner: DateRange) -> bool:
+    """(Helper Interno) Indica se o intervalo `outer` contém o intervalo `inner`."""
+    (outer_start, outer_end), (inner_start, inner_end) = outer, inner
+    start_ok = outer_start is None or (inner_start is not None and outer_start <= inner_start)
+    end_ok = outer_end is None or (inner_end is not None and inner_end <= outer_end)
+    return start_ok and end_ok
+
+
+class QueryCache:
+    """
+    Cache LRU de resultados de consultas, limitado por um orçamento de memória.
+
+    Cada entrada guarda o DataFrame final de uma consulta (já pós-filtrado e
+    ordenado), identificado pela chave base (filtros normalizados, exceto as
+    datas de pregão, e pós-filtros), pelo intervalo de datas e pelo conjunto
+    de colunas. Uma consulta também é atendida por uma entrada de mesma chave
+    base cujo intervalo de datas a contenha e cujas colunas incluam as pedidas:
+    basta recortar as linhas por DATA_PREGAO e selecionar as colunas.
+
+    O cache é descartado por inteiro quando a versão do dataset avança (ver
+    `DatasetHandle.open_count`), e resultados lidos de uma versão que não é
+    mais a atual não são guardados. Seguro entre threads.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.subset_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    def sync_version(self, version: int):
+        """
+        Descarta todas as entradas se o dataset mudou desde a última consulta.
+
+        Uma versão mais antiga que a atual (uma consulta lenta que começou
+        antes de outra thread reabrir o dataset) não volta o cache para trás.
+        """
+        with self._lock:
+            if self._version is None or version > self._version:
+                self.clear()
+                self._version = version
+
+    def clear(self):
+        """Remove todas as entradas (as estatísticas acumuladas são mantidas)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, base_key: Hashable, date_range: DateRange, columns: List[str]) -> Optional[pd.DataFrame]:
+        """
+        Procura um resultado para a consulta, exato ou recortado de um mais amplo.
+
+        Returns:
+            Optional[pd.DataFrame]: Uma cópia do resultado, com as colunas na
+                                    ordem de `columns`, ou None se não houver.
+        """
+        with self._lock:
+            wanted = frozenset(columns)
+            exact_key = (base_key, date_range, wanted)
+            entry_key = exact_key if exact_key in self._entries else None
+            if entry_key is None:
+                entry_key = next(
+                    (key for key in reversed(self._entries)
+                     if key[0] == base_key and wanted <= key[2] and _covers(key[1], date_range)),
+                    None,
+                )
+            if entry_key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            df, _ = self._entries[entry_key]
+            if entry_key == exact_key:
+                self.hits += 1
+                result = df[list(columns)]
+            else:
+                self.subset_hits += 1
+                start, end = date_range
+                mask = pd.Series(True, index=df.index)
+                if start is not None:
+                    mask &= df['DATA_PREGAO'] >= pd.Timestamp(start)
+                if end is not None:
+                    mask &= df['DATA_PREGAO'] <= pd.Timestamp(end)
+                result = df.loc[mask, list(columns)].reset_index(drop=True)
+            self.bytes_served += int(result.memory_usage(deep=True).sum())
+            return result
+
+    def put(self, base_key: Hashable, date_range: DateRange, columns: List[str], df: pd.DataFrame,
+            version: Optional[int] = None):
+        """
+        Guarda o resultado de uma consulta, removendo as entradas menos usadas se preciso.
+
+        Com `version` (a versão do dataset de que o resultado foi lido), o
+        resultado é descartado se o cache já está em outra versão.
+        """
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            nbytes = int(df.memory_usage(deep=True).sum())
+            if nbytes > self.max_bytes:
+                return
+            key = (base_key, date_range, frozenset(columns))
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+            self._entries[key] = (df, nbytes)
+            self._bytes += nbytes
+
+    def stats(self) -> dict:
+        """Estatísticas de uso: acertos, faltas, remoções e bytes em cache/servidos."""
+        with self._lock:
+            lookups = self.hits + self.subset_hits + self.misses
+            return {
+                'hits': self.hits, 'subset_hits': self.subset_hits, 'misses': self.misses,
+                'hit_rate': (self.hits + self.subset_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'entries': len(self._entries),
+                'bytes': self._bytes, 'max_bytes': self.max_bytes, 'bytes_served': self.bytes_served,
+            }
@@ -0,0 +1,43 @@
+# src/b3_analyzer/codes.py
+#
+# Tabelas de códigos do arquivo COTAHIST (CODBDI e TPMERC). Ficam em um
+# módulo importável para que o analisador não precise ler arquivos na
+# inicialização; os dicionários em 'outputs' são gerados a partir daqui.
+
+from typing import Dict
+
+# Código BDI -> descrição
+CODBDI_DESCRIPTIONS: Dict[int, str] = {
+    2: 'LOTE PADRÃO', 5: 'SANCIONADAS', 6: 'CONCORDATÁRIAS', 7: 'RECUPERAÇÃO EXTRAJUDICIAL',
+    8: 'RECUPERAÇÃO JUDICIAL', 9: 'REGIME DE ADMINISTRAÇÃO ESPECIAL TEMPORÁRIA',
+    10: 'DIREITOS E RECIBOS', 11: 'INTERVENÇÃO', 12: 'FUNDOS IMOBILIÁRIOS',
+    14: 'CERTIFICADOS DE INVESTIMENTO', 18: 'OBRIGAÇÕES', 22: 'BÔNUS (PRIVADOS)',
+    26: 'APÓLICES/BÔNUS/TÍTULOS (PÚBLICOS)', 32: 'EXERCÍCIO DE OPÇÕES DE COMPRA DE ÍNDICES',
+    33: 'EXERCÍCIO DE OPÇÕES DE VENDA DE ÍNDICES', 38: 'EXERCÍCIO DE OPÇÕES DE COMPRA',
+    42: 'EXERCÍCIO DE OPÇÕES DE VENDA', 46: 'LEILÃO DE AÇÕES EM MORA',
+    48: 'LEILÃO DE AÇÕES (ART. 49)', 49: 'LEILÃO DE AÇÕES', 50: 'LEILÃO DE AÇÕES',
+    51: 'LEILÃO DE AÇÕES', 52: 'LEILÃO DE AÇÕES', 53: 'LEILÃO DE AÇÕES', 54: 'LEILÃO DE AÇÕES',
+    56: 'LEILão DE AÇÕES', 58: 'LEILÃO', 60: 'LEILÃO', 61: 'LEILÃO', 62: 'LEILÃO',
+    66: 'DEBÊNTURES COM DATA DE VENCIMENTO ATÉ 3 ANOS',
+    68: 'DEBÊNTURES COM DATA DE VENCIMENTO MAIOR QUE 3 ANOS', 70: 'FUTURO COM RETENÇÃO DE GANHOS',
+    71: 'FUTURO COM MOVIMENTAÇÃO DIÁRIA', 74: 'OPÇÕES DE COMPRA DE ÍNDICES',
+    75: 'OPÇÕES DE VENDA DE ÍNDICES', 78: 'OPÇÕES DE COMPRA', 82: 'OPÇÕES DE VENDA',
+    83: 'BOVESPAFIX', 84: 'SOMA FIX', 90: 'TERMO', 96: 'FRACIONÁRIO', 99: 'TOTAL',
+}
+
+# Tipo de mercado -> descrição
+TPMERC_DESCRIPTIONS: Dict[int, str] = {
+    10: 'VISTA', 12: 'EXERCÍCIO DE OPÇÕES DE COMPRA', 13: 'EXERCÍCIO DE OPÇÕES DE VENDA',
+    17: 'LEILÃO', 20: 'FRACIONÁRIO', 30: 'TERMO', 50: 'FUTURO COM RETENÇÃO DE GANHO',
+    60: 'FUTURO COM MOVIMENTAÇÃO DIÁRIA', 70: 'OPÇÕES DE COMPRA', 80: 'OPÇÕES DE VENDA',
+}
+
+
+def description_to_code(descriptions: Dict[int, str]) -> Dict[str, int]:
+    """
+    Inverte uma tabela de códigos (descrição -> código).
+
+    Descrições repetidas (ex: 'LEILÃO') ficam com o último código da tabela,
+    como no dicionário lido das planilhas.
+    """
+    return {description: code for code, description in descriptions.items()}
@@ -1,114 +1,324 @@
 # src/b3_analyzer/dictionary_builder.py
 
+import logging
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from pathlib import Path
+from typing import List
 import time
 
-def create_code_dictionaries(output_path: Path):
-    """Gera e salva os dicionários de mapeamento para CODBDI e TPMERC."""
-    print("\n--- Gerando Dicionários de Códigos (CODBDI e TPMERC) ---")
+from . import metrics
+from .codes import CODBDI_DESCRIPTIONS, TPMERC_DESCRIPTIONS
+from .storage import decode_storage_table, open_dataset
+
+logger = logging.getLogger(__name__)
+
+def create_code_dictionaries(output_path: Path, excel: bool = False):
+    """
+    Gera e salva os dicionários de mapeamento para CODBDI e TPMERC.
+
+    As tabelas vêm de `b3_analyzer.codes`, que é o que o analisador usa; os
+    arquivos gerados aqui (Parquet e, opcionalmente, Excel) servem para
+    consulta por pessoas e ferramentas externas.
+
+    Args:
+        output_path (Path): O diretório 'outputs'.
+        excel (bool): Se True, também exporta as planilhas .xlsx.
+    """
+    logger.info("--- Gerando Dicionários de Códigos (CODBDI e TPMERC) ---")
     try:
-        map_codbdi = {
-            '02': 'LOTE PADRÃO', '05': 'SANCIONADAS', '06': 'CONCORDATÁRIAS',
-            '07': 'RECUPERAÇÃO EXTRAJUDICIAL', '08': 'RECUPERAÇÃO JUDICIAL',
-            '09': 'REGIME DE ADMINISTRAÇÃO ESPECIAL TEMPORÁRIA', '10': 'DIREITOS E RECIBOS',
-            '11': 'INTERVENÇÃO', '12': 'FUNDOS IMOBILIÁRIOS', '14': 'CERTIFICADOS DE INVESTIMENTO',
-            '18': 'OBRIGAÇÕES', '22': 'BÔNUS (PRIVADOS)', '26': 'APÓLICES/BÔNUS/TÍTULOS (PÚBLICOS)',
-            '32': 'EXERCÍCIO DE OPÇÕES DE COMPRA DE ÍNDICES', '33': 'EXERCÍCIO DE OPÇÕES DE VENDA DE ÍNDICES',
-            '38': 'EXERCÍCIO DE OPÇÕES DE COMPRA', '42': 'EXERCÍCIO DE OPÇÕES DE VENDA',
-            '46': 'LEILÃO DE AÇÕES EM MORA', '48': 'LEILÃO DE AÇÕES (ART. 49)',
-            '49': 'LEILÃO DE AÇÕES', '50': 'LEILÃO DE AÇÕES', '51': 'LEILÃO DE AÇÕES',
-            '52': 'LEILÃO DE AÇÕES', '53': 'LEILÃO DE AÇÕES', '54': 'LEILÃO DE AÇÕES',
-            '56': 'LEILão DE AÇÕES', '58': 'LEILÃO', '60': 'LEILÃO', '61': 'LEILÃO',
-            '62': 'LEILÃO', '66': 'DEBÊNTURES COM DATA DE VENCIMENTO ATÉ 3 ANOS',
-            '68': 'DEBÊNTURES COM DATA DE VENCIMENTO MAIOR QUE 3 ANOS',
-            '70': 'FUTURO COM RETENÇÃO DE GANHOS', '71': 'FUTURO COM MOVIMENTAÇÃO DIÁRIA',
-            '74': 'OPÇÕES DE COMPRA DE ÍNDICES', '75': 'OPÇÕES DE VENDA DE ÍNDICES',
-            '78': 'OPÇÕES DE COMPRA', '82': 'OPÇÕES DE VENDA', '83': 'BOVESPAFIX',
-            '84': 'SOMA FIX', '90': 'TERMO', '96': 'FRACIONÁRIO', '99': 'TOTAL'
-        }
-        df_dict_codbdi = pd.DataFrame(list(map_codbdi.items()), columns=['CODBDI', 'DESCRICAO_CODBDI'])
-        df_dict_codbdi['CODBDI'] = pd.to_numeric(df_dict_codbdi['CODBDI'])
-        
-        map_tpmerc = {
-            '010': 'VISTA', '012': 'EXERCÍCIO DE OPÇÕES DE COMPRA',
-            '013': 'EXERCÍCIO DE OPÇÕES DE VENDA', '017': 'LEILÃO',
-            '020': 'FRACIONÁRIO', '030': 'TERMO', '050': 'FUTURO COM RETENÇÃO DE GANHO',
-            '060': 'FUTURO COM MOVIMENTAÇÃO DIÁRIA', '070': 'OPÇÕES DE COMPRA',
-            '080': 'OPÇÕES DE VENDA'
-        }
-        df_dict_tpmerc = pd.DataFrame(list(map_tpmerc.items()), columns=['TPMERC', 'DESCRICAO_TPMERC'])
-        df_dict_tpmerc['TPMERC'] = pd.to_numeric(df_dict_tpmerc['TPMERC'])
-
-        path_codbdi = output_path / 'dicionario_codbdi.xlsx'
-        path_tpmerc = output_path / 'dicionario_tpmerc.xlsx'
-        
-        df_dict_codbdi.to_excel(path_codbdi, index=False)
-        df_dict_tpmerc.to_excel(path_tpmerc, index=False)
-        
-        print(f" -> [SUCESSO] Dicionário de CODBDI salvo em: {path_codbdi}")
-        print(f" -> [SUCESSO] Dicionário de TPMERC salvo em: {path_tpmerc}")
+        df_dict_codbdi = pd.DataFrame(list(CODBDI_DESCRIPTIONS.items()), columns=['CODBDI', 'DESCRICAO_CODBDI'])
+        df_dict_tpmerc = pd.DataFrame(list(TPMERC_DESCRIPTIONS.items()), columns=['TPMERC', 'DESCRICAO_TPMERC'])
+
+        for name, df_dict in [('codbdi', df_dict_codbdi), ('tpmerc', df_dict_tpmerc)]:
+            path_parquet = output_path / f'dicionario_{name}.parquet'
+            df_dict.to_parquet(path_parquet, index=False)
+            logger.info(f" -> [SUCESSO] Dicionário de {name.upper()} salvo em: {path_parquet}")
+            if excel:
+                path_excel = output_path / f'dicionario_{name}.xlsx'
+                df_dict.to_excel(path_excel, index=False)
+                logger.info(f"    -> Exportado (Excel): {path_excel}")
 
     except Exception as e:
-        print(f" -> [ERRO] Falha ao gerar os Dicionários de Códigos: {e}")
+        logger.exception(f" -> [ERRO] Falha ao gerar os Dicionários de Códigos: {e}")
+
+# Colunas do dataset usadas pelo dicionário de ativos e colunas do dicionário.
+MASTER_SOURCE_COLUMNS = ['DATA_PREGAO', 'CODISI', 'CODNEG', 'NOMRES', 'ESPECI']
+MASTER_COLUMNS = ['CODISI', 'ULTIMO_TICKER', 'ULTIMO_NOME', 'ULTIMA_ESPECIFICACAO', 'TICKERS_HISTORICOS', 'NOMES_HISTORICOS']
+HISTORY_SEPARATOR = ' | '
+# Estado do acumulador (última linha e variações de cada ISIN), usado na atualização incremental.
+MASTER_STATE_FILE = 'dicionario_ativos_estado.parquet'
+_SOURCE_SCHEMA = pa.schema([
+    ('DATA_PREGAO', pa.timestamp('ns')), ('CODISI', pa.string()), ('CODNEG', pa.string()),
+    ('NOMRES', pa.string()), ('ESPECI', pa.string()),
+])
+# Linhas acumuladas (parciais) antes de cada redução intermediária (ou o
+# tamanho do último parcial reduzido, se maior; ver `aggregates`).
+_MAX_PENDING_ROWS = 2_000_000
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _latest_rows(table: pa.Table) -> pa.Table:
+    """
+    (Helper Interno) Mantém, para cada CODISI, a linha do pregão mais recente.
+
+    Empates na data (ex: lote padrão e fracionário no mesmo dia) ficam com o
+    menor CODNEG (ex: 'PETR4' antes de 'PETR4F').
+    """
+    if table.num_rows == 0:
+        return table
+    # Data mais recente de cada ativo, com os ISINs codificados em inteiros.
+    encoded = pc.dictionary_encode(table['CODISI']).combine_chunks()
+    codes = encoded.indices.to_numpy()
+    days = pc.fill_null(table['DATA_PREGAO'].cast(pa.int64()), _NO_DATE).to_numpy()
+    latest_day = np.full(len(encoded.dictionary), _NO_DATE, dtype=np.int64)
+    np.maximum.at(latest_day, codes, days)
+
+    # Só as linhas dessa data são ordenadas, para o desempate por CODNEG.
+    table = table.filter(pa.array(days == latest_day[codes]))
+    table = table.sort_by([('CODISI', 'ascending'), ('CODNEG', 'ascending')])
+    keys = table['CODISI'].combine_chunks()
+    changed = pc.not_equal(keys.slice(1), keys.slice(0, len(keys) - 1))
+    first_of_group = pa.concat_arrays([pa.array([True]), changed])
+    return table.filter(first_of_group)
+
+
+def _distinct_pairs(table: pa.Table, column: str) -> pa.Table:
+    """(Helper Interno) Pares distintos (CODISI, coluna), ignorando valores nulos."""
+    table = table.select(['CODISI', column]).filter(pc.is_valid(table[column]))
+    return table.group_by(['CODISI', column]).aggregate([])
+
+
+def _join_history(pairs: pa.Table, column: str, output: str) -> pa.Table:
+    """(Helper Interno) Junta os valores distintos de cada CODISI, ordenados, em um texto ' | '."""
+    pairs = pairs.sort_by([('CODISI', 'ascending'), (column, 'ascending')])
+    grouped = pairs.group_by('CODISI', use_threads=False).aggregate([(column, 'list')])
+    return pa.table({'CODISI': grouped['CODISI'], output: pc.binary_join(grouped[f'{column}_list'], HISTORY_SEPARATOR)})
+
+
+class SecurityMasterAccumulator:
+    """
+    Agregados parciais do dicionário de ativos, atualizados bloco a bloco.
+
+    Para cada CODISI, guarda a linha mais recente e os pares distintos
+    (CODISI, CODNEG) e (CODISI, NOMRES) vistos até aqui. Os parciais são
+    reduzidos periodicamente, então a memória depende do número de ativos e
+    de variações de ticker/nome, e não do tamanho do histórico.
+    """
+    def __init__(self):
+        self._latest: List[pa.Table] = []
+        self._tickers: List[pa.Table] = []
+        self._names: List[pa.Table] = []
+        self._pending_rows = 0  # linhas incorporadas desde a última redução
+        self._reduced_rows = 0
+
+    def update(self, table: pa.Table):
+        """Incorpora um bloco de linhas do dataset (colunas de `MASTER_SOURCE_COLUMNS`)."""
+        table = table.select(MASTER_SOURCE_COLUMNS).filter(pc.is_valid(table['CODISI']))
+        # Textos em dicionário viram string, para que blocos diferentes se combinem.
+        table = decode_storage_table(table).cast(_SOURCE_SCHEMA)
+        latest = _latest_rows(table)
+        tickers, names = _distinct_pairs(table, 'CODNEG'), _distinct_pairs(table, 'NOMRES')
+        self._latest.append(latest)
+        self._tickers.append(tickers)
+        self._names.append(names)
+        self._pending_rows += latest.num_rows + tickers.num_rows + names.num_rows
+        if self._pending_rows > max(_MAX_PENDING_ROWS, self._reduced_rows):
+            self._reduce()
+
+    def _reduce(self):
+        """(Helper Interno) Combina os parciais acumulados em um único parcial de cada tipo."""
+        if not self._latest:
+            return
+        self._latest = [_latest_rows(pa.concat_tables(self._latest))]
+        self._tickers = [pa.concat_tables(self._tickers).group_by(['CODISI', 'CODNEG']).aggregate([])]
+        self._names = [pa.concat_tables(self._names).group_by(['CODISI', 'NOMRES']).aggregate([])]
+        self._pending_rows = 0
+        self._reduced_rows = sum(t.num_rows for t in self._latest + self._tickers + self._names)
+
+    def to_state(self) -> pa.Table:
+        """
+        Serializa os agregados em uma tabela, uma linha por CODISI.
+
+        Returns:
+            pa.Table: A linha mais recente de cada ativo (colunas de
+                      `MASTER_SOURCE_COLUMNS`) e as listas de tickers
+                      ('TICKERS') e nomes ('NOMES') já vistos.
+        """
+        self._reduce()
+        if not self._latest:
+            return _SOURCE_SCHEMA.empty_table()
+        state = self._latest[0].sort_by('CODISI')
+        for pairs, column, output in [(self._tickers[0], 'CODNEG', 'TICKERS'), (self._names[0], 'NOMRES', 'NOMES')]:
+            grouped = pairs.group_by('CODISI').aggregate([(column, 'list')])
+            # Joins do Arrow não aceitam listas; as listas são alinhadas por posição.
+            positions = pc.index_in(state['CODISI'], value_set=grouped['CODISI'].combine_chunks())
+            state = state.append_column(output, pc.take(grouped[f'{column}_list'], positions))
+        return state
+
+    @classmethod
+    def from_state(cls, state: pa.Table) -> 'SecurityMasterAccumulator':
+        """Recria o acumulador a partir de uma tabela gerada por `to_state`."""
+        accumulator = cls()
+        if state.num_rows == 0:
+            return accumulator
+        accumulator._latest = [state.select(MASTER_SOURCE_COLUMNS).cast(_SOURCE_SCHEMA)]
+        for column, output, target in [('CODNEG', 'TICKERS', accumulator._tickers), ('NOMRES', 'NOMES', accumulator._names)]:
+            lists = state[output].combine_chunks()
+            isins = pc.take(state['CODISI'], pc.list_parent_indices(lists))
+            target.append(pa.table({'CODISI': isins, column: pc.list_flatten(lists)}))
+        accumulator._reduced_rows = sum(t.num_rows for t in accumulator._latest + accumulator._tickers + accumulator._names)
+        return accumulator
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Monta o dicionário de ativos a partir dos agregados.
+
+        Returns:
+            pd.DataFrame: Uma linha por CODISI, com as colunas de
+                          `MASTER_COLUMNS`, ordenada por ULTIMO_TICKER.
+        """
+        self._reduce()
+        if not self._latest:
+            return pd.DataFrame(columns=MASTER_COLUMNS)
+        latest = self._latest[0]
+        master = pa.table({
+            'CODISI': latest['CODISI'],
+            'ULTIMO_TICKER': latest['CODNEG'],
+            'ULTIMO_NOME': latest['NOMRES'],
+            'ULTIMA_ESPECIFICACAO': latest['ESPECI'],
+        })
+        for pairs, column, output in [(self._tickers[0], 'CODNEG', 'TICKERS_HISTORICOS'),
+                                      (self._names[0], 'NOMRES', 'NOMES_HISTORICOS')]:
+            master = master.join(_join_history(pairs, column, output), keys='CODISI', join_type='left outer')
+            # Ativos sem nenhum valor não nulo ficam com o histórico vazio.
+            master = master.set_column(master.schema.get_field_index(output), output, master[output].fill_null(''))
+        master = master.sort_by([('ULTIMO_TICKER', 'ascending'), ('CODISI', 'ascending')])
+        return master.select(MASTER_COLUMNS).to_pandas()
 
-def create_security_master(processed_path: Path, output_path: Path):
-    """Gera o Dicionário Master de Ativos (Security Master)."""
-    print("\n--- Gerando Dicionário Master de Ativos (Security Master) ---")
+
+def _accumulate(accumulator: SecurityMasterAccumulator, source_path: Path, stage_metrics: dict):
+    """
+    (Helper Interno) Lê em fluxo um dataset, partição ou fragmento e o incorpora ao acumulador.
+
+    Linhas e bytes lidos (em memória, já descomprimidos) são somados em
+    'linhas' e 'bytes_entrada' de `stage_metrics`.
+    """
+    scanner = open_dataset(source_path).scanner(
+        columns=MASTER_SOURCE_COLUMNS, filter=pc.field('CODISI').is_valid(), batch_size=1 << 20,
+    )
+    for batch in scanner.to_batches():
+        stage_metrics['linhas'] = stage_metrics.get('linhas', 0) + batch.num_rows
+        stage_metrics['bytes_entrada'] = stage_metrics.get('bytes_entrada', 0) + batch.nbytes
+        accumulator.update(pa.Table.from_batches([batch]))
+
+
+def _save_security_master(accumulator: SecurityMasterAccumulator, output_path: Path, excel: bool) -> int:
+    """
+    (Helper Interno) Monta o dicionário e o grava (Parquet, Arrow IPC e, opcionalmente, Excel), com o estado.
+
+    Returns:
+        int: O total de bytes gravados.
+    """
+    logger.info(" -> Montando o dicionário final...")
+    df_dicionario_ativos = accumulator.to_dataframe()
+
+    output_path_parquet = output_path / 'dicionario_ativos.parquet'
+    output_path_ipc = output_path / 'dicionario_ativos.arrow'
+    written = [output_path_parquet, output_path_ipc, output_path / MASTER_STATE_FILE]
+    
+    df_dicionario_ativos.to_parquet(output_path_parquet, index=False)
+    table = pa.Table.from_pandas(df_dicionario_ativos, preserve_index=False)
+    with pa.OSFile(str(output_path_ipc), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    pq.write_table(accumulator.to_state(), output_path / MASTER_STATE_FILE)
+    
+    logger.info(f" -> [SUCESSO] Dicionário com {len(df_dicionario_ativos)} ativos únicos gerado.")
+    logger.info(f"    -> Salvo em (Parquet):   {output_path_parquet}")
+    logger.info(f"    -> Salvo em (Arrow IPC): {output_path_ipc}")
+    if excel:
+        output_path_excel = output_path / 'dicionario_ativos.xlsx'
+        df_dicionario_ativos.to_excel(output_path_excel, index=False, engine='openpyxl')
+        logger.info(f"    -> Exportado (Excel):    {output_path_excel}")
+        written.append(output_path_excel)
+    return sum(metrics.path_bytes(path) for path in written)
+
+
+def create_security_master(processed_path: Path, output_path: Path, excel: bool = False):
+    """
+    Gera o Dicionário Master de Ativos (Security Master).
+
+    O dataset é lido em fluxo, em blocos, e agregado no Arrow por
+    `SecurityMasterAccumulator`; a memória usada não cresce com o histórico.
+    O dicionário é salvo em Parquet e em Arrow IPC sem compressão
+    ('dicionario_ativos.arrow'), formato que o analisador lê via memory map.
+    O estado dos agregados ('dicionario_ativos_estado.parquet') também é
+    salvo, para as atualizações incrementais de `update_security_master`.
+
+    Args:
+        processed_path (Path): O diretório 'processed', com o dataset 'dados_b3'.
+        output_path (Path): O diretório 'outputs'.
+        excel (bool): Se True, também exporta 'dicionario_ativos.xlsx'.
+    """
+    logger.info("--- Gerando Dicionário Master de Ativos (Security Master) ---")
     
-    parquet_file = processed_path / 'dados_b3.parquet'
+    parquet_file = processed_path / 'dados_b3'
     if not parquet_file.exists():
-        print(f" -> [ERRO FATAL] O arquivo de dados principal '{parquet_file}' não foi encontrado.")
+        logger.error(f" -> [ERRO FATAL] O dataset principal '{parquet_file}' não foi encontrado.")
         return
 
-    try:
-        start_time = time.time()
-        print(" -> Lendo colunas necessárias do dataset principal...")
-        df_full = pd.read_parquet(parquet_file, columns=['DATA_PREGAO', 'CODISI', 'CODNEG', 'NOMRES', 'ESPECI'])
-        print(f" -> Leitura concluída em {time.time() - start_time:.2f} segundos.")
-
-        df_ativos = df_full.dropna(subset=['CODISI']).copy()
-        
-        print(" -> Identificando informações mais recentes de cada ativo...")
-        df_base_ativos = (
-            df_ativos.sort_values('DATA_PREGAO', ascending=False)
-            .drop_duplicates(subset=['CODISI'], keep='first')
-            .rename(columns={'CODNEG': 'ULTIMO_TICKER', 'NOMRES': 'ULTIMO_NOME', 'ESPECI': 'ULTIMA_ESPECIFICACAO'})
-            .drop(columns='DATA_PREGAO')
-        )
-
-        print(" -> Compilando históricos de tickers...")
-        df_variacoes_tickers = (
-            df_ativos.groupby('CODISI')['CODNEG']
-            .apply(lambda x: ' | '.join(sorted([str(item) for item in x.unique() if pd.notna(item)])))
-            .reset_index()
-            .rename(columns={'CODNEG': 'TICKERS_HISTORICOS'})
-        )
-        
-        print(" -> Compilando históricos de nomes...")
-        df_variacoes_nomes = (
-            df_ativos.groupby('CODISI')['NOMRES']
-            .apply(lambda x: ' | '.join(sorted([str(item) for item in x.unique() if pd.notna(item)])))
-            .reset_index()
-            .rename(columns={'NOMRES': 'NOMES_HISTORICOS'})
-        )
-
-        print(" -> Montando o dicionário final...")
-        df_dicionario_ativos = pd.merge(df_base_ativos, df_variacoes_tickers, on='CODISI', how='left')
-        df_dicionario_ativos = pd.merge(df_dicionario_ativos, df_variacoes_nomes, on='CODISI', how='left')
-
-        cols_ordem = ['CODISI', 'ULTIMO_TICKER', 'ULTIMO_NOME', 'ULTIMA_ESPECIFICACAO', 'TICKERS_HISTORICOS', 'NOMES_HISTORICOS']
-        df_dicionario_ativos = df_dicionario_ativos[cols_ordem].sort_values('ULTIMO_TICKER').reset_index(drop=True)
-
-        output_path_parquet = output_path / 'dicionario_ativos.parquet'
-        output_path_excel = output_path / 'dicionario_ativos.xlsx'
-        
-        df_dicionario_ativos.to_parquet(output_path_parquet, index=False)
-        df_dicionario_ativos.to_excel(output_path_excel, index=False, engine='openpyxl')
-        
-        print(f" -> [SUCESSO] Dicionário com {len(df_dicionario_ativos)} ativos únicos gerado.")
-        print(f"    -> Salvo em (Parquet): {output_path_parquet}")
-        print(f"    -> Salvo em (Excel):   {output_path_excel}")
+    with metrics.stage('dicionario_ativos', modo='completo') as stage_metrics:
+        try:
+            start_time = time.time()
+            logger.info(" -> Agregando o dataset principal em fluxo (último registro e históricos por ISIN)...")
+            accumulator = SecurityMasterAccumulator()
+            _accumulate(accumulator, parquet_file, stage_metrics)
+            logger.info(f" -> Agregação concluída em {time.time() - start_time:.2f} segundos.")
+            stage_metrics['bytes_saida'] = _save_security_master(accumulator, output_path, excel)
 
-    except Exception as e:
-        print(f" -> [ERRO] Falha ao gerar o Dicionário Master de Ativos: {e}")
\ No newline at end of file
+        except Exception as e:
+            logger.exception(f" -> [ERRO] Falha ao gerar o Dicionário Master de Ativos: {e}")
+            stage_metrics.update(status='erro', erro=f'{type(e).__name__}: {e}')
+
+def update_security_master(processed_path: Path, output_path: Path, sources: List[str], excel: bool = False):
+    """
+    Atualiza o Dicionário Master de Ativos apenas com os dados recém-ingeridos.
+
+    Parte do estado salvo na última geração e incorpora só as linhas de
+    `sources`: novos tickers e nomes entram nos históricos, os campos ULTIMO_*
+    mudam quando aparece um pregão mais recente e novos ISINs são incluídos.
+    Reprocessar linhas já vistas não altera o resultado. Remoções não são
+    refletidas; nesse caso (ou sem estado salvo), use `create_security_master`,
+    que reconstrói o dicionário a partir de todo o histórico.
+
+    Args:
+        processed_path (Path): O diretório 'processed', com o dataset 'dados_b3'.
+        output_path (Path): O diretório 'outputs'.
+        sources (List[str]): Fragmentos ou partições com os dados novos,
+                             relativos a 'dados_b3' (ex: o resumo 'fragments'
+                             devolvido por `process_text_to_parquet`).
+        excel (bool): Se True, também exporta 'dicionario_ativos.xlsx'.
+    """
+    logger.info("--- Atualizando Dicionário Master de Ativos (incremental) ---")
+    state_path = output_path / MASTER_STATE_FILE
+    if not state_path.exists():
+        logger.info(" -> Estado do dicionário não encontrado; gerando a partir de todo o histórico.")
+        create_security_master(processed_path, output_path, excel=excel)
+        return
+
+    with metrics.stage('dicionario_ativos', modo='incremental', fragmentos=len(sources)) as stage_metrics:
+        try:
+            start_time = time.time()
+            accumulator = SecurityMasterAccumulator.from_state(pq.read_table(state_path))
+            dataset_path = processed_path / 'dados_b3'
+            for source in sources:
+                _accumulate(accumulator, dataset_path / source, stage_metrics)
+            logger.info(f" -> {len(sources)} fragmentos incorporados em {time.time() - start_time:.2f} segundos.")
+            stage_metrics['bytes_saida'] = _save_security_master(accumulator, output_path, excel)
+
+        except Exception as e:
+            logger.exception(f" -> [ERRO] Falha ao atualizar o Dicionário Master de Ativos: {e}")
+            stage_metrics.update(status='erro', erro=f'{type(e).__name__}: {e}')
@@ -0,0 +1,182 @@
+# src/b3_analyzer/metrics.py
+#
+# Métricas estruturadas do pipeline e das consultas. Cada evento é um dict
+# (JSON serializável) entregue aos ganchos registrados com `add_metrics_hook`
+# e, se a variável de ambiente `B3_METRICS_FILE` estiver definida, gravado
+# como uma linha JSON nesse arquivo. Sem ganchos nem arquivo, as métricas
+# que custam leitura extra de metadados (ver `enabled`) não são calculadas.
+
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_ENV = 'B3_METRICS_FILE'
+_hooks: List[Callable[[dict], None]] = []
+_hooks_lock = threading.Lock()
+_sinks = {}
+
+
+class JsonLinesSink:
+    """
+    Gancho que grava cada evento como uma linha JSON em um arquivo (modo append).
+
+    Seguro entre threads; valores não serializáveis (datas, caminhos) são
+    gravados como texto.
+
+    Args:
+        path (Path): O arquivo de saída (ex: 'metricas.jsonl').
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+def add_metrics_hook(hook: Callable[[dict], None]):
+    """Registra uma função chamada com cada evento de métrica (ex: `JsonLinesSink`, um cliente StatsD)."""
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_metrics_hook(hook: Callable[[dict], None]):
+    """Remove um gancho registrado com `add_metrics_hook` (sem efeito se ele não estiver registrado)."""
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def _env_sink() -> Optional[JsonLinesSink]:
+    """(Helper Interno) O `JsonLinesSink` do arquivo em `B3_METRICS_FILE`, se a variável estiver definida."""
+    path = os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return None
+    if path not in _sinks:
+        _sinks[path] = JsonLinesSink(path)
+    return _sinks[path]
+
+
+def enabled() -> bool:
+    """True se algum gancho ou o arquivo de `B3_METRICS_FILE` vai receber os eventos."""
+    return bool(_hooks) or bool(os.environ.get(METRICS_FILE_ENV))
+
+
+def emit(event: str, **fields):
+    """
+    Entrega um evento aos ganchos registrados e ao arquivo de `B3_METRICS_FILE`.
+
+    Falhas de um gancho são registradas no log e não interrompem o chamador.
+
+    Args:
+        event (str): O tipo do evento ('etapa', 'arquivo', 'consulta'...).
+        **fields: Os campos do evento.
+    """
+    hooks = list(_hooks)
+    sink = _env_sink()
+    if sink is not None:
+        hooks.append(sink)
+    if not hooks:
+        return
+    record = {'evento': event, 'momento': datetime.datetime.now().isoformat(timespec='milliseconds'), **fields}
+    for hook in hooks:
+        try:
+            hook(record)
+        except Exception:
+            logger.exception("Falha no gancho de métricas %r.", hook)
+
+
+def reset_peak_rss():
+    """
+    Zera o pico de memória residente do processo, quando o sistema permite.
+
+    No Linux, escreve em '/proc/self/clear_refs', de modo que `peak_rss_bytes`
+    passa a medir só o que vier depois (o pico de uma etapa, e não do
+    processo inteiro). Em outros sistemas, não faz nada.
+
+    O pico é do processo inteiro: zerá-lo apaga também o de quem chamou e o
+    de etapas em andamento. Só quem controla o processo (ex: o script do
+    pipeline, antes de cada etapa) deve chamar esta função.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """O pico de memória residente do processo, em bytes (desde o último `reset_peak_rss`, no Linux)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+@contextmanager
+def stage(name: str, **fields) -> Iterator[dict]:
+    """
+    Mede uma etapa do pipeline e emite um evento 'etapa' ao final.
+
+    O bloco recebe um dict em que pode registrar 'linhas', 'bytes_entrada',
+    'bytes_saida' e outros campos. O evento traz ainda a duração, as linhas
+    por segundo, o pico de memória e o status ('ok' ou 'erro', com a
+    mensagem da exceção, que é propagada).
+
+    O pico de memória ('pico_rss_bytes') é o do processo desde o início ou
+    desde o último `reset_peak_rss`: a etapa não o zera, para não apagar o
+    de quem a chamou. Para o pico de cada etapa, zere-o antes dela.
+
+    Exemplo:
+        with metrics.stage('ingestao') as m:
+            m['linhas'] = ...
+    """
+    record = {'etapa': name, **fields}
+    start = time.perf_counter()
+    try:
+        yield record
+        record.setdefault('status', 'ok')
+    except BaseException as e:
+        record['status'] = 'erro'
+        record['erro'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        record['duracao_s'] = round(duration, 6)
+        if record.get('linhas') is not None and duration > 0:
+            record['linhas_por_s'] = round(record['linhas'] / duration, 1)
+        record['pico_rss_bytes'] = peak_rss_bytes()
+        emit('etapa', **record)
+
+
+def path_bytes(path: Path) -> int:
+    """O tamanho em disco de um arquivo, ou a soma dos arquivos de um diretório (0 se não existir)."""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    if not path.is_dir():
+        return 0
+    return sum(item.stat().st_size for item in path.rglob('*') if item.is_file())
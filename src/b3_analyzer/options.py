@@ -0,0 +1,206 @@
+# src/b3_analyzer/options.py
+#
+# Cadeias de opções: um repositório Arrow IPC com as opções de compra e de
+# venda agrupadas por (radical, vencimento), indexado por lote, e a montagem
+# da cadeia com calls e puts lado a lado.
+
+import os
+import threading
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pathlib import Path
+from typing import List, Optional
+
+from .storage import decode_storage_table
+
+OPTIONS_INDEX_TABLE = 'indice_opcoes'
+OPTIONS_STORE_FILE = 'opcoes.arrow'
+# Mercado (TPMERC) de cada lado da cadeia.
+OPTION_SIDES = {70: 'CALL', 80: 'PUT'}
+CHAIN_KEYS = ['RAIZ', 'DATA_PREGAO', 'DATVEN', 'PREEXE']
+CHAIN_FIELDS = ['CODNEG', 'PREABE', 'PREMAX', 'PREMIN', 'PREULT', 'PREOFC', 'PREOFV', 'TOTNEG', 'QUATOT', 'VOLTOT']
+CHAIN_SOURCE_COLUMNS = ['DATA_PREGAO', 'TPMERC', 'DATVEN', 'PREEXE'] + CHAIN_FIELDS
+# Linhas por lote do repositório: um lote nunca mistura radicais ou vencimentos.
+_BATCH_ROWS = 65_536
+_INDEX_SCHEMA = pa.schema([
+    ('RAIZ', pa.string()), ('DATVEN', pa.date32()), ('LOTE', pa.int32()),
+    ('PRIMEIRO_PREGAO', pa.date32()), ('ULTIMO_PREGAO', pa.date32()), ('LINHAS', pa.int32()),
+])
+
+
+def _option_rows(table: pa.Table) -> pa.Table:
+    """(Helper Interno) As linhas de opções de compra/venda, com as colunas de `CHAIN_SOURCE_COLUMNS`."""
+    table = table.select(CHAIN_SOURCE_COLUMNS)
+    is_option = pc.is_in(table['TPMERC'], value_set=pa.array(list(OPTION_SIDES), table.schema.field('TPMERC').type))
+    return table.filter(pc.fill_null(is_option, False))
+
+
+def _roots(table: pa.Table) -> pa.ChunkedArray:
+    """(Helper Interno) O radical (4 primeiras letras do ticker) de cada linha."""
+    return pc.utf8_slice_codeunits(table['CODNEG'], 0, 4)
+
+
+class OptionsStoreWriter:
+    """
+    Grava o repositório de opções bloco a bloco.
+
+    Cada bloco do dataset é ordenado por (radical, vencimento, pregão) e
+    dividido em lotes de um único (radical, vencimento), com até
+    `_BATCH_ROWS` linhas; o índice guarda, por lote, o radical, o
+    vencimento e o intervalo de pregões. Um mesmo (radical, vencimento) pode
+    ocupar vários lotes. Tem a mesma interface de `AggregateAccumulator`,
+    para ser gerado na mesma leitura das tabelas agregadas.
+
+    Args:
+        path (Path): O arquivo do repositório (ex: 'agregados/opcoes.arrow').
+    """
+    source_columns = CHAIN_SOURCE_COLUMNS
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._temp_path = self.path.with_name(f'_{self.path.name}')
+        self._writer = None
+        self._index: List[tuple] = []
+
+    def update(self, table: pa.Table):
+        """Incorpora um bloco de linhas do dataset (com as colunas de `CHAIN_SOURCE_COLUMNS`)."""
+        table = _option_rows(table)
+        if table.num_rows == 0:
+            return
+        table = table.append_column('RAIZ', _roots(table))
+        table = table.sort_by([('RAIZ', 'ascending'), ('DATVEN', 'ascending'), ('DATA_PREGAO', 'ascending')])
+        roots = table['RAIZ'].to_numpy(zero_copy_only=False)
+        expiries = table['DATVEN'].cast(pa.int32()).fill_null(np.iinfo(np.int32).min).to_numpy(zero_copy_only=False)
+        days = table['DATA_PREGAO'].cast(pa.int32()).to_numpy(zero_copy_only=False)
+        data = table.drop_columns(['RAIZ'])
+        if self._writer is None:
+            options = pa.ipc.IpcWriteOptions(compression='lz4')
+            self._writer = pa.ipc.new_file(str(self._temp_path), data.schema, options=options)
+
+        starts = np.flatnonzero(np.r_[True, (roots[1:] != roots[:-1]) | (expiries[1:] != expiries[:-1])])
+        for start, end in zip(starts, np.r_[starts[1:], len(roots)]):
+            for lo in range(start, end, _BATCH_ROWS):
+                hi = min(lo + _BATCH_ROWS, end)
+                self._writer.write_batch(data.slice(lo, hi - lo).combine_chunks().to_batches()[0])
+                expiry = None if expiries[lo] == np.iinfo(np.int32).min else int(expiries[lo])
+                self._index.append((roots[lo], expiry, len(self._index), int(days[lo]), int(days[hi - 1]), hi - lo))
+
+    def result(self) -> pa.Table:
+        """Fecha o repositório e retorna o índice de lotes (RAIZ, DATVEN, LOTE, PRIMEIRO_PREGAO, ULTIMO_PREGAO, LINHAS)."""
+        if self._writer is None:
+            return _INDEX_SCHEMA.empty_table()
+        self._writer.close()
+        os.replace(self._temp_path, self.path)
+        columns = list(zip(*self._index))
+        arrays = [pa.array(values, type=pa.int32() if field.type == pa.date32() else field.type)
+                  for values, field in zip(columns, _INDEX_SCHEMA)]
+        return pa.Table.from_arrays(arrays, names=_INDEX_SCHEMA.names).cast(_INDEX_SCHEMA)
+
+
+class OptionsStore:
+    """
+    Leitura do repositório de opções pelo índice de lotes.
+
+    O arquivo é aberto via memory map; uma consulta seleciona no índice os
+    lotes do radical cujo intervalo de pregões (e vencimento) cruza o pedido
+    e descomprime apenas esses lotes. Cada thread usa o seu próprio leitor,
+    de modo que consultas concorrentes não disputam o mesmo arquivo aberto.
+
+    Args:
+        path (Path): O arquivo do repositório.
+        index (pa.Table): O índice de lotes gerado por `OptionsStoreWriter`.
+    """
+    def __init__(self, path: Path, index: pa.Table):
+        self.path = Path(path)
+        self.index = index
+        self._local = threading.local()
+
+    @property
+    def _reader(self) -> pa.ipc.RecordBatchFileReader:
+        """(Helper Interno) O leitor do repositório da thread atual, aberto no primeiro uso."""
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            reader = self._local.reader = pa.ipc.open_file(pa.memory_map(str(self.path)))
+        return reader
+
+    def read(self, root: str, start=None, end=None, vencimento_min=None, vencimento_max=None) -> pa.Table:
+        """
+        Lê as opções de um radical no intervalo de pregões e de vencimentos pedido.
+
+        Returns:
+            pa.Table: As linhas (colunas de `CHAIN_SOURCE_COLUMNS`), no schema de armazenamento.
+        """
+        index = self.index
+        mask = pc.equal(index['RAIZ'], root)
+        if start is not None:
+            mask = pc.and_(mask, pc.greater_equal(index['ULTIMO_PREGAO'], start))
+        if end is not None:
+            mask = pc.and_(mask, pc.less_equal(index['PRIMEIRO_PREGAO'], end))
+        if vencimento_min is not None:
+            mask = pc.and_(mask, pc.greater_equal(index['DATVEN'], vencimento_min))
+        if vencimento_max is not None:
+            mask = pc.and_(mask, pc.less_equal(index['DATVEN'], vencimento_max))
+        reader = self._reader
+        batches = [reader.get_batch(i) for i in index.filter(mask)['LOTE'].to_pylist()]
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        return table.filter(_date_filter(table, start, end))
+
+
+def _date_filter(table: pa.Table, start, end) -> pa.ChunkedArray:
+    """(Helper Interno) Máscara do intervalo de pregões [start, end] (lados None ficam em aberto)."""
+    mask = pc.is_valid(table['DATA_PREGAO'])
+    if start is not None:
+        mask = pc.and_(mask, pc.greater_equal(table['DATA_PREGAO'], start))
+    if end is not None:
+        mask = pc.and_(mask, pc.less_equal(table['DATA_PREGAO'], end))
+    return mask
+
+
+def build_chain(table: pa.Table) -> pa.Table:
+    """
+    Monta a cadeia de opções com calls e puts lado a lado.
+
+    As linhas são agrupadas por (RAIZ, DATA_PREGAO, DATVEN, PREEXE). Em
+    cada grupo, a n-ésima call (por ticker) fica na mesma linha da n-ésima
+    put; um lado sem par fica nulo.
+
+    Args:
+        table (pa.Table): Opções no schema de armazenamento (colunas de
+                          `CHAIN_SOURCE_COLUMNS`), de qualquer radical.
+
+    Returns:
+        pa.Table: As chaves e, para cada campo de `CHAIN_FIELDS`, as colunas
+                  '<campo>_CALL' e '<campo>_PUT', ordenada pelas chaves, com
+                  preços em float64 e datas em timestamp.
+    """
+    table = decode_storage_table(_option_rows(table))
+    table = table.append_column('RAIZ', _roots(table))
+    sort_keys = [(k, 'ascending') for k in CHAIN_KEYS + ['CODNEG']]
+    sides = []
+    for code, side in OPTION_SIDES.items():
+        rows = table.filter(pc.equal(table['TPMERC'], code)).sort_by(sort_keys)
+        # Posição de cada opção dentro do seu grupo, para parear calls e puts.
+        new_group = np.ones(rows.num_rows, dtype=bool)
+        for key in CHAIN_KEYS:
+            values = rows[key].to_numpy(zero_copy_only=False)
+            new_group[1:] |= values[1:] != values[:-1]
+        starts = np.flatnonzero(new_group)
+        rank = np.arange(rows.num_rows) - np.repeat(starts, np.diff(np.r_[starts, rows.num_rows]))
+        columns = {k: rows[k] for k in CHAIN_KEYS}
+        columns['ORDEM'] = pa.array(rank, pa.int64())
+        columns.update({f'{field}_{side}': rows[field] for field in CHAIN_FIELDS})
+        sides.append(pa.table(columns))
+
+    chain = sides[0].join(sides[1], keys=CHAIN_KEYS + ['ORDEM'], join_type='full outer')
+    chain = chain.sort_by([(k, 'ascending') for k in CHAIN_KEYS + ['ORDEM']])
+    fields = [f'{field}_{side}' for side in OPTION_SIDES.values() for field in CHAIN_FIELDS]
+    return chain.select(CHAIN_KEYS + fields)
+
+
+def open_options_store(aggregates_path: Path, index: Optional[pa.Table]) -> Optional[OptionsStore]:
+    """Abre o repositório em `aggregates_path` com o índice dado, se ambos existirem."""
+    path = Path(aggregates_path) / OPTIONS_STORE_FILE
+    if index is None or not path.exists():
+        return None
+    return OptionsStore(path, index)
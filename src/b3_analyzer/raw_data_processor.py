@@ -1,15 +1,30 @@
 # src/b3_analyzer/raw_data_processor.py
 
 import os
+import json
+import time
+import hashlib
+import logging
 import zipfile
 import shutil
-import pandas as pd
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+import pyarrow.dataset as ds
 from pathlib import Path
 from tqdm import tqdm
-from io import StringIO
-import gc
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import metrics
+from .storage import (
+    DATASET_NAME, DEFAULT_COMPRESSION, DEFAULT_PARTITION_COLS, STORAGE_SCHEMA, normalize_partition_cols,
+    split_by_partition, writer_compression_options,
+)
+
+logger = logging.getLogger(__name__)
 
 # --- Constantes de Layout e Limpeza ---
 COTAHIST_LAYOUT = {
@@ -26,6 +41,244 @@ NAMES = list(COTAHIST_LAYOUT.keys())
 DATE_COLS = ['DATA_PREGAO', 'DATVEN']
 PRICE_COLS = ['PREABE', 'PREMAX', 'PREMIN', 'PREMED', 'PREULT', 'PREOFC', 'PREOFV', 'PREEXE', 'VOLTOT']
 INT_COLS = ['TIPREG', 'CODBDI', 'TPMERC', 'TOTNEG', 'QUATOT', 'FATCOT', 'INDOPC', 'DISMES', 'PRAZOT', 'PTOEXE']
+STRING_COLS = [c for c in NAMES if c not in DATE_COLS + PRICE_COLS + INT_COLS]
+
+# --- Constantes do Parser Binário ---
+RECORD_LENGTH = COTAHIST_LAYOUT['DISMES'][1]
+BATCH_SIZE = 500_000
+READ_CHUNK_BYTES = 64 * 1024 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# --- Constantes da Compactação ---
+COMPACTED_FRAGMENT_NAME = 'compactado.parquet'
+COMPACT_ROW_GROUP_SIZE = 64 * 1024
+COMPACT_DATA_PAGE_SIZE = 64 * 1024
+# Linhas ordenadas de uma vez na compactação: a memória fica limitada a cerca
+# de duas cópias deste número de linhas, e não da partição inteira.
+COMPACT_SORT_ROWS = 4 * 1024 * 1024
+COMPACT_SORT_KEYS = {
+    'CODNEG': ['CODNEG', 'DATA_PREGAO'],
+    'CODISI': ['CODISI', 'CODNEG', 'DATA_PREGAO'],
+}
+
+# Versão do manifesto de ingestão; mudar o layout dos fragmentos exige incrementá-la.
+MANIFEST_VERSION = 3
+
+# Schema de saída do parser: o mesmo schema compacto gravado no dataset.
+COTAHIST_SCHEMA = STORAGE_SCHEMA
+
+# Limites de datetime64[ns] (tipo entregue nas consultas): datas fora deste
+# intervalo (ex: DATVEN 99991231) viram nulas já na ingestão.
+_MIN_TIMESTAMP_DAY = np.datetime64('1677-09-22', 'D')
+_MAX_TIMESTAMP_DAY = np.datetime64('2262-04-11', 'D')
+
+
+def _decode_int_field(block: np.ndarray):
+    """
+    Converte um bloco de bytes ASCII (n_registros x largura) em inteiros.
+
+    A conversão usa aritmética vetorizada sobre os dígitos (produto pelos pesos
+    posicionais 10^k), sem passar por strings. Espaços à esquerda ou à direita
+    são ignorados; campos vazios ou com caracteres inválidos viram nulos.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Os valores (int64) e a máscara de validade.
+    """
+    n_rows, width = block.shape
+    block = np.ascontiguousarray(block)
+    digits = block - np.uint8(48)
+
+    # Caminho rápido: campo inteiramente numérico (o caso normal no COTAHIST).
+    if (digits <= 9).all():
+        powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+        return digits @ powers, np.ones(n_rows, dtype=bool)
+
+    values = np.zeros(n_rows, dtype=np.int64)
+    seen = np.zeros(n_rows, dtype=bool)
+    gap = np.zeros(n_rows, dtype=bool)
+    bad = np.zeros(n_rows, dtype=bool)
+    for j in range(width):
+        is_digit = digits[:, j] <= 9
+        bad |= ~(is_digit | (block[:, j] == 32)) | (is_digit & gap)
+        gap |= seen & ~is_digit
+        seen |= is_digit
+        values = np.where(is_digit, values * 10 + digits[:, j], values)
+    return values, seen & ~bad
+
+
+def _decode_date_field(block: np.ndarray) -> pa.Array:
+    """Converte um campo AAAAMMDD em `date32`, anulando datas inválidas."""
+    values, valid = _decode_int_field(block)
+    year, month, day = values // 10000, values // 100 % 100, values % 100
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (year <= 9999)
+    year = np.where(valid, year, 1970)
+    month = np.where(valid, month, 1)
+    day = np.where(valid, day, 1)
+
+    months = ((year - 1970) * 12 + (month - 1)).astype('datetime64[M]')
+    first_day = months.astype('datetime64[D]')
+    days_in_month = ((months + 1).astype('datetime64[D]') - first_day).astype(np.int64)
+    dates = first_day + (day - 1)
+    valid &= (day <= days_in_month) & (dates >= _MIN_TIMESTAMP_DAY) & (dates <= _MAX_TIMESTAMP_DAY)
+    return pa.array(dates, type=pa.date32(), mask=~valid)
+
+
+def _decode_string_field(block: np.ndarray) -> pa.DictionaryArray:
+    """
+    Converte um campo de texto em `dictionary<int32, string>`, removendo
+    espaços das bordas.
+
+    Os bytes do campo viram um buffer `fixed_size_binary` do PyArrow, que é
+    codificado em dicionário. Apenas os valores distintos (poucos, em geral)
+    são decodificados de latin-1 em Python; as linhas guardam só os índices.
+    Campos vazios viram nulos.
+    """
+    n_rows, width = block.shape
+    buffer = pa.py_buffer(np.ascontiguousarray(block))
+    raw = pa.FixedSizeBinaryArray.from_buffers(pa.binary(width), n_rows, [None, buffer])
+    encoded = raw.dictionary_encode()
+
+    # Valores que só diferem por espaços nas bordas compartilham a mesma entrada.
+    uniques = [v.decode('latin-1').strip() for v in encoded.dictionary.to_pylist()]
+    positions = {v: i for i, v in enumerate(dict.fromkeys(u for u in uniques if u))}
+    lookup = np.array([positions.get(u, -1) for u in uniques], dtype=np.int32)
+    codes = lookup[encoded.indices.to_numpy()]
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, type=pa.int32(), mask=codes < 0), pa.array(list(positions), type=pa.string()),
+    )
+
+
+def _record_matrix(data: bytes) -> Optional[np.ndarray]:
+    """
+    (Helper Interno) Os registros como uma matriz (n_registros x tamanho da linha), sem cópia.
+
+    Returns:
+        Optional[np.ndarray]: A matriz, ou None se as linhas não tiverem todas
+                              o mesmo tamanho e terminador do primeiro registro.
+    """
+    newline = data.find(b'\n')
+    if newline < 0:
+        data, newline = data + b'\n', len(data)
+    stride = newline + 1
+    if len(data[:newline].rstrip(b'\r')) != RECORD_LENGTH:
+        return None
+
+    # Garante que o último registro tenha terminador, mesmo sem quebra de linha final.
+    if not data.endswith(b'\n'):
+        data += data[RECORD_LENGTH:stride]
+    if len(data) % stride:
+        return None
+    n_rows = len(data) // stride
+    records = np.frombuffer(data, dtype=np.uint8).reshape(n_rows, stride)
+    if (records[:, -1] != ord('\n')).any() or (stride > RECORD_LENGTH + 1 and (records[:, RECORD_LENGTH] != ord('\r')).any()):
+        return None
+    return records
+
+
+def _normalize_records(data: bytes) -> bytes:
+    """(Helper Interno) Remove linhas em branco e padroniza os terminadores em LF, validando o tamanho de cada registro."""
+    lines = [line.rstrip(b'\r') for line in data.split(b'\n')]
+    lines = [line for line in lines if line.strip()]
+    malformed = sum(len(line) != RECORD_LENGTH for line in lines)
+    if malformed:
+        raise ValueError(f"{malformed} registro(s) com tamanho diferente de {RECORD_LENGTH}: "
+                         "o arquivo não segue o layout COTAHIST.")
+    return b'\n'.join(lines) + b'\n'
+
+
+def parse_cotahist_bytes(data: bytes) -> pa.Table:
+    """
+    Converte registros COTAHIST brutos (bytes) em uma tabela Arrow tipada.
+
+    Os registros são vistos como uma matriz NumPy (n_registros x tamanho da linha)
+    sem cópia, e cada campo de `COTAHIST_LAYOUT` é fatiado diretamente dela.
+    Inteiros, preços e datas são decodificados com aritmética vetorizada. Os
+    registros de header (TIPREG 00) e trailer (TIPREG 99) são descartados.
+
+    A tabela já sai no schema de armazenamento (`STORAGE_SCHEMA`): textos
+    descritivos em dicionário, preços em centavos (int64) e datas em date32. Use
+    `storage.decode_storage_table` para obter os tipos de consulta.
+
+    Linhas em branco são ignoradas (como fazia `pd.read_fwf`), e LF e CRLF
+    podem se misturar; nesses casos os registros são normalizados antes, em
+    um caminho mais lento. Um registro com tamanho diferente do layout faz a
+    conversão falhar, em vez de gerar uma linha com campos deslocados.
+
+    Args:
+        data (bytes): Um ou mais registros completos, cada um terminado por
+                      quebra de linha (LF ou CRLF; a do último é opcional).
+
+    Returns:
+        pa.Table: Tabela com o schema `COTAHIST_SCHEMA`.
+
+    Raises:
+        ValueError: Se algum registro não tiver o tamanho do layout COTAHIST.
+    """
+    if not data or data.isspace():
+        return COTAHIST_SCHEMA.empty_table()
+    records = _record_matrix(data)
+    if records is None:
+        records = _record_matrix(_normalize_records(data))
+
+    tipreg = records[:, :2]
+    is_header = (tipreg[:, 0] == ord('0')) & (tipreg[:, 1] == ord('0'))
+    is_trailer = (tipreg[:, 0] == ord('9')) & (tipreg[:, 1] == ord('9'))
+    keep = ~(is_header | is_trailer)
+    if not keep.all():
+        records = records[keep]
+    if len(records) == 0:
+        return COTAHIST_SCHEMA.empty_table()
+
+    arrays = []
+    for name, (start, end) in COTAHIST_LAYOUT.items():
+        block = records[:, start - 1:end]
+        if name in DATE_COLS:
+            arrays.append(_decode_date_field(block))
+        elif name in STRING_COLS:
+            array = _decode_string_field(block)
+            if not pa.types.is_dictionary(COTAHIST_SCHEMA.field(name).type):
+                array = array.dictionary_decode()
+            arrays.append(array)
+        else:
+            # Preços ficam em centavos (ponto fixo); códigos usam o inteiro mais estreito.
+            values, valid = _decode_int_field(block)
+            int_type = COTAHIST_SCHEMA.field(name).type
+            arrays.append(pa.array(values.astype(int_type.to_pandas_dtype()), type=int_type, mask=~valid))
+
+    return pa.Table.from_arrays(arrays, schema=COTAHIST_SCHEMA)
+
+
+def iter_record_chunks(stream: BinaryIO, chunk_bytes: int = READ_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Lê um fluxo binário em blocos de tamanho fixo, cortados em fim de registro.
+
+    Cada bloco retornado contém apenas registros completos; o pedaço de linha
+    que sobra no fim de uma leitura é concatenado ao início da próxima. Assim,
+    o consumo de memória fica limitado ao tamanho do bloco.
+    """
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            break
+        chunk = pending + chunk
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            pending = chunk
+            continue
+        pending = chunk[cut:]
+        yield chunk[:cut]
+    if pending.strip():
+        yield pending
+
+
+def _member_txt_name(member: str) -> str:
+    """Nome do arquivo .txt correspondente a um membro de um ZIP da B3."""
+    base_name = os.path.basename(member)
+    # Garante que arquivos sem extensão recebam .TXT
+    if not base_name.lower().endswith('.txt'):
+        return base_name + '.TXT'
+    return base_name
 
 
 def extract_zip_files(raw_path: Path, texts_path: Path):
@@ -33,106 +286,547 @@ def extract_zip_files(raw_path: Path, texts_path: Path):
     Extrai arquivos .zip de um diretório de origem para um de destino,
     garantindo que todos os arquivos de saída tenham a extensão .txt.
     """
-    print("\n--- Etapa 1: Extraindo arquivos ZIP ---")
+    logger.info("--- Etapa 1: Extraindo arquivos ZIP ---")
     os.makedirs(texts_path, exist_ok=True)
     zip_files = [f for f in os.listdir(raw_path) if f.lower().endswith('.zip')]
     if not zip_files:
-        print(" -> Nenhum arquivo .zip encontrado em data/raw.")
+        logger.info(" -> Nenhum arquivo .zip encontrado em data/raw.")
         return
         
-    print(f" -> Encontrados {len(zip_files)} arquivos ZIP para extrair.")
+    logger.info(f" -> Encontrados {len(zip_files)} arquivos ZIP para extrair.")
     extracted_count = 0
-    for filename in tqdm(zip_files, desc="Extraindo arquivos ZIP"):
-        zip_path = raw_path / filename
+    with metrics.stage('extracao', bytes_entrada=0, bytes_saida=0) as stage_metrics:
+        for filename in tqdm(zip_files, desc="Extraindo arquivos ZIP"):
+            zip_path = raw_path / filename
+            try:
+                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                    for member in zip_ref.namelist():
+                        output_filename = texts_path / _member_txt_name(member)
+
+                        with zip_ref.open(member) as source, open(output_filename, 'wb') as target:
+                            shutil.copyfileobj(source, target)
+                        extracted_count += 1
+                        stage_metrics['bytes_saida'] += output_filename.stat().st_size
+                stage_metrics['bytes_entrada'] += zip_path.stat().st_size
+
+            except zipfile.BadZipFile:
+                logger.warning(f" -> AVISO: O arquivo '{filename}' não é um ZIP válido. Pulando.")
+            except Exception as e:
+                logger.error(f" -> ERRO ao extrair '{filename}': {e}")
+        stage_metrics['arquivos'] = extracted_count
+
+    logger.info(f" -> Total de {extracted_count} arquivos extraídos para a pasta 'texts'.")
+
+
+def _file_sha256(file_path: Path) -> str:
+    """Calcula o hash SHA-256 do conteúdo de um arquivo, lendo-o em blocos."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _open_source(file_path: Path, member: Optional[str]) -> Iterator[BinaryIO]:
+    """Abre um arquivo .txt, ou um membro de um ZIP, como fluxo binário."""
+    if member is None:
+        with open(file_path, 'rb') as f:
+            yield f
+    else:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref, zip_ref.open(member) as f:
+            yield f
+
+
+def _parse_file_to_fragment(file_path: Path, dataset_path: Path, fragment_name: str,
+                            member: Optional[str] = None, partition_cols: List[str] = None,
+                            compression_options: dict = None, reset_peak: bool = False) -> dict:
+    """
+    Converte um único arquivo COTAHIST em fragmentos Parquet, um por partição.
+
+    Executada dentro dos processos do pool: lê o arquivo em blocos de
+    `BATCH_SIZE` registros, de modo que a memória de cada worker fica limitada
+    ao tamanho do bloco, independentemente do tamanho do arquivo. Se `member`
+    for informado, `file_path` é um ZIP e o membro é descompactado em fluxo,
+    sem passar pelo disco. Cada bloco é dividido pelas colunas de partição e
+    gravado em 'dados_b3/ANO=.../<fragment_name>'. Os fragmentos são gravados
+    em arquivos temporários e só substituem os anteriores no final.
+    `compression_options` são os argumentos de compressão do ParquetWriter
+    (ver `storage.writer_compression_options`). Com `reset_peak` (só nos
+    processos do pool), o pico de memória é zerado antes da conversão e passa
+    a medir só este arquivo; no processo principal, zerá-lo apagaria o pico
+    da etapa 'ingestao'.
+
+    Returns:
+        dict: A entrada do manifesto para o arquivo (tamanho, mtime, hash,
+              caminhos relativos dos fragmentos e número de registros), com
+              as métricas da conversão em 'metricas' (retiradas antes de a
+              entrada ir para o manifesto).
+    """
+    partition_cols = partition_cols or DEFAULT_PARTITION_COLS
+    compression_options = compression_options or writer_compression_options()
+    if reset_peak:
+        metrics.reset_peak_rss()
+    start = time.perf_counter()
+    stat = file_path.stat()
+    rows = bytes_in = 0
+    writers = {}
+    try:
+        with _open_source(file_path, member) as f:
+            for chunk in iter_record_chunks(f, BATCH_SIZE * (RECORD_LENGTH + 2)):
+                bytes_in += len(chunk)
+                table = parse_cotahist_bytes(chunk)
+                for partition, part in split_by_partition(table, partition_cols):
+                    if partition not in writers:
+                        tmp_path = dataset_path / partition / f"_tmp_{fragment_name}"
+                        os.makedirs(tmp_path.parent, exist_ok=True)
+                        writers[partition] = (pq.ParquetWriter(tmp_path, part.schema, **compression_options), tmp_path)
+                    writers[partition][0].write_table(part)
+                rows += table.num_rows
+        for writer, _ in writers.values():
+            writer.close()
+    except BaseException:
+        for writer, tmp_path in writers.values():
+            writer.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    fragments = []
+    for partition, (_, tmp_path) in sorted(writers.items()):
+        os.replace(tmp_path, tmp_path.with_name(fragment_name))
+        fragments.append(f"{partition}/{fragment_name}")
+    parse_time = time.perf_counter() - start
+
+    return {
+        'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_sha256(file_path),
+        'fragments': fragments, 'rows': rows,
+        'metricas': {
+            'duracao_s': round(parse_time, 6), 'linhas': rows,
+            'linhas_por_s': round(rows / parse_time, 1) if parse_time > 0 else None,
+            'bytes_entrada': bytes_in,
+            'bytes_saida': sum((dataset_path / fragment).stat().st_size for fragment in fragments),
+            'pico_rss_bytes': metrics.peak_rss_bytes(), 'pid': os.getpid(),
+        },
+    }
+
+
+def _remove_fragments(dataset_path: Path, fragments: List[str]):
+    """Remove fragmentos do dataset e os diretórios de partição que ficarem vazios."""
+    for fragment in fragments:
+        fragment_path = dataset_path / fragment
+        fragment_path.unlink(missing_ok=True)
+        parent = fragment_path.parent
+        while parent != dataset_path and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+
+def _read_manifest(manifest_path: Path) -> dict:
+    """Lê o manifesto de ingestão bruto (vazio se ausente, inválido ou de outra versão)."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get('versao') != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def _load_manifest(manifest_path: Path, partition_cols: List[str]) -> dict:
+    """
+    Carrega as entradas do manifesto de ingestão.
+
+    O manifesto é descartado (forçando uma reconstrução completa) se for de
+    outra versão ou se o particionamento do dataset tiver mudado.
+    """
+    manifest = _read_manifest(manifest_path)
+    if manifest.get('particionamento') != partition_cols:
+        return {}
+    return manifest.get('arquivos', {})
+
+
+def _save_manifest(manifest_path: Path, entries: dict, partition_cols: List[str]):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    tmp_path = manifest_path.with_name(f"_tmp_{manifest_path.name}")
+    manifest = {'versao': MANIFEST_VERSION, 'particionamento': partition_cols, 'arquivos': dict(sorted(entries.items()))}
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _is_unchanged(file_path: Path, entry: Optional[dict], dataset_path: Path) -> bool:
+    """
+    Verifica se um arquivo de origem já está refletido no dataset.
+
+    Tamanho e mtime iguais bastam (caminho rápido, sem ler o arquivo). Se só o
+    mtime mudou, o hash do conteúdo decide; nesse caso a entrada é atualizada.
+    """
+    if entry is None:
+        return False
+    if not all((dataset_path / fragment).exists() for fragment in entry['fragments']):
+        return False
+    stat = file_path.stat()
+    if stat.st_size != entry['size']:
+        return False
+    if stat.st_mtime_ns == entry['mtime_ns']:
+        return True
+    if _file_sha256(file_path) == entry['sha256']:
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+    return False
+
+
+def _ingest_sources(sources: Dict[str, Tuple[Path, Optional[str]]], processed_path: Path,
+                    workers: int, full_rebuild: bool, partition_by: List[str] = None,
+                    compression: Union[str, Dict[str, str]] = DEFAULT_COMPRESSION,
+                    stage_metrics: Optional[dict] = None):
+    """
+    Sincroniza o dataset 'dados_b3' com um conjunto de arquivos de origem.
+
+    Cada origem é identificada por uma chave no manifesto e aponta para um
+    arquivo em disco (e, no caso de ZIPs, para o membro dentro dele). Apenas
+    origens novas ou modificadas são convertidas, e só os seus fragmentos são
+    gravados ou substituídos. Fragmentos de origens que deixaram de existir
+    são removidos.
+
+    Cada arquivo convertido gera um evento de métrica 'arquivo' (tempo de
+    conversão, linhas/s, bytes lidos e gravados, pico de memória do worker);
+    os totais vão para `stage_metrics`, o registro da etapa em andamento
+    (ver `metrics.stage`).
+
+    Returns:
+        dict: O resumo da sincronização: 'fragments' (fragmentos gravados
+              nesta execução, relativos a 'dados_b3'), 'removed' (origens
+              removidas) e 'rebuilt' (True se o dataset foi recriado do zero).
+              Serve para atualizar o dicionário de ativos de forma incremental.
+    """
+    DATASET_PATH = processed_path / DATASET_NAME
+    MANIFEST_PATH = processed_path / 'manifesto_ingestao.json'
+    LEGACY_PARQUET_PATH = processed_path / 'dados_b3.parquet'
+    partition_cols = normalize_partition_cols(partition_by)
+    compression_options = writer_compression_options(compression)
+    stage_metrics = stage_metrics if stage_metrics is not None else {}
+    stage_metrics.update({'arquivos': 0, 'arquivos_com_erro': 0, 'linhas': 0, 'bytes_entrada': 0, 'bytes_saida': 0})
+
+    if os.path.exists(LEGACY_PARQUET_PATH):
+        os.remove(LEGACY_PARQUET_PATH)
+        logger.info(f" -> Arquivo parquet antigo '{LEGACY_PARQUET_PATH}' removido (substituído pelo dataset '{DATASET_PATH}').")
+
+    entries = {} if full_rebuild else _load_manifest(MANIFEST_PATH, partition_cols)
+    summary = {'fragments': [], 'removed': [], 'rebuilt': not entries}
+    if not entries:
+        shutil.rmtree(DATASET_PATH, ignore_errors=True)
+    os.makedirs(DATASET_PATH, exist_ok=True)
+
+    # Remove os fragmentos de origens que deixaram de existir.
+    for key in sorted(set(entries) - set(sources)):
+        _remove_fragments(DATASET_PATH, entries.pop(key)['fragments'])
+        summary['removed'].append(key)
+        logger.info(f" -> '{key}' não existe mais na origem; fragmentos removidos.")
+
+    keys_to_process = [k for k in sorted(sources) if not _is_unchanged(sources[k][0], entries.get(k), DATASET_PATH)]
+
+    # Fragmentos compartilhados entre origens (gerados por `compact_dataset`) não podem
+    # ser substituídos isoladamente: todas as origens que os usam são reprocessadas.
+    pending = list(keys_to_process)
+    while pending:
+        fragments = set(entries.get(pending.pop(), {}).get('fragments', []))
+        for other, entry in entries.items():
+            if other not in keys_to_process and fragments & set(entry['fragments']):
+                keys_to_process.append(other)
+                pending.append(other)
+    keys_to_process.sort()
+
+    if not keys_to_process:
+        _save_manifest(MANIFEST_PATH, entries, partition_cols)
+        logger.info(f" -> Dataset atualizado: nenhum arquivo novo ou modificado entre os {len(sources)} de origem.")
+        return summary
+
+    logger.info(f" -> {len(keys_to_process)} de {len(sources)} arquivos de origem são novos ou foram modificados.")
+    logger.info(f" -> Particionamento do dataset: {' / '.join(partition_cols)}.")
+
+    jobs = {}
+    for key in keys_to_process:
+        file_path, member = sources[key]
+        txt_name = _member_txt_name(member) if member else file_path.name
+        jobs[key] = (file_path, DATASET_PATH, f"{Path(txt_name).stem}.parquet", member, partition_cols,
+                     compression_options)
+    processed_rows = 0
+
+    def _register(key, entry):
+        file_metrics = entry.pop('metricas')
+        metrics.emit('arquivo', origem=key, status='ok', **file_metrics)
+        stage_metrics['arquivos'] += 1
+        for field in ('linhas', 'bytes_entrada', 'bytes_saida'):
+            stage_metrics[field] += file_metrics[field]
+        stage_metrics['pico_rss_workers_bytes'] = max(
+            stage_metrics.get('pico_rss_workers_bytes') or 0, file_metrics['pico_rss_bytes'] or 0)
+        # Fragmentos da versão anterior que não foram sobrescritos ficaram obsoletos.
+        previous = entries.get(key)
+        if previous:
+            _remove_fragments(DATASET_PATH, sorted(set(previous['fragments']) - set(entry['fragments'])))
+        entries[key] = entry
+        summary['fragments'].extend(entry['fragments'])
+        return entry['rows']
+
+    def _failed(key, error):
+        logger.error(f" -> ERRO CRÍTICO ao processar '{key}': {error}. Pulando.")
+        metrics.emit('arquivo', origem=key, status='erro', erro=f'{type(error).__name__}: {error}')
+        stage_metrics['arquivos_com_erro'] += 1
+
+    if workers > 1:
+        logger.info(f" -> Convertendo com {workers} processos em paralelo.")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_parse_file_to_fragment, *args, reset_peak=True): key for key, args in jobs.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processando Arquivos"):
+                key = futures[future]
+                try:
+                    processed_rows += _register(key, future.result())
+                except Exception as e:
+                    _failed(key, e)
+    else:
+        for key in tqdm(keys_to_process, desc="Processando Arquivos"):
+            try:
+                processed_rows += _register(key, _parse_file_to_fragment(*jobs[key]))
+            except Exception as e:
+                _failed(key, e)
+
+    _save_manifest(MANIFEST_PATH, entries, partition_cols)
+
+    if processed_rows:
+        total_rows = sum(entry['rows'] for entry in entries.values())
+        logger.info(f" -> [SUCESSO] {processed_rows:,} registros gravados; o dataset '{DATASET_PATH}' tem {total_rows:,} registros.")
+    else:
+        logger.info(" -> Nenhum dado foi processado para o dataset Parquet.")
+    summary['fragments'].sort()
+    return summary
+
+
+def process_text_to_parquet(texts_path: Path, processed_path: Path, workers: int = 1, full_rebuild: bool = False,
+                            partition_by: List[str] = None,
+                            compression: Union[str, Dict[str, str]] = DEFAULT_COMPRESSION):
+    """
+    Processa arquivos de texto e os consolida no dataset Parquet 'dados_b3'.
+
+    O dataset é um diretório particionado no estilo hive por ano de pregão
+    ('dados_b3/ANO=2023/...') e, opcionalmente, por CODBDI e/ou TPMERC. Cada
+    arquivo de origem gera um fragmento Parquet em cada partição que ocupa.
+    Um manifesto ('manifesto_ingestao.json') registra, para cada arquivo .txt,
+    nome, tamanho, mtime e hash do conteúdo. Apenas arquivos novos ou
+    modificados são convertidos (em paralelo, quando `workers > 1`), e só os
+    seus fragmentos são gravados ou substituídos. Fragmentos de arquivos que
+    não existem mais em 'texts' são removidos.
+
+    Args:
+        texts_path (Path): Diretório com os arquivos COTAHIST em .txt.
+        processed_path (Path): Diretório onde o dataset 'dados_b3' é mantido.
+        workers (int): Número de processos usados na conversão. Com 1, tudo
+                       roda no processo atual.
+        full_rebuild (bool): Se True, ignora o manifesto e reconstrói o
+                             dataset inteiro.
+        partition_by (List[str], optional): Colunas de partição adicionais ao
+            ano ('CODBDI' e/ou 'TPMERC'). Mudar o particionamento reconstrói
+            o dataset.
+        compression (Union[str, Dict[str, str]]): Codec e nível dos novos
+            fragmentos, para todas as colunas ('zstd:19', 'lz4', presets
+            'quente'/'frio') ou por coluna ({'*': 'frio', 'CODNEG': 'lz4'}).
+            Fragmentos já existentes não são regravados.
+
+    Returns:
+        Optional[dict]: O resumo da sincronização (ver `_ingest_sources`), ou
+                        None se não houver arquivos de origem.
+    """
+    logger.info("--- Etapa 2: Processando arquivos TXT para Parquet ---")
+    files_available = sorted([f for f in os.listdir(texts_path) if f.lower().endswith('.txt')])
+    if not files_available:
+        logger.info(" -> Nenhum arquivo .txt encontrado em data/texts para processar.")
+        return
+
+    sources = {filename: (texts_path / filename, None) for filename in files_available}
+    with metrics.stage('ingestao', modo='txt', workers=workers) as stage_metrics:
+        return _ingest_sources(sources, processed_path, workers, full_rebuild, partition_by, compression,
+                               stage_metrics)
+
+
+def process_zip_to_parquet(raw_path: Path, processed_path: Path, workers: int = 1, full_rebuild: bool = False,
+                           partition_by: List[str] = None,
+                           compression: Union[str, Dict[str, str]] = DEFAULT_COMPRESSION):
+    """
+    Processa os arquivos .zip da B3 diretamente, sem extraí-los para 'texts'.
+
+    Cada membro de cada ZIP é descompactado em fluxo, em blocos de tamanho
+    fixo cortados em fim de registro, e os blocos vão direto para o parser.
+    Assim, a memória usada fica constante qualquer que seja o tamanho do
+    arquivo e não há cópia intermediária em disco. O manifesto de ingestão
+    registra tamanho, mtime e hash do ZIP de cada membro, com a mesma lógica
+    incremental de `process_text_to_parquet`.
+
+    Args:
+        raw_path (Path): Diretório com os arquivos COTAHIST em .zip.
+        processed_path (Path): Diretório onde o dataset 'dados_b3' é mantido.
+        workers (int): Número de processos usados na conversão.
+        full_rebuild (bool): Se True, ignora o manifesto e reconstrói o
+                             dataset inteiro.
+        partition_by (List[str], optional): Colunas de partição adicionais ao
+            ano ('CODBDI' e/ou 'TPMERC').
+        compression (Union[str, Dict[str, str]]): Codec e nível dos novos
+            fragmentos (ver `process_text_to_parquet`).
+
+    Returns:
+        Optional[dict]: O resumo da sincronização (ver `_ingest_sources`), ou
+                        None se não houver arquivos de origem.
+    """
+    logger.info("--- Etapa 1+2: Processando arquivos ZIP para Parquet (em fluxo) ---")
+    zip_files = sorted([f for f in os.listdir(raw_path) if f.lower().endswith('.zip')])
+    if not zip_files:
+        logger.info(" -> Nenhum arquivo .zip encontrado em data/raw para processar.")
+        return
+
+    sources = {}
+    for filename in zip_files:
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            with zipfile.ZipFile(raw_path / filename, 'r') as zip_ref:
                 for member in zip_ref.namelist():
-                    base_name = os.path.basename(member)
-                    
-                    # --- LÓGICA ORIGINAL DO NOTEBOOK RESTAURADA ---
-                    # Garante que arquivos sem extensão recebam .TXT
-                    if not base_name.lower().endswith('.txt'):
-                        output_filename = texts_path / (base_name + '.TXT')
-                    else:
-                        output_filename = texts_path / base_name
-                    # --- FIM DA LÓGICA RESTAURADA ---
-
-                    with zip_ref.open(member) as source, open(output_filename, 'wb') as target:
-                        shutil.copyfileobj(source, target)
-                    extracted_count += 1
-
+                    if member.endswith('/'): continue
+                    sources[f"{filename}/{member}"] = (raw_path / filename, member)
         except zipfile.BadZipFile:
-            print(f" -> AVISO: O arquivo '{filename}' não é um ZIP válido. Pulando.")
-        except Exception as e:
-            print(f" -> ERRO ao extrair '{filename}': {e}")
-            
-    print(f" -> Total de {extracted_count} arquivos extraídos para a pasta 'texts'.")
+            logger.warning(f" -> AVISO: O arquivo '{filename}' não é um ZIP válido. Pulando.")
+
+    with metrics.stage('ingestao', modo='zip', workers=workers) as stage_metrics:
+        return _ingest_sources(sources, processed_path, workers, full_rebuild, partition_by, compression,
+                               stage_metrics)
+
+
+def _sort_ranges(dataset: ds.Dataset, key: str, max_rows: int) -> List[Optional[ds.Expression]]:
+    """
+    (Helper Interno) Divide as linhas de `dataset` em intervalos consecutivos de `key` com até ~`max_rows` linhas.
+
+    Lê apenas a coluna `key`. Um mesmo valor nunca é dividido entre dois
+    intervalos, e os nulos ficam no último (como em `sort_by`).
+
+    Returns:
+        List[Optional[ds.Expression]]: Os filtros dos intervalos, em ordem
+            crescente de `key` ([None] se a partição cabe em um só).
+    """
+    if dataset.count_rows() <= max_rows:
+        return [None]
+    counts = pc.value_counts(dataset.to_table(columns=[key])[key].drop_null())
+    values, sizes = counts.field('values'), counts.field('counts')
+    order = pc.sort_indices(values)
+    values, sizes = values.take(order).to_pylist(), sizes.take(order).to_numpy()
+
+    bounds, rows = [], 0
+    for value, size in zip(values, sizes):
+        if rows and rows + size > max_rows:
+            bounds.append(value)
+            rows = 0
+        rows += size
+    if not bounds:
+        return [None]
+    field = ds.field(key)
+    ranges = [field < bounds[0]]
+    ranges += [(field >= low) & (field < high) for low, high in zip(bounds, bounds[1:])]
+    ranges.append((field >= bounds[-1]) | field.is_null())
+    return ranges
 
 
-def process_text_to_parquet(texts_path: Path, processed_path: Path):
+def compact_dataset(processed_path: Path, sort_by: str = 'CODNEG', row_group_size: int = COMPACT_ROW_GROUP_SIZE,
+                    data_page_size: int = COMPACT_DATA_PAGE_SIZE,
+                    compression: Union[str, Dict[str, str]] = DEFAULT_COMPRESSION,
+                    sort_rows: int = COMPACT_SORT_ROWS):
     """
-    Processa arquivos de texto e consolida em um único Parquet otimizado.
+    Reescreve cada partição do dataset em um único arquivo ordenado.
+
+    A ingestão grava as linhas na ordem dos arquivos COTAHIST, de modo que as
+    estatísticas (min/max) de CODNEG e CODISI de cada grupo de linhas cobrem
+    quase todo o alfabeto e não permitem descartar nada em consultas por
+    ticker. Esta etapa opcional ordena cada partição pela chave escolhida e
+    grava grupos de linhas e páginas menores, com page index, para que uma
+    consulta de um único ticker leia apenas alguns grupos de linhas.
+
+    A partição é ordenada em pedaços: intervalos consecutivos da primeira
+    chave (CODNEG ou CODISI) com até `sort_rows` linhas, lidos, ordenados e
+    gravados um de cada vez. A memória fica limitada ao tamanho do pedaço
+    (e não ao da partição, que sem `--partition-by` é um ano de todos os
+    mercados), ao custo de uma leitura da partição por pedaço.
+
+    O manifesto de ingestão é atualizado: todas as origens de uma partição
+    passam a apontar para o arquivo compactado. Se uma delas mudar depois,
+    a ingestão incremental reprocessa todas as origens que o compartilham.
+    A troca é segura contra interrupções: o arquivo compactado substitui o
+    temporário, o manifesto é gravado e só então os fragmentos antigos são
+    apagados. A origem de cada partição são os fragmentos do manifesto, de
+    modo que restos de uma compactação interrompida (o temporário ou
+    fragmentos já substituídos) não são lidos de novo, e sim removidos.
+
+    Args:
+        processed_path (Path): Diretório onde o dataset 'dados_b3' é mantido.
+        sort_by (str): 'CODNEG' ordena por (CODNEG, DATA_PREGAO); 'CODISI'
+                       agrupa por ativo, ordenando por (CODISI, CODNEG, DATA_PREGAO).
+        row_group_size (int): Número máximo de linhas por grupo de linhas.
+        data_page_size (int): Tamanho alvo, em bytes, das páginas de dados.
+        compression (Union[str, Dict[str, str]]): Codec e nível dos arquivos
+            compactados (ver `process_text_to_parquet`).
+        sort_rows (int): Linhas ordenadas de uma vez (ver acima).
     """
-    print("\n--- Etapa 2: Processando arquivos TXT para Parquet ---")
-    os.makedirs(processed_path, exist_ok=True)
-    
-    files_to_process = sorted([f for f in os.listdir(texts_path) if f.lower().endswith('.txt')])
-    if not files_to_process:
-        print(" -> Nenhum arquivo .txt encontrado em data/texts para processar.")
+    logger.info("--- Compactando o dataset (ordenação por partição) ---")
+    DATASET_PATH = processed_path / DATASET_NAME
+    MANIFEST_PATH = processed_path / 'manifesto_ingestao.json'
+
+    sort_by = sort_by.upper()
+    if sort_by not in COMPACT_SORT_KEYS:
+        raise ValueError(f"Chave de ordenação inválida: '{sort_by}'. Opções: {list(COMPACT_SORT_KEYS)}")
+    sort_keys = [(col, 'ascending') for col in COMPACT_SORT_KEYS[sort_by]]
+    compression_options = writer_compression_options(compression)
+
+    manifest = _read_manifest(MANIFEST_PATH)
+    entries = manifest.get('arquivos', {})
+    if not entries:
+        logger.warning(" -> Manifesto de ingestão não encontrado ou vazio. Execute a ingestão antes de compactar.")
         return
 
-    print(f" -> Encontrados {len(files_to_process)} arquivos de texto para consolidar.")
-    
-    FINAL_PARQUET_PATH = processed_path / 'dados_b3.parquet'
-    BATCH_SIZE = 500_000
-    writer = None
-    final_schema = None
+    partitions = sorted({str(Path(fragment).parent) for entry in entries.values() for fragment in entry['fragments']})
+    with metrics.stage('compactacao', ordenacao=sort_by, particoes=len(partitions),
+                       linhas=0, bytes_entrada=0, bytes_saida=0) as stage_metrics:
+        for partition in tqdm(partitions, desc="Compactando Partições"):
+            partition_path = DATASET_PATH / partition
+            listed = {Path(f).name for entry in entries.values() for f in entry['fragments']
+                      if str(Path(f).parent) == partition}
+            files = sorted(partition_path / name for name in listed if (partition_path / name).exists())
+            if not files: continue
 
-    if os.path.exists(FINAL_PARQUET_PATH):
-        os.remove(FINAL_PARQUET_PATH)
-        print(f" -> Arquivo parquet antigo '{FINAL_PARQUET_PATH}' removido.")
+            stage_metrics['bytes_entrada'] += sum(file_path.stat().st_size for file_path in files)
+            source = ds.dataset(files, format='parquet')
+            tmp_path = partition_path / f"_tmp_{COMPACTED_FRAGMENT_NAME}"
+            writer = pq.ParquetWriter(
+                tmp_path, source.schema, **compression_options,
+                data_page_size=data_page_size, write_page_index=True,
+                sorting_columns=pq.SortingColumn.from_ordering(source.schema, sort_keys),
+            )
+            try:
+                for expression in _sort_ranges(source, sort_keys[0][0], sort_rows):
+                    table = source.to_table(filter=expression).sort_by(sort_keys)
+                    writer.write_table(table, row_group_size=row_group_size)
+                    stage_metrics['linhas'] += table.num_rows
+                    del table
+                writer.close()
+            except BaseException:
+                writer.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+            os.replace(tmp_path, partition_path / COMPACTED_FRAGMENT_NAME)
+            stage_metrics['bytes_saida'] += (partition_path / COMPACTED_FRAGMENT_NAME).stat().st_size
 
-    for filename in tqdm(files_to_process, desc="Processando Arquivos"):
-        file_path = texts_path / filename
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                lines = f.readlines()
-
-            content_lines = lines[1:-1]
-            if not content_lines: continue
-
-            for i in range(0, len(content_lines), BATCH_SIZE):
-                batch_lines = content_lines[i:i + BATCH_SIZE]
-                data_io = StringIO("".join(batch_lines))
-                
-                df_batch = pd.read_fwf(data_io, colspecs=COLSPECS, names=NAMES, header=None)
-                if df_batch.empty: continue
-
-                # Limpeza e conversão de tipos
-                for col in df_batch.select_dtypes(['object']).columns:
-                    df_batch[col] = df_batch[col].str.strip()
-                for col in DATE_COLS:
-                    df_batch[col] = pd.to_datetime(df_batch[col], format='%Y%m%d', errors='coerce')
-                for col in PRICE_COLS:
-                    df_batch[col] = pd.to_numeric(df_batch[col], errors='coerce') / 100
-                for col in INT_COLS:
-                    df_batch[col] = pd.to_numeric(df_batch[col], errors='coerce').astype('Int64')
-
-                table = pa.Table.from_pandas(df_batch, preserve_index=False)
-                
-                if writer is None:
-                    final_schema = table.schema
-                    writer = pq.ParquetWriter(FINAL_PARQUET_PATH, final_schema, compression='snappy')
-                
-                table = table.cast(final_schema)
-                writer.write_table(table)
-        except Exception as e:
-            print(f" -> ERRO CRÍTICO ao processar '{filename}': {e}. Pulando.")
-        
-        gc.collect()
+            compacted = f"{partition}/{COMPACTED_FRAGMENT_NAME}"
+            for entry in entries.values():
+                fragments = [compacted if str(Path(f).parent) == partition else f for f in entry['fragments']]
+                entry['fragments'] = sorted(set(fragments))
+            _save_manifest(MANIFEST_PATH, entries, manifest['particionamento'])
+            # Só com o manifesto já apontando para o arquivo compactado os antigos podem sair;
+            # fragmentos fora do manifesto são restos de uma compactação interrompida.
+            for file_path in partition_path.glob('*.parquet'):
+                if file_path.name != COMPACTED_FRAGMENT_NAME and not file_path.name.startswith(('_', '.')):
+                    file_path.unlink()
 
-    if writer:
-        writer.close()
-        print(f"\n -> [SUCESSO] Todos os arquivos foram consolidados em: {FINAL_PARQUET_PATH}")
-    else:
-        print("\n -> Nenhum dado foi processado para o arquivo Parquet.")
\ No newline at end of file
+    logger.info(f" -> [SUCESSO] {len(partitions)} partições compactadas (ordenação por {', '.join(COMPACT_SORT_KEYS[sort_by])}).")
@@ -0,0 +1,159 @@
+# src/b3_analyzer/scan.py
+#
+# Leitura paralela do dataset e controle de admissão das consultas. Uma
+# leitura é dividida em tarefas de grupos de linhas (os que sobrevivem às
+# estatísticas do Parquet), executadas em um pool de threads limitado e
+# compartilhado por todas as consultas; o orçamento de memória limita os
+# bytes que as consultas em andamento podem ocupar ao mesmo tempo.
+
+import math
+import time
+import threading
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Tarefas por thread do pool em uma leitura: o bastante para equilibrar
+# grupos de tamanhos diferentes sem multiplicar o custo fixo de cada tarefa.
+TASKS_PER_WORKER = 4
+
+
+class ScanTask:
+    """
+    Um pedaço de uma leitura: grupos de linhas consecutivos de um fragmento.
+
+    Args:
+        fragment (ds.ParquetFileFragment): O fragmento (arquivo) de origem.
+        row_groups (List[int]): Os grupos de linhas a ler.
+        num_rows (int): As linhas desses grupos (antes do filtro).
+        nbytes (int): O tamanho descomprimido das colunas lidas nesses grupos.
+    """
+    def __init__(self, fragment: ds.ParquetFileFragment, row_groups: List[int], num_rows: int, nbytes: int):
+        self.fragment = fragment
+        self.row_groups = row_groups
+        self.num_rows = num_rows
+        self.nbytes = nbytes
+
+    def read(self, schema: pa.Schema, columns: List[str], expression: Optional[ds.Expression]) -> pa.Table:
+        """Lê os grupos de linhas da tarefa (em uma única thread; o paralelismo vem do pool)."""
+        piece = self.fragment.subset(row_group_ids=self.row_groups)
+        return piece.to_table(schema=schema, columns=columns, filter=expression, use_threads=False)
+
+
+def plan_scan(dataset: ds.Dataset, expression: Optional[ds.Expression], columns: List[str],
+              workers: int) -> List[ScanTask]:
+    """
+    Divide a leitura de `dataset` em tarefas para um pool de `workers` threads.
+
+    As partições e os grupos de linhas descartados pela expressão (mín./máx.
+    de cada coluna) ficam de fora, como na leitura do próprio Arrow. Os
+    grupos restantes são agrupados, sem misturar arquivos, em até cerca de
+    `TASKS_PER_WORKER` x `workers` tarefas de tamanhos parecidos.
+
+    Returns:
+        List[ScanTask]: As tarefas, na ordem dos fragmentos e dos grupos de linhas.
+    """
+    groups = []
+    for fragment in dataset.get_fragments(filter=expression):
+        metadata = fragment.metadata
+        names = metadata.schema.names
+        positions = [names.index(col) for col in columns if col in names]
+        # A expressão usa as colunas de partição, que só existem no schema do dataset.
+        pieces = fragment.split_by_row_group(expression, schema=dataset.schema) if expression is not None \
+            else [fragment]
+        for piece in pieces:
+            for row_group in piece.row_groups:
+                group = metadata.row_group(row_group.id)
+                nbytes = sum(group.column(i).total_uncompressed_size for i in positions)
+                groups.append((fragment, row_group.id, row_group.num_rows, nbytes))
+
+    target_rows = max(1, math.ceil(sum(g[2] for g in groups) / max(1, workers * TASKS_PER_WORKER)))
+    tasks = []
+    for fragment, row_group, num_rows, nbytes in groups:
+        last = tasks[-1] if tasks else None
+        if last is not None and last.fragment is fragment and last.num_rows + num_rows <= target_rows:
+            last.row_groups.append(row_group)
+            last.num_rows += num_rows
+            last.nbytes += nbytes
+        else:
+            tasks.append(ScanTask(fragment, [row_group], num_rows, nbytes))
+    return tasks
+
+
+def read_tasks(executor: Executor, tasks: List[ScanTask], schema: pa.Schema, columns: List[str],
+               expression: Optional[ds.Expression]) -> pa.Table:
+    """
+    Lê as tarefas de `plan_scan` no pool e junta os resultados na ordem das tarefas.
+
+    O resultado tem as mesmas linhas, na mesma ordem, que
+    `dataset.to_table(columns=columns, filter=expression)`.
+    """
+    futures = [executor.submit(task.read, schema, columns, expression) for task in tasks]
+    return pa.concat_tables([future.result() for future in futures])
+
+
+class MemoryBudget:
+    """
+    Controle de admissão: limita os bytes reservados pelas consultas em andamento.
+
+    Cada consulta reserva a sua estimativa de memória antes de ler e a
+    devolve ao terminar; se a reserva não couber no que resta do orçamento,
+    a consulta espera (na ordem de chegada) até que outras terminem. Uma
+    consulta maior que o orçamento inteiro é admitida sozinha, com a reserva
+    limitada ao orçamento. Seguro entre threads.
+
+    Args:
+        max_bytes (int): O orçamento, em bytes.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._queue = []
+        self.admitted = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.peak_bytes = 0
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[float]:
+        """
+        Reserva `nbytes` durante o bloco, esperando se preciso.
+
+        Yields:
+            float: Os segundos de espera pela admissão.
+        """
+        nbytes = min(max(int(nbytes), 0), self.max_bytes)
+        ticket = object()
+        start = time.perf_counter()
+        with self._condition:
+            self._queue.append(ticket)
+            while self._queue[0] is not ticket or (self._in_use and self._in_use + nbytes > self.max_bytes):
+                self._condition.wait()
+            self._queue.pop(0)
+            self._in_use += nbytes
+            waited = time.perf_counter() - start
+            self.admitted += 1
+            self.waited += waited > 0.001
+            self.wait_seconds += waited
+            self.peak_bytes = max(self.peak_bytes, self._in_use)
+            # O próximo da fila pode caber no que sobrou.
+            self._condition.notify_all()
+        try:
+            yield waited
+        finally:
+            with self._condition:
+                self._in_use -= nbytes
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """Consultas admitidas e que esperaram, segundos de espera, bytes reservados agora e no pico."""
+        with self._condition:
+            return {
+                'admitted': self.admitted, 'waited': self.waited, 'wait_seconds': self.wait_seconds,
+                'bytes': self._in_use, 'peak_bytes': self.peak_bytes, 'max_bytes': self.max_bytes,
+                'queued': len(self._queue),
+            }
@@ -0,0 +1,380 @@
+# src/b3_analyzer/storage.py
+#
+# Layout físico do dataset 'dados_b3': schema de armazenamento compacto,
+# compressão por coluna, particionamento hive (por ano e, opcionalmente, por
+# CODBDI/TPMERC) e abertura do dataset via pyarrow.dataset.
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+DATASET_NAME = 'dados_b3'
+
+# --- Schema de Armazenamento ---
+# Textos codificados em dicionário, códigos em inteiros estreitos, datas em
+# date32 e preços em ponto fixo (int64 em centavos). A escala de cada coluna
+# de preço fica registrada nos metadados do campo ('escala').
+#
+# CODNEG e CODISI ficam como string no schema Arrow: no disco o Parquet já os
+# grava com páginas de dicionário, e o pyarrow.dataset só usa as estatísticas
+# (min/max) dos grupos de linhas para descartá-los em colunas não-dicionário.
+# Na leitura, `decode_storage_table` pode recodificá-los em dicionário.
+PRICE_SCALE = 100
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+_PRICE_METADATA = {'escala': str(PRICE_SCALE)}
+STORAGE_SCHEMA = pa.schema([
+    pa.field('TIPREG', pa.int8()),
+    pa.field('DATA_PREGAO', pa.date32()),
+    pa.field('CODBDI', pa.int8()),
+    pa.field('CODNEG', pa.string()),
+    pa.field('TPMERC', pa.int16()),
+    pa.field('NOMRES', _DICT_STRING),
+    pa.field('ESPECI', _DICT_STRING),
+    pa.field('PRAZOT', pa.int16()),
+    pa.field('MODREF', _DICT_STRING),
+    pa.field('PREABE', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREMAX', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREMIN', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREMED', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREULT', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREOFC', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREOFV', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('TOTNEG', pa.int32()),
+    pa.field('QUATOT', pa.int64()),
+    pa.field('VOLTOT', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('PREEXE', pa.int64(), metadata=_PRICE_METADATA),
+    pa.field('INDOPC', pa.int8()),
+    pa.field('DATVEN', pa.date32()),
+    pa.field('FATCOT', pa.int32()),
+    pa.field('PTOEXE', pa.int64()),
+    pa.field('CODISI', pa.string()),
+    pa.field('DISMES', pa.int16()),
+])
+
+# Tipos pandas (anuláveis) usados ao converter colunas inteiras para o usuário.
+PANDAS_INT_TYPES = {
+    pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+}
+
+# Colunas que podem ser usadas como chave de partição e seus tipos no dataset.
+# 'ANO' é derivada de DATA_PREGAO e está sempre presente; as demais são opcionais.
+PARTITION_TYPES = {'ANO': pa.int16(), 'CODBDI': pa.int8(), 'TPMERC': pa.int16()}
+DEFAULT_PARTITION_COLS = ['ANO']
+HIVE_NULL_FALLBACK = '__HIVE_DEFAULT_PARTITION__'
+
+# --- Compressão ---
+# Uma especificação de compressão é 'codec' ou 'codec:nível' (ex: 'zstd:19'),
+# ou o nome de um preset. 'quente' favorece a latência de leitura (combina com
+# memory map); 'frio' favorece o tamanho em disco, para o arquivo histórico.
+DEFAULT_COMPRESSION = 'snappy'
+COMPRESSION_PRESETS = {
+    'padrao': 'snappy',
+    'quente': 'lz4',
+    'frio': 'zstd:19',
+    'nenhuma': 'none',
+}
+COMPRESSION_CODECS = ['none', 'snappy', 'lz4', 'zstd', 'gzip', 'brotli']
+
+
+def normalize_partition_cols(extra_cols: List[str] = None) -> List[str]:
+    """Retorna a lista de colunas de partição: 'ANO' seguida das opcionais."""
+    extra_cols = [c.upper() for c in (extra_cols or []) if c.upper() != 'ANO']
+    invalid = [c for c in extra_cols if c not in PARTITION_TYPES]
+    if invalid:
+        raise ValueError(f"Colunas de partição inválidas: {invalid}. Opções: {list(PARTITION_TYPES)}")
+    return DEFAULT_PARTITION_COLS + extra_cols
+
+
+def split_by_partition(table: pa.Table, partition_cols: List[str]) -> Iterator[Tuple[str, pa.Table]]:
+    """
+    Divide uma tabela nas partições hive definidas por `partition_cols`.
+
+    A ordem original das linhas é preservada dentro de cada partição. As
+    colunas de partição são removidas das tabelas retornadas, pois seus
+    valores ficam codificados no caminho (ex: 'ANO=2023/CODBDI=2').
+
+    Yields:
+        Tuple[str, pa.Table]: O caminho relativo da partição e suas linhas.
+    """
+    if table.num_rows == 0:
+        return
+
+    keys = {}
+    codes = np.zeros(table.num_rows, dtype=np.int64)
+    for col in partition_cols:
+        if col == 'ANO':
+            key = pc.year(table['DATA_PREGAO']).cast(PARTITION_TYPES['ANO'])
+        else:
+            key = table[col]
+        encoded = key.combine_chunks().dictionary_encode(null_encoding='encode')
+        codes = codes * len(encoded.dictionary) + encoded.indices.to_numpy(zero_copy_only=False)
+        keys[col] = key
+
+    _, first_rows, inverse, counts = np.unique(codes, return_index=True, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind='stable')
+    data = table.drop_columns([c for c in partition_cols if c in table.column_names])
+
+    start = 0
+    for group, count in enumerate(counts):
+        first_row = first_rows[group]
+        parts = []
+        for col in partition_cols:
+            value = keys[col][first_row].as_py()
+            parts.append(f"{col}={HIVE_NULL_FALLBACK if value is None else value}")
+        yield '/'.join(parts), data.take(order[start:start + count])
+        start += count
+
+
+def parse_compression_spec(spec: str) -> Tuple[str, Optional[int]]:
+    """
+    Interpreta uma especificação de compressão ('zstd:19', 'lz4', 'frio'...).
+
+    Returns:
+        Tuple[str, Optional[int]]: O codec e o nível (None se não informado).
+    """
+    spec = str(spec).strip().lower()
+    codec, _, level = COMPRESSION_PRESETS.get(spec, spec).partition(':')
+    if codec not in COMPRESSION_CODECS or (codec != 'none' and not pa.Codec.is_available(codec)):
+        raise ValueError(f"Codec de compressão inválido ou indisponível: '{codec}'. Opções: {COMPRESSION_CODECS}")
+    if not level:
+        return codec, None
+    if codec == 'none' or not pa.Codec.supports_compression_level(codec):
+        raise ValueError(f"O codec '{codec}' não aceita nível de compressão.")
+    try:
+        level = int(level)
+    except ValueError:
+        raise ValueError(f"Nível de compressão inválido: '{level}'.") from None
+    min_level, max_level = pa.Codec.minimum_compression_level(codec), pa.Codec.maximum_compression_level(codec)
+    if not min_level <= level <= max_level:
+        raise ValueError(f"Nível de compressão fora do intervalo para '{codec}': {level} (de {min_level} a {max_level}).")
+    return codec, level
+
+
+def writer_compression_options(compression: Union[str, Dict[str, str]] = DEFAULT_COMPRESSION) -> dict:
+    """
+    Traduz uma configuração de compressão para os argumentos do ParquetWriter.
+
+    Args:
+        compression (Union[str, Dict[str, str]]): Uma especificação aplicada a
+            todas as colunas, ou um dicionário {coluna: especificação}, em que
+            a chave '*' define o padrão das colunas não listadas
+            (ex: {'*': 'frio', 'CODNEG': 'lz4'}).
+
+    Returns:
+        dict: Os argumentos `compression` e `compression_level`, por coluna.
+    """
+    if not isinstance(compression, dict):
+        compression = {'*': compression}
+    compression = {(col if col == '*' else col.upper()): spec for col, spec in compression.items()}
+    unknown = [col for col in compression if col != '*' and col not in STORAGE_SCHEMA.names]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas na configuração de compressão: {unknown}.")
+
+    default = parse_compression_spec(compression.get('*', DEFAULT_COMPRESSION))
+    codecs, levels = {}, {}
+    for name in STORAGE_SCHEMA.names:
+        codec, level = parse_compression_spec(compression[name]) if name in compression else default
+        codecs[name] = codec
+        if level is not None:
+            levels[name] = level
+    return {'compression': codecs, 'compression_level': levels or None}
+
+
+def discover_partition_fields(dataset_path: Path) -> List[str]:
+    """
+    Descobre as colunas de partição de um dataset hive a partir dos diretórios.
+
+    Basta descer pelo primeiro caminho (ex: 'ANO=2023/CODBDI=2/'), sem abrir
+    nenhum arquivo Parquet.
+    """
+    fields = []
+    current = Path(dataset_path)
+    while current.is_dir():
+        subdirs = sorted(
+            entry.name for entry in os.scandir(current)
+            if entry.is_dir() and '=' in entry.name and not entry.name.startswith(('_', '.'))
+        )
+        if not subdirs:
+            break
+        fields.append(subdirs[0].split('=', 1)[0])
+        current = current / subdirs[0]
+    return fields
+
+
+def open_dataset(dataset_path: Path, memory_map: bool = False) -> ds.Dataset:
+    """
+    Abre o dataset 'dados_b3' (ou um arquivo Parquet único) com pyarrow.dataset.
+
+    Quando o dataset é particionado, as colunas de partição são expostas com os
+    tipos de `PARTITION_TYPES`, e filtros sobre elas descartam diretórios
+    inteiros antes que qualquer arquivo seja aberto.
+
+    Args:
+        dataset_path (Path): O diretório do dataset ou o arquivo Parquet único.
+        memory_map (bool): Se True, os arquivos são lidos via memory map, sem
+                           cópias para buffers intermediários. Indicado para a
+                           camada quente (lz4 ou sem compressão).
+    """
+    dataset_path = Path(dataset_path)
+    filesystem = pafs.LocalFileSystem(use_mmap=memory_map)
+    if dataset_path.is_file():
+        return ds.dataset(str(dataset_path), format='parquet', filesystem=filesystem)
+
+    fields = discover_partition_fields(dataset_path)
+    partitioning = None
+    if fields:
+        schema = pa.schema([(f, PARTITION_TYPES.get(f, pa.string())) for f in fields])
+        partitioning = ds.partitioning(schema, flavor='hive')
+    return ds.dataset(str(dataset_path), format='parquet', partitioning=partitioning, filesystem=filesystem)
+
+
+def decode_storage_table(table: pa.Table, dictionary: bool = False) -> pa.Table:
+    """
+    Converte uma tabela no schema de armazenamento para os tipos de consulta.
+
+    Preços em ponto fixo (campos com metadado 'escala') viram float64 e datas
+    date32 viram timestamp[ns]. Colunas já em outro formato (ex: o arquivo
+    único do layout antigo) são mantidas.
+
+    Args:
+        table (pa.Table): Tabela lida do dataset 'dados_b3'.
+        dictionary (bool): Se True, todas as colunas de texto saem codificadas
+                           em dicionário (viram `pd.Categorical` no pandas);
+                           se False, saem como string.
+    """
+    arrays, fields = [], []
+    for field, column in zip(table.schema, table.columns):
+        scale = (field.metadata or {}).get(b'escala')
+        if scale is not None and pa.types.is_integer(field.type):
+            column = pc.divide(column.cast(pa.float64()), float(scale))
+            field = pa.field(field.name, pa.float64())
+        elif pa.types.is_date32(field.type):
+            column = column.cast(pa.timestamp('ns'))
+            field = pa.field(field.name, pa.timestamp('ns'))
+        elif pa.types.is_dictionary(field.type) and not dictionary:
+            column = column.cast(field.type.value_type)
+            field = pa.field(field.name, field.type.value_type)
+        elif pa.types.is_string(field.type) and dictionary:
+            column = pc.dictionary_encode(column)
+            field = pa.field(field.name, column.type)
+        arrays.append(column)
+        fields.append(field)
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def dataset_signature(dataset_path: Path) -> tuple:
+    """
+    Identifica o conteúdo de um dataset sem abrir os arquivos Parquet.
+
+    Returns:
+        tuple: (caminho relativo, tamanho, mtime em ns) de cada arquivo
+               Parquet, em ordem. Muda a cada ingestão ou compactação.
+    """
+    dataset_path = Path(dataset_path)
+    if dataset_path.is_file():
+        stat = dataset_path.stat()
+        return ((dataset_path.name, stat.st_size, stat.st_mtime_ns),)
+
+    # Arquivos iniciados por '_' ou '.' (ex: temporários da ingestão) são
+    # ignorados pelo pyarrow.dataset e, portanto, também aqui.
+    signature = []
+    pending = [dataset_path]
+    while pending:
+        for entry in os.scandir(pending.pop()):
+            if entry.name.startswith(('_', '.')):
+                continue
+            if entry.is_dir():
+                pending.append(Path(entry.path))
+            elif entry.name.endswith('.parquet'):
+                stat = entry.stat()
+                signature.append((os.path.relpath(entry.path, dataset_path), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(signature))
+
+
+class DatasetHandle:
+    """
+    Mantém o dataset 'dados_b3' aberto entre consultas.
+
+    A abertura (listagem dos diretórios, descoberta das partições e leitura
+    dos rodapés Parquet com as estatísticas dos grupos de linhas) é feita uma
+    única vez; as consultas seguintes reutilizam os fragmentos com os
+    metadados já carregados. Tamanho e mtime dos arquivos são comparados com
+    os da abertura no máximo uma vez a cada `revalidate_interval` segundos, e
+    o dataset só é reaberto se algo mudou (ex: uma nova ingestão ou
+    compactação); entre uma verificação e outra, os acessos não tocam o disco.
+
+    Seguro entre threads: a reabertura é feita por uma única thread, e as
+    consultas já em andamento seguem com o dataset que receberam.
+
+    Args:
+        dataset_path (Path): O diretório (ou arquivo) do dataset.
+        memory_map (bool): Abre os arquivos com memory map.
+        revalidate_interval (float): Segundos entre duas verificações dos
+            arquivos (0 = a cada acesso).
+    """
+    def __init__(self, dataset_path: Path, memory_map: bool = True, revalidate_interval: float = 1.0):
+        self.path = Path(dataset_path)
+        self.memory_map = memory_map
+        self.revalidate_interval = revalidate_interval
+        self.partition_fields = discover_partition_fields(self.path) if self.path.is_dir() else []
+        self.open_count = 0
+        self._dataset = None
+        self._signature = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _current_signature(self) -> tuple:
+        """(Helper Interno) Caminho, tamanho e mtime de cada arquivo Parquet do dataset."""
+        return dataset_signature(self.path)
+
+    @property
+    def signature(self) -> Optional[tuple]:
+        """A assinatura (ver `dataset_signature`) do dataset aberto, ou None antes da abertura."""
+        return self._signature
+
+    @property
+    def dataset(self) -> ds.Dataset:
+        """O dataset aberto, reaberto antes se algum arquivo mudou."""
+        return self.snapshot()[0]
+
+    def snapshot(self) -> tuple:
+        """
+        O dataset aberto (reaberto antes se algum arquivo mudou), com a sua assinatura e versão.
+
+        Os três valores vêm da mesma abertura, mesmo com outra thread
+        reabrindo o dataset ao mesmo tempo: quem valida tabelas agregadas ou
+        caches contra o dataset deve usar esta assinatura, em vez de calcular
+        outra com `dataset_signature`.
+
+        Returns:
+            tuple: (ds.Dataset, assinatura, versão), onde a versão é `open_count`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._dataset is not None and now - self._checked_at < self.revalidate_interval:
+                return self._dataset, self._signature, self.open_count
+        # A varredura dos arquivos fica fora da trava: as outras consultas seguem com o dataset atual.
+        signature = self._current_signature()
+        with self._lock:
+            if self._dataset is None or signature != self._signature:
+                self._open(signature)
+            self._checked_at = now
+            return self._dataset, self._signature, self.open_count
+
+    def _open(self, signature: tuple):
+        """(Helper Interno) Abre o dataset e carrega os metadados de todos os fragmentos."""
+        self.partition_fields = discover_partition_fields(self.path) if self.path.is_dir() else []
+        dataset = open_dataset(self.path, memory_map=self.memory_map)
+        for fragment in dataset.get_fragments():
+            fragment.ensure_complete_metadata()
+        self._dataset, self._signature = dataset, signature
+        self.open_count += 1
@@ -0,0 +1,498 @@
+# src/b3_analyzer/synthetic.py
+#
+# Gerador de arquivos COTAHIST sintéticos, no layout de largura fixa de
+# `COTAHIST_LAYOUT`, para benchmarks e verificações reprodutíveis sem os
+# downloads da B3. O universo (ações ON/PN/UNT e seus fracionários, FIIs,
+# BDRs e séries mensais de opções de compra e de venda, com os exercícios no
+# vencimento) e os preços são derivados de uma semente: a mesma configuração
+# gera sempre os mesmos arquivos, byte a byte.
+
+import zipfile
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+
+from .raw_data_processor import COTAHIST_LAYOUT, RECORD_LENGTH
+
+# Escalas prontas (pregões x instrumentos) usadas pelo gerador e pelos benchmarks.
+SYNTHETIC_SCALES = {
+    'pequena': {'days': 60, 'equities': 60, 'fiis': 20, 'bdrs': 20, 'option_underlyings': 5, 'strikes': 6},
+    'media': {'days': 250, 'equities': 400, 'fiis': 150, 'bdrs': 150, 'option_underlyings': 30, 'strikes': 10},
+    'grande': {'days': 1250, 'equities': 1200, 'fiis': 500, 'bdrs': 700, 'option_underlyings': 80, 'strikes': 16},
+}
+# Letras de vencimento das opções (janeiro a dezembro): compra A-L, venda M-X.
+CALL_LETTERS = 'ABCDEFGHIJKL'
+PUT_LETTERS = 'MNOPQRSTUVWX'
+# Pregões entre o lançamento de uma série de opções e o vencimento.
+_OPTION_LIFE_DAYS = 42
+_NO_EXPIRY = 99991231
+_SYLLABLES = ['BRA', 'SUL', 'VAL', 'TEC', 'NOR', 'PAR', 'LOG', 'MAR', 'COM', 'AGRO', 'ENER', 'SAN', 'IND',
+              'POR', 'CAP', 'MET', 'RIO', 'GAS', 'SID', 'TEL', 'FER', 'ALI', 'MIN', 'CRE']
+_EQUITY_SUFFIXES = ['', ' SA', ' ON', ' PART', ' HOLD', ' ENERG', ' BANCO']
+
+
+def format_records(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Monta registros COTAHIST de largura fixa a partir de colunas NumPy.
+
+    É o inverso de `parse_cotahist_bytes`: cada campo de `COTAHIST_LAYOUT`
+    presente em `columns` é escrito na sua posição. Arrays de bytes ('S')
+    são alinhados à esquerda e completados com espaços; inteiros (preços em
+    centavos, datas AAAAMMDD) são escritos com zeros à esquerda, limitados à
+    largura do campo. Campos ausentes ficam em branco.
+
+    Args:
+        columns (Dict[str, np.ndarray]): Colunas de mesmo tamanho, por nome de campo.
+
+    Returns:
+        np.ndarray: Matriz uint8 (registros x `RECORD_LENGTH`), sem quebras de linha.
+    """
+    n_rows = len(next(iter(columns.values())))
+    records = np.full((n_rows, RECORD_LENGTH), ord(' '), dtype=np.uint8)
+    for name, (start, end) in COTAHIST_LAYOUT.items():
+        values = columns.get(name)
+        if values is None:
+            continue
+        width = end - start + 1
+        block = records[:, start - 1:end]
+        if values.dtype.kind == 'S':
+            raw = np.frombuffer(values.astype(f'S{width}').tobytes(), dtype=np.uint8).reshape(n_rows, width)
+            block[:] = np.where(raw == 0, ord(' '), raw)
+        else:
+            remaining = np.clip(values.astype(np.int64), 0, 10 ** min(width, 18) - 1)
+            for j in range(width - 1, -1, -1):
+                block[:, j] = remaining % 10 + ord('0')
+                remaining //= 10
+    return records
+
+
+def _random_roots(rng: np.random.Generator, count: int) -> np.ndarray:
+    """(Helper Interno) `count` radicais distintos de 4 letras."""
+    codes = rng.choice(26 ** 4, size=count, replace=False)
+    letters = np.stack([(codes // 26 ** k) % 26 for k in range(3, -1, -1)], axis=1) + ord('A')
+    return letters.astype(np.uint8).view('S4').ravel()
+
+
+def _random_names(rng: np.random.Generator, count: int, prefix: str = '', suffixes: List[str] = ('',)) -> List[str]:
+    """(Helper Interno) Nomes de pregão (NOMRES, até 12 caracteres) formados por sílabas."""
+    names = []
+    for _ in range(count):
+        word = ''.join(rng.choice(_SYLLABLES, size=rng.integers(2, 4)))
+        names.append((prefix + word + rng.choice(suffixes))[:12])
+    return names
+
+
+def _check_digit(rng: np.random.Generator, count: int) -> np.ndarray:
+    """(Helper Interno) Um dígito aleatório por ISIN (o dígito verificador não é validado na leitura)."""
+    return rng.integers(0, 10, size=count)
+
+
+def _spot_universe(rng: np.random.Generator, equities: int, fiis: int, bdrs: int) -> dict:
+    """
+    (Helper Interno) Emissores e instrumentos do mercado à vista e fracionário.
+
+    Cada emissor tem um radical, um nome, uma liquidez (lei de Zipf sobre uma
+    ordem aleatória), um preço inicial e uma volatilidade. Ações têm a classe
+    ON e, com alguma probabilidade, PN e UNT, cada uma com o seu ticker
+    fracionário ('F'); FIIs negociam '<radical>11' e BDRs '<radical>34'.
+    """
+    n_issuers = equities + fiis + bdrs
+    kind = np.repeat(np.array([0, 1, 2]), [equities, fiis, bdrs])  # 0 ação, 1 FII, 2 BDR
+    roots = _random_roots(rng, n_issuers)
+    names = (_random_names(rng, equities, suffixes=_EQUITY_SUFFIXES) + _random_names(rng, fiis, prefix='FII ')
+             + _random_names(rng, bdrs, suffixes=['', ' DRN', ' INC']))
+    weight = 1.0 / (rng.permutation(n_issuers) + 1.0)
+    base_price = np.where(kind == 1, rng.lognormal(np.log(95), 0.3, n_issuers),
+                          np.where(kind == 2, rng.lognormal(np.log(40), 0.7, n_issuers),
+                                   rng.lognormal(np.log(18), 0.8, n_issuers)))
+    volatility = np.where(kind == 1, rng.uniform(0.005, 0.012, n_issuers), rng.uniform(0.01, 0.035, n_issuers))
+
+    issuer, suffix, especi, codisi, multiplier = [], [], [], [], []
+    digits = _check_digit(rng, n_issuers * 3)
+    for i in range(n_issuers):
+        root = roots[i].decode()
+        if kind[i] == 1:
+            classes = [('11', 'CI', f'BR{root}CTF00{digits[i]}', 1.0)]
+        elif kind[i] == 2:
+            classes = [('34', 'DRN', f'BR{root}BDR00{digits[i]}', 1.0)]
+        else:
+            listing = rng.choice(['NM', 'N1', 'N2', ''])
+            classes = [('3', f'ON  {listing}'.strip(), f'BR{root}ACNOR{digits[i]}', 1.0)]
+            if rng.random() < 0.55:
+                classes.append(('4', f'PN  {listing}'.strip(), f'BR{root}ACNPR{digits[n_issuers + i]}',
+                                rng.uniform(0.85, 1.1)))
+            if rng.random() < 0.08:
+                classes.append(('11', 'UNT N2', f'BR{root}CDAM0{digits[2 * n_issuers + i]}', rng.uniform(2.5, 3.5)))
+        for code, spec, isin, mult in classes:
+            issuer.append(i)
+            suffix.append(code)
+            especi.append(spec)
+            codisi.append(isin)
+            multiplier.append(mult)
+
+    issuer = np.array(issuer)
+    standard = {
+        'issuer': issuer, 'codneg': np.array([roots[i] + s.encode() for i, s in zip(issuer, suffix)]),
+        'especi': np.array(especi, dtype='S10'), 'codisi': np.array(codisi, dtype='S12'),
+        'multiplier': np.array(multiplier), 'codbdi': np.where(kind[issuer] == 1, 12, 2),
+        'tpmerc': np.full(len(issuer), 10), 'lot': np.full(len(issuer), 100), 'fractional': np.zeros(len(issuer), bool),
+    }
+    # Ações também negociam no fracionário (mesmo ISIN, ticker com 'F').
+    equity = np.flatnonzero(kind[issuer] == 0)
+    fractional = {key: values[equity] for key, values in standard.items()}
+    fractional.update({
+        'codneg': np.array([c + b'F' for c in standard['codneg'][equity]]), 'codbdi': np.full(len(equity), 96),
+        'tpmerc': np.full(len(equity), 20), 'lot': np.ones(len(equity), dtype=int),
+        'fractional': np.ones(len(equity), bool),
+    })
+    instruments = {key: np.concatenate([standard[key], fractional[key]]) for key in standard}
+    # Classes mais negociadas que a ON (ex: PN, UNT) variam por emissor; o fracionário negocia menos.
+    instruments['weight'] = weight[instruments['issuer']] * rng.uniform(0.3, 1.0, len(instruments['issuer'])) * np.where(
+        instruments['fractional'], 0.05, 1.0)
+    return {
+        'kind': kind, 'roots': roots, 'names': np.array([n.encode('latin-1') for n in names], dtype='S12'),
+        'weight': weight, 'base_price': base_price, 'volatility': volatility, 'instruments': instruments,
+    }
+
+
+def _price_paths(rng: np.random.Generator, universe: dict, n_days: int):
+    """
+    (Helper Interno) Preços por unidade (pregões x emissores) e o fator de cotação de cada dia.
+
+    Os log-preços seguem um passeio aleatório. Algumas ações têm um
+    desdobramento ou grupamento (o preço por ação muda na razão do evento) e
+    algumas são cotadas por lote de mil (FATCOT 1000) até passarem a ser
+    cotadas por unidade.
+
+    Returns:
+        tuple: (log-preços contínuos, divisor de eventos, FATCOT), todos (pregões x emissores).
+    """
+    n_issuers = len(universe['kind'])
+    steps = rng.normal(0.0002, 1.0, (n_days, n_issuers)) * universe['volatility']
+    log_prices = np.log(universe['base_price']) + np.cumsum(steps, axis=0)
+
+    divisor = np.ones((n_days, n_issuers))
+    fatcot = np.ones((n_days, n_issuers), dtype=np.int64)
+    equity = np.flatnonzero(universe['kind'] == 0)
+    if n_days > 2:
+        for i in equity[rng.random(len(equity)) < 0.04]:
+            day = rng.integers(1, n_days)
+            divisor[day:, i] = rng.choice([2.0, 3.0, 4.0, 0.1, 0.2])
+        for i in equity[rng.random(len(equity)) < 0.02]:
+            fatcot[:rng.integers(1, n_days), i] = 1000
+    return log_prices, divisor, fatcot
+
+
+def _bars(rng: np.random.Generator, open_price: np.ndarray, close: np.ndarray, volatility: np.ndarray) -> dict:
+    """(Helper Interno) Máxima, mínima, média e melhores ofertas de cada pregão (em reais)."""
+    n_rows = len(close)
+    high = np.maximum(open_price, close) * np.exp(np.abs(rng.normal(0, 0.5, n_rows)) * volatility)
+    low = np.minimum(open_price, close) * np.exp(-np.abs(rng.normal(0, 0.5, n_rows)) * volatility)
+    spread = rng.uniform(0.0005, 0.003, n_rows)
+    return {
+        'PREABE': open_price, 'PREMAX': high, 'PREMIN': low, 'PREMED': (open_price + close + high + low) / 4,
+        'PREULT': close, 'PREOFC': close * (1 - spread), 'PREOFV': close * (1 + spread),
+    }
+
+
+def _spot_rows(rng: np.random.Generator, universe: dict, paths: tuple) -> dict:
+    """(Helper Interno) Registros do mercado à vista e fracionário: uma linha por (pregão, instrumento negociado)."""
+    log_prices, divisor, fatcot = paths
+    inst = universe['instruments']
+    n_days = len(log_prices)
+    weight = inst['weight'] / inst['weight'].max()
+    probability = np.clip(0.15 + 0.85 * weight ** 0.25, 0, 1)
+    day, index = np.nonzero(rng.random((n_days, len(weight))) < probability)
+    issuer = inst['issuer'][index]
+    volatility = universe['volatility'][issuer]
+
+    # Preço por ação na base de cada dia (após eventos), multiplicado pelo fator de cotação.
+    unit_close = np.exp(log_prices[day, issuer]) / divisor[day, issuer] * inst['multiplier'][index]
+    previous = np.maximum(day - 1, 0)
+    unit_open = (np.exp(log_prices[previous, issuer] + rng.normal(0, 0.3, len(day)) * volatility)
+                 / divisor[day, issuer] * inst['multiplier'][index])
+    quote = fatcot[day, issuer]
+    prices = {name: values * quote for name, values in _bars(rng, unit_open, unit_close, volatility).items()}
+
+    trades = np.clip(rng.poisson(1 + 3000 * weight[index] ** 1.2), 1, 99_999)
+    quantity = trades * inst['lot'][index] * rng.integers(1, 20, len(day))
+    return {
+        'day': day, 'instrument': index, 'prices': prices, 'TOTNEG': trades, 'QUATOT': quantity,
+        'VOLTOT': np.round(quantity * prices['PREMED'] / quote * 100).astype(np.int64), 'FATCOT': quote,
+    }
+
+
+def _expiries(dates: np.ndarray) -> np.ndarray:
+    """(Helper Interno) Vencimentos mensais (terceira sexta-feira) que cobrem o período, até dois meses depois."""
+    first = dates[0].astype('datetime64[M]')
+    months = np.arange(first, dates[-1].astype('datetime64[M]') + 3)
+    return np.busday_offset(months.astype('datetime64[D]'), 2, roll='forward', weekmask='Fri')
+
+
+def _option_universe(rng: np.random.Generator, universe: dict, paths: tuple, dates: np.ndarray,
+                     underlyings: int, strikes: int) -> dict:
+    """
+    (Helper Interno) Séries de opções dos ativos mais líquidos.
+
+    Cada ativo-objeto recebe, para cada vencimento mensal, `strikes` preços
+    de exercício em torno do preço no lançamento (42 pregões antes do
+    vencimento), em calls e puts. Os códigos seguem a convenção da B3
+    (radical + letra do mês + número) e se repetem a cada ano, como nos
+    arquivos reais; cada série tem o seu ISIN.
+    """
+    log_prices, divisor, _ = paths
+    inst = universe['instruments']
+    # O instrumento mais líquido (não fracionário) de cada uma das ações mais líquidas.
+    equity_rows = np.flatnonzero((universe['kind'][inst['issuer']] == 0) & ~inst['fractional'])
+    order = equity_rows[np.argsort(-inst['weight'][equity_rows], kind='stable')]
+    _, first = np.unique(inst['issuer'][order], return_index=True)
+    chosen = order[np.sort(first)][:underlyings]
+
+    series = {key: [] for key in ('underlying', 'codneg', 'codisi', 'strike', 'expiry', 'expiry_day', 'start_day', 'side')}
+    for position, instrument in enumerate(chosen):
+        issuer = inst['issuer'][instrument]
+        root = universe['roots'][issuer].decode()
+        serial = 0
+        for expiry in _expiries(dates):
+            expiry_day = int(np.searchsorted(dates, expiry))
+            start_day = max(0, expiry_day - _OPTION_LIFE_DAYS)
+            if start_day >= len(dates) or expiry_day < 0:
+                continue
+            spot = np.exp(log_prices[start_day, issuer]) / divisor[start_day, issuer] * inst['multiplier'][instrument]
+            offsets = (np.arange(strikes) - (strikes - 1) / 2) * 0.04
+            month, year = int(str(expiry)[5:7]), int(str(expiry)[:4])
+            for side, letters in ((70, CALL_LETTERS), (80, PUT_LETTERS)):
+                for k, offset in enumerate(offsets):
+                    series['underlying'].append(instrument)
+                    series['codneg'].append(f'{root}{letters[month - 1]}{(k + 1) * 10 + year % 10}')
+                    series['codisi'].append(f'BR{root}O{serial % 100_000:05d}')
+                    series['strike'].append(max(round(spot * (1 + offset), 2), 0.01))
+                    series['expiry'].append(int(str(expiry).replace('-', '')))
+                    series['expiry_day'].append(expiry_day)
+                    series['start_day'].append(start_day)
+                    series['side'].append(side)
+                    serial += 1
+    return {key: np.array(values, dtype='S12' if key in ('codneg', 'codisi') else None)
+            for key, values in series.items()}
+
+
+def _option_rows(rng: np.random.Generator, universe: dict, paths: tuple, options: dict, n_days: int) -> dict:
+    """
+    (Helper Interno) Negócios de opções e exercícios no vencimento.
+
+    Uma série negocia com probabilidade maior perto do dinheiro; o prêmio é
+    o valor intrínseco mais um valor no tempo que decai até o vencimento.
+    No dia do vencimento, cada série dentro do dinheiro gera um registro de
+    exercício (TPMERC 12/13, ticker com 'E') ao preço de exercício.
+    """
+    log_prices, divisor, _ = paths
+    inst = universe['instruments']
+    if not len(options['codneg']):
+        return {'trades': None, 'exercises': None}
+    last_day = np.minimum(options['expiry_day'], n_days - 1)
+    lengths = last_day - options['start_day'] + 1
+    series = np.repeat(np.arange(len(lengths)), lengths)
+    day = options['start_day'][series] + np.arange(len(series)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    underlying = options['underlying'][series]
+    issuer = inst['issuer'][underlying]
+    spot = np.exp(log_prices[day, issuer]) / divisor[day, issuer] * inst['multiplier'][underlying]
+    strike = options['strike'][series]
+    is_call = options['side'][series] == 70
+    moneyness = np.log(spot / strike)
+    remaining = np.maximum(options['expiry_day'][series] - day, 0) + 1
+    sigma = universe['volatility'][issuer] * np.sqrt(remaining)
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0), np.maximum(strike - spot, 0))
+    premium = np.maximum(intrinsic + 0.4 * spot * sigma * np.exp(-0.5 * (moneyness / sigma) ** 2), 0.01)
+
+    traded = rng.random(len(day)) < 0.05 + 0.6 * np.exp(-(moneyness / 0.08) ** 2)
+    rows = np.flatnonzero(traded)
+    open_price = premium[rows] * np.exp(rng.normal(0, 0.1, len(rows)))
+    prices = _bars(rng, open_price, premium[rows], np.full(len(rows), 0.1))
+    trades = np.clip(rng.poisson(20 * np.exp(-(moneyness[rows] / 0.1) ** 2) + 1), 1, 99_999)
+    quantity = trades * 100 * rng.integers(1, 50, len(rows))
+    result = {'trades': {
+        'day': day[rows], 'series': series[rows], 'prices': prices, 'TOTNEG': trades, 'QUATOT': quantity,
+        'VOLTOT': np.round(quantity * prices['PREMED'] * 100).astype(np.int64),
+    }}
+
+    at_expiry = np.flatnonzero((day == options['expiry_day'][series]) & (intrinsic > 0))
+    strike_price = strike[at_expiry]
+    quantity = 100 * rng.integers(1, 500, len(at_expiry))
+    result['exercises'] = {
+        'day': day[at_expiry], 'series': series[at_expiry],
+        'prices': {name: strike_price for name in ('PREABE', 'PREMAX', 'PREMIN', 'PREMED', 'PREULT')},
+        'TOTNEG': rng.integers(1, 50, len(at_expiry)), 'QUATOT': quantity,
+        'VOLTOT': np.round(quantity * strike_price * 100).astype(np.int64),
+    }
+    return result
+
+
+def _cents(values: np.ndarray) -> np.ndarray:
+    """(Helper Interno) Preços em reais -> centavos inteiros (mínimo de 1 centavo)."""
+    return np.maximum(np.round(values * 100), 1).astype(np.int64)
+
+
+def _columns(rows: dict, dates: np.ndarray, fields: dict) -> Dict[str, np.ndarray]:
+    """(Helper Interno) Junta os campos por linha (preços, volumes) e os do instrumento em colunas de `format_records`."""
+    n_rows = len(rows['day'])
+    columns = {
+        'TIPREG': np.ones(n_rows, dtype=np.int64), 'DATA_PREGAO': _yyyymmdd(dates[rows['day']]),
+        'MODREF': np.full(n_rows, b'R$', dtype='S4'),
+        'TOTNEG': rows['TOTNEG'], 'QUATOT': rows['QUATOT'], 'VOLTOT': rows['VOLTOT'],
+        'FATCOT': rows.get('FATCOT', np.ones(n_rows, dtype=np.int64)), 'PTOEXE': np.zeros(n_rows, dtype=np.int64),
+        'INDOPC': np.zeros(n_rows, dtype=np.int64),
+    }
+    # Campos de preço sem valor (ex: ofertas nos exercícios) ficam zerados, como nos arquivos da B3.
+    for name in ('PREABE', 'PREMAX', 'PREMIN', 'PREMED', 'PREULT', 'PREOFC', 'PREOFV'):
+        values = rows['prices'].get(name)
+        columns[name] = _cents(values) if values is not None else np.zeros(n_rows, dtype=np.int64)
+    columns.update(fields)
+    return columns
+
+
+def _yyyymmdd(dates: np.ndarray) -> np.ndarray:
+    """(Helper Interno) datetime64[D] -> inteiros AAAAMMDD."""
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    months = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    days = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+    return years * 10000 + months * 100 + days
+
+
+def _write_file(path: Path, year: int, records: np.ndarray, last_date: int, compress: bool) -> int:
+    """
+    (Helper Interno) Grava um arquivo anual com header, registros e trailer (linhas CRLF).
+
+    Returns:
+        int: O tamanho do arquivo gravado, em bytes.
+    """
+    header = f'00COTAHIST.{year}BOVESPA {last_date}'.ljust(RECORD_LENGTH).encode('latin-1')
+    trailer = f'99COTAHIST.{year}BOVESPA {last_date}{len(records) + 2:011d}'.ljust(RECORD_LENGTH).encode('latin-1')
+    lines = np.empty((len(records) + 2, RECORD_LENGTH + 2), dtype=np.uint8)
+    lines[0, :RECORD_LENGTH] = np.frombuffer(header, dtype=np.uint8)
+    lines[1:-1, :RECORD_LENGTH] = records
+    lines[-1, :RECORD_LENGTH] = np.frombuffer(trailer, dtype=np.uint8)
+    lines[:, RECORD_LENGTH:] = (ord('\r'), ord('\n'))
+    data = lines.tobytes()
+    if compress:
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr(path.with_suffix('.TXT').name, data)
+    else:
+        path.write_bytes(data)
+    return path.stat().st_size
+
+
+def generate_cotahist(output_path: Path, start_date: str = '2019-01-02', days: int = 250, equities: int = 400,
+                      fiis: int = 150, bdrs: int = 150, option_underlyings: int = 30, strikes: int = 10,
+                      seed: int = 0, compress: bool = False) -> dict:
+    """
+    Gera arquivos COTAHIST anuais sintéticos ('COTAHIST_A<ano>.TXT' ou '.ZIP').
+
+    Os pregões são os dias úteis (segunda a sexta) a partir de `start_date`.
+    A liquidez dos emissores segue uma lei de Zipf: os mais líquidos
+    negociam todos os dias, e a cauda, em parte dos pregões. O volume de
+    linhas por pregão fica em torno de 1,5 x (ações + FIIs + BDRs), mais as
+    opções dos `option_underlyings` ativos mais líquidos. Os arquivos passam
+    pelo mesmo parser da ingestão (`parse_cotahist_bytes`) e exercitam as
+    consultas por ticker, entidade, classe (FII, BDR, opções) e os ajustes
+    de preço (há desdobramentos, grupamentos e mudanças de FATCOT).
+
+    Args:
+        output_path (Path): Diretório de saída (criado se preciso).
+        start_date (str): Primeiro pregão ('YYYY-MM-DD').
+        days (int): Número de pregões.
+        equities (int): Número de empresas com ações (classes ON, PN, UNT).
+        fiis (int): Número de fundos imobiliários.
+        bdrs (int): Número de BDRs.
+        option_underlyings (int): Ativos-objeto com séries de opções.
+        strikes (int): Preços de exercício por vencimento e lado.
+        seed (int): Semente do gerador (mesma semente, mesmos arquivos).
+        compress (bool): Se True, grava cada ano em um ZIP, como os arquivos
+                         baixados da B3 (para a ingestão em fluxo).
+
+    Returns:
+        dict: 'arquivos' (nomes), 'registros', 'bytes' (em disco), 'pregoes'
+              e 'amostra': tickers de ações, FIIs e BDRs em ordem de
+              liquidez, radicais com opções e nomes de empresas, para montar
+              consultas sobre os dados gerados.
+    """
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = np.busday_offset(np.datetime64(start_date, 'D'), np.arange(days), roll='forward')
+
+    universe = _spot_universe(rng, equities, fiis, bdrs)
+    paths = _price_paths(rng, universe, days)
+    inst = universe['instruments']
+    names = universe['names'][inst['issuer']]
+    spot = _spot_rows(rng, universe, paths)
+    index = spot['instrument']
+    parts = [_columns(spot, dates, {
+        'CODBDI': inst['codbdi'][index], 'CODNEG': inst['codneg'][index], 'TPMERC': inst['tpmerc'][index],
+        'NOMRES': names[index], 'ESPECI': inst['especi'][index], 'CODISI': inst['codisi'][index],
+        'DATVEN': np.full(len(index), _NO_EXPIRY), 'PREEXE': np.zeros(len(index), dtype=np.int64),
+        'DISMES': 100 + inst['issuer'][index] % 100,
+    })]
+
+    options = _option_universe(rng, universe, paths, dates, option_underlyings, strikes)
+    option_rows = _option_rows(rng, universe, paths, options, days)
+    for key, exercise in (('trades', False), ('exercises', True)):
+        rows = option_rows[key]
+        if rows is None or not len(rows['day']):
+            continue
+        series = rows['series']
+        underlying = options['underlying'][series]
+        is_call = options['side'][series] == 70
+        codneg = options['codneg'][series]
+        if exercise:
+            codbdi, tpmerc = np.where(is_call, 38, 42), np.where(is_call, 12, 13)
+            codneg = np.char.add(codneg, b'E')
+        else:
+            codbdi, tpmerc = np.where(is_call, 78, 82), options['side'][series]
+        parts.append(_columns(rows, dates, {
+            'CODBDI': codbdi, 'CODNEG': codneg, 'TPMERC': tpmerc, 'NOMRES': names[underlying],
+            'ESPECI': inst['especi'][underlying], 'CODISI': options['codisi'][series],
+            'DATVEN': options['expiry'][series], 'PREEXE': _cents(options['strike'][series]),
+            'DISMES': 100 + inst['issuer'][underlying] % 100,
+        }))
+
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    # Ordem dos arquivos da B3: por pregão e, dentro dele, por CODBDI e ticker.
+    order = np.lexsort((columns['CODNEG'], columns['CODBDI'], columns['DATA_PREGAO']))
+    columns = {name: values[order] for name, values in columns.items()}
+    records = format_records(columns)
+
+    summary = {'arquivos': [], 'registros': len(records), 'bytes': 0, 'pregoes': days}
+    years = columns['DATA_PREGAO'] // 10000
+    for year in np.unique(years):
+        rows = np.flatnonzero(years == year)
+        path = output_path / f"COTAHIST_A{year}.{'ZIP' if compress else 'TXT'}"
+        summary['bytes'] += _write_file(path, int(year), records[rows], int(columns['DATA_PREGAO'][rows[-1]]), compress)
+        summary['arquivos'].append(path.name)
+
+    standard = np.flatnonzero(~inst['fractional'])
+    by_liquidity = standard[np.argsort(-inst['weight'][standard], kind='stable')]
+    kind = universe['kind'][inst['issuer'][by_liquidity]]
+    tickers = inst['codneg'][by_liquidity]
+    summary['amostra'] = {
+        'acoes': [t.decode() for t in tickers[kind == 0][:20]],
+        'fiis': [t.decode() for t in tickers[kind == 1][:20]],
+        'bdrs': [t.decode() for t in tickers[kind == 2][:20]],
+        'radicais_opcoes': list(dict.fromkeys(c.decode()[:4] for c in options['codneg'])),
+        'empresas': [n.decode('latin-1').strip() for n in universe['names'][universe['kind'] == 0][:20]],
+    }
+    return summary
+
+
+def generate_scale(output_path: Path, scale: str = 'pequena', seed: int = 0, compress: bool = False,
+                   start_date: str = '2019-01-02', **overrides) -> dict:
+    """
+    Gera os arquivos de uma escala de `SYNTHETIC_SCALES` ('pequena', 'media', 'grande').
+
+    Args:
+        **overrides: Parâmetros de `generate_cotahist` que substituem os da escala (ex: days=500).
+    """
+    if scale not in SYNTHETIC_SCALES:
+        raise ValueError(f"Escala inválida: '{scale}'. Opções: {list(SYNTHETIC_SCALES)}")
+    params = {**SYNTHETIC_SCALES[scale], **{k: v for k, v in overrides.items() if v is not None}}
+    return generate_cotahist(output_path, start_date=start_date, seed=seed, compress=compress, **params)